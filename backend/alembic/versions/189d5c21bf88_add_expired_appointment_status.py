@@ -0,0 +1,39 @@
+"""Add expired appointment status
+
+Revision ID: 189d5c21bf88
+Revises: 80ec9d078b3a
+Create Date: 2026-10-18 15:48:20.116372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '189d5c21bf88'
+down_revision: Union[str, None] = '80ec9d078b3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OLD_STATUSES = ('pending', 'confirmed', 'completed', 'cancelled')
+NEW_STATUSES = OLD_STATUSES + ('expired',)
+
+
+def upgrade() -> None:
+    op.alter_column('appointments', 'status',
+               existing_type=sa.Enum(*OLD_STATUSES, name='appointment_status'),
+               type_=sa.Enum(*NEW_STATUSES, name='appointment_status'),
+               existing_nullable=False)
+
+
+def downgrade() -> None:
+    # Expired appointments fall back to cancelled, the closest old terminal status
+    op.execute("UPDATE appointments SET status = 'cancelled' WHERE status = 'expired'")
+    # Rollup buckets would collide; rebuild with: python rebuild_store_stats.py
+    op.execute("DELETE FROM store_daily_stats WHERE status = 'expired'")
+    op.alter_column('appointments', 'status',
+               existing_type=sa.Enum(*NEW_STATUSES, name='appointment_status'),
+               type_=sa.Enum(*OLD_STATUSES, name='appointment_status'),
+               existing_nullable=False)
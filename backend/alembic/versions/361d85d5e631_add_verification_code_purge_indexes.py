@@ -0,0 +1,31 @@
+"""Add verification code lookup and purge indexes
+
+Revision ID: 361d85d5e631
+Revises: 189d5c21bf88
+Create Date: 2026-10-18 17:12:44.208391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '361d85d5e631'
+down_revision: Union[str, None] = '189d5c21bf88'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_verification_codes_phone_purpose_used_expires', 'verification_codes', ['phone', 'purpose', 'is_used', 'expires_at'], unique=False)
+    op.create_index('ix_verification_codes_expires_at', 'verification_codes', ['expires_at'], unique=False)
+    # Leading column of the composite index, no longer needed on its own
+    op.drop_index('ix_verification_codes_phone', table_name='verification_codes')
+
+
+def downgrade() -> None:
+    op.create_index('ix_verification_codes_phone', 'verification_codes', ['phone'], unique=False)
+    op.drop_index('ix_verification_codes_expires_at', table_name='verification_codes')
+    op.drop_index('ix_verification_codes_phone_purpose_used_expires', table_name='verification_codes')
@@ -0,0 +1,33 @@
+"""Add composite indexes for appointment conflict and availability queries
+
+Revision ID: 5f8d13341b92
+Revises: db1ab2d8ab7a
+Create Date: 2026-10-18 14:05:37.910264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f8d13341b92'
+down_revision: Union[str, None] = 'db1ab2d8ab7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_appointments_technician_date_status', 'appointments', ['technician_id', 'appointment_date', 'status', 'appointment_time'], unique=False)
+    op.create_index('ix_appointments_user_date_status', 'appointments', ['user_id', 'appointment_date', 'status', 'appointment_time'], unique=False)
+    # Leading columns of the composite indexes, no longer needed on their own
+    op.drop_index('ix_appointments_user_id', table_name='appointments')
+    op.drop_index('ix_appointments_store_id', table_name='appointments')
+
+
+def downgrade() -> None:
+    op.create_index('ix_appointments_store_id', 'appointments', ['store_id'], unique=False)
+    op.create_index('ix_appointments_user_id', 'appointments', ['user_id'], unique=False)
+    op.drop_index('ix_appointments_user_date_status', table_name='appointments')
+    op.drop_index('ix_appointments_technician_date_status', table_name='appointments')
@@ -0,0 +1,35 @@
+"""Add technician_day_locks table
+
+Revision ID: 80ec9d078b3a
+Revises: bef472c3716a
+Create Date: 2026-10-18 15:02:51.338720
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '80ec9d078b3a'
+down_revision: Union[str, None] = 'bef472c3716a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('technician_day_locks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('technician_id', sa.Integer(), nullable=False),
+    sa.Column('lock_date', sa.Date(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('technician_id', 'lock_date', name='uq_technician_day_locks_technician_date')
+    )
+    op.create_index(op.f('ix_technician_day_locks_id'), 'technician_day_locks', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_technician_day_locks_id'), table_name='technician_day_locks')
+    op.drop_table('technician_day_locks')
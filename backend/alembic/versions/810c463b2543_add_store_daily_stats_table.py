@@ -0,0 +1,39 @@
+"""Add store_daily_stats rollup table
+
+Revision ID: 810c463b2543
+Revises: e2286eeaf919
+Create Date: 2026-10-18 09:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '810c463b2543'
+down_revision: Union[str, None] = 'e2286eeaf919'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('store_daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('stat_date', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('appointment_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('store_id', 'stat_date', 'status', name='uq_store_daily_stats_store_date_status')
+    )
+    op.create_index(op.f('ix_store_daily_stats_id'), 'store_daily_stats', ['id'], unique=False)
+    # Backfill existing appointments with: python rebuild_store_stats.py
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_store_daily_stats_id'), table_name='store_daily_stats')
+    op.drop_table('store_daily_stats')
@@ -0,0 +1,91 @@
+"""Capture the service price on appointments and rebuild store_daily_stats
+
+Revision ID: a41c7e9d2b65
+Revises: 361d85d5e631
+Create Date: 2026-10-19 10:04:51.336210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7e9d2b65'
+down_revision: Union[str, None] = '361d85d5e631'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+appointments = sa.table(
+    'appointments',
+    sa.column('id', sa.Integer),
+    sa.column('service_id', sa.Integer),
+    sa.column('appointment_date', sa.Date),
+    sa.column('status', sa.String),
+    sa.column('price', sa.Float),
+)
+services = sa.table(
+    'services',
+    sa.column('id', sa.Integer),
+    sa.column('store_id', sa.Integer),
+    sa.column('price', sa.Float),
+)
+store_daily_stats = sa.table(
+    'store_daily_stats',
+    sa.column('store_id', sa.Integer),
+    sa.column('stat_date', sa.Date),
+    sa.column('status', sa.String),
+    sa.column('appointment_count', sa.Integer),
+    sa.column('revenue', sa.Float),
+)
+
+
+def upgrade() -> None:
+    op.add_column('appointments', sa.Column('price', sa.Float(), nullable=True))
+
+    # Backfill from the current service price, in id order and fixed-size batches
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(appointments.c.id, services.c.price)
+            .select_from(appointments.join(services, appointments.c.service_id == services.c.id))
+            .where(appointments.c.id > last_id)
+            .order_by(appointments.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            appointments.update()
+            .where(appointments.c.id == sa.bindparam('row_id'))
+            .values(price=sa.bindparam('row_price')),
+            [{'row_id': row_id, 'row_price': price} for row_id, price in rows]
+        )
+        last_id = rows[-1][0]
+
+    # Rebuild the rollup from the captured prices (same query as
+    # app.crud.store_daily_stats.rebuild), so it is populated and consistent
+    # without running rebuild_store_stats.py by hand
+    bind.execute(store_daily_stats.delete())
+    bind.execute(
+        store_daily_stats.insert().from_select(
+            ['store_id', 'stat_date', 'status', 'appointment_count', 'revenue'],
+            sa.select(
+                services.c.store_id,
+                appointments.c.appointment_date,
+                appointments.c.status,
+                sa.func.count(appointments.c.id),
+                sa.func.coalesce(sa.func.sum(appointments.c.price), 0.0)
+            )
+            .select_from(appointments.join(services, appointments.c.service_id == services.c.id))
+            .group_by(services.c.store_id, appointments.c.appointment_date, appointments.c.status)
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('appointments', 'price')
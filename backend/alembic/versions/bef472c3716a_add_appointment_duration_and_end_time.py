@@ -0,0 +1,87 @@
+"""Add duration_minutes and end_time to appointments
+
+Revision ID: bef472c3716a
+Revises: 5f8d13341b92
+Create Date: 2026-10-18 14:32:08.447120
+
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bef472c3716a'
+down_revision: Union[str, None] = '5f8d13341b92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def _end_time(start_time: time, duration_minutes: int) -> time:
+    # Same rule as app.core.availability.appointment_end_time (kept inline so
+    # the migration does not depend on application code)
+    end = datetime.combine(date.min, start_time) + timedelta(minutes=duration_minutes)
+    if end.date() != date.min:
+        return time(23, 59, 59)
+    return end.time()
+
+
+def upgrade() -> None:
+    op.add_column('appointments', sa.Column('duration_minutes', sa.Integer(), nullable=True))
+    op.add_column('appointments', sa.Column('end_time', sa.Time(), nullable=True))
+
+    # Backfill from the booked service, in id order and fixed-size batches
+    bind = op.get_bind()
+    appointments = sa.table(
+        'appointments',
+        sa.column('id', sa.Integer),
+        sa.column('service_id', sa.Integer),
+        sa.column('appointment_time', sa.Time),
+        sa.column('duration_minutes', sa.Integer),
+        sa.column('end_time', sa.Time),
+    )
+    services = sa.table(
+        'services',
+        sa.column('id', sa.Integer),
+        sa.column('duration_minutes', sa.Integer),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(appointments.c.id, appointments.c.appointment_time, services.c.duration_minutes)
+            .select_from(appointments.join(services, appointments.c.service_id == services.c.id))
+            .where(appointments.c.id > last_id)
+            .order_by(appointments.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            appointments.update()
+            .where(appointments.c.id == sa.bindparam('row_id'))
+            .values(duration_minutes=sa.bindparam('duration'), end_time=sa.bindparam('end')),
+            [
+                {'row_id': row_id, 'duration': duration, 'end': _end_time(start_time, duration)}
+                for row_id, start_time, duration in rows
+            ]
+        )
+        last_id = rows[-1][0]
+
+    # Cover the overlap range predicates with the new end_time column
+    op.drop_index('ix_appointments_technician_date_status', table_name='appointments')
+    op.drop_index('ix_appointments_user_date_status', table_name='appointments')
+    op.create_index('ix_appointments_technician_date_status', 'appointments', ['technician_id', 'appointment_date', 'status', 'appointment_time', 'end_time'], unique=False)
+    op.create_index('ix_appointments_user_date_status', 'appointments', ['user_id', 'appointment_date', 'status', 'appointment_time', 'end_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_appointments_user_date_status', table_name='appointments')
+    op.drop_index('ix_appointments_technician_date_status', table_name='appointments')
+    op.create_index('ix_appointments_technician_date_status', 'appointments', ['technician_id', 'appointment_date', 'status', 'appointment_time'], unique=False)
+    op.create_index('ix_appointments_user_date_status', 'appointments', ['user_id', 'appointment_date', 'status', 'appointment_time'], unique=False)
+    op.drop_column('appointments', 'end_time')
+    op.drop_column('appointments', 'duration_minutes')
@@ -0,0 +1,26 @@
+"""Add backend_users.updated_at index for the phone filter refresh
+
+Revision ID: c5e20b7f9a13
+Revises: a41c7e9d2b65
+Create Date: 2026-10-19 10:31:07.418552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e20b7f9a13'
+down_revision: Union[str, None] = 'a41c7e9d2b65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_backend_users_updated_at'), 'backend_users', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_backend_users_updated_at'), table_name='backend_users')
@@ -0,0 +1,30 @@
+"""Add composite indexes for appointment keyset pagination
+
+Revision ID: db1ab2d8ab7a
+Revises: 810c463b2543
+Create Date: 2026-10-18 13:40:12.583104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'db1ab2d8ab7a'
+down_revision: Union[str, None] = '810c463b2543'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_appointments_user_date_time_id', 'appointments', ['user_id', 'appointment_date', 'appointment_time', 'id'], unique=False)
+    op.create_index('ix_appointments_store_date_time_id', 'appointments', ['store_id', 'appointment_date', 'appointment_time', 'id'], unique=False)
+    op.create_index('ix_appointments_technician_date_time_id', 'appointments', ['technician_id', 'appointment_date', 'appointment_time', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_appointments_technician_date_time_id', table_name='appointments')
+    op.drop_index('ix_appointments_store_date_time_id', table_name='appointments')
+    op.drop_index('ix_appointments_user_date_time_id', table_name='appointments')
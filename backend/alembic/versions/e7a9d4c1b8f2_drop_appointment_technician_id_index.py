@@ -0,0 +1,35 @@
+"""Drop the single-column appointments.technician_id index
+
+Revision ID: e7a9d4c1b8f2
+Revises: c5e20b7f9a13
+Create Date: 2026-10-19 11:02:46.915730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a9d4c1b8f2'
+down_revision: Union[str, None] = 'c5e20b7f9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_technician_index() -> bool:
+    # technician_id was added with create_all, so not every database has the index
+    indexes = sa.inspect(op.get_bind()).get_indexes('appointments')
+    return any(index['name'] == 'ix_appointments_technician_id' for index in indexes)
+
+
+def upgrade() -> None:
+    # Leading column of the technician composite indexes, no longer needed on its own
+    if _has_technician_index():
+        op.drop_index('ix_appointments_technician_id', table_name='appointments')
+
+
+def downgrade() -> None:
+    if not _has_technician_index():
+        op.create_index('ix_appointments_technician_id', 'appointments', ['technician_id'], unique=False)
@@ -0,0 +1,31 @@
+"""Add catalog_versions write counters for catalog ETags
+
+Revision ID: f3b8c2d6e4a1
+Revises: e7a9d4c1b8f2
+Create Date: 2026-10-19 11:40:22.583019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8c2d6e4a1'
+down_revision: Union[str, None] = 'e7a9d4c1b8f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('catalog_versions',
+    sa.Column('resource', sa.String(length=20), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('resource')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('catalog_versions')
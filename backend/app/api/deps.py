@@ -4,7 +4,7 @@ API dependencies
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, get_async_db
 from app.core.security import decode_token, verify_token_type
 from app.crud import user as crud_user
 from app.models.user import User
@@ -14,13 +14,16 @@ from app.models.user import User
 security = HTTPBearer()
 
 
-async def get_current_user(
+def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
     """
     Get current authenticated user
     
+    Declared as a plain function so FastAPI runs the DB lookup in its
+    threadpool instead of on the event loop.
+    
     Args:
         credentials: HTTP Bearer token credentials
         db: Database session
@@ -51,8 +54,8 @@ async def get_current_user(
             detail="Could not validate credentials"
         )
     
-    # Get user from database
-    user = crud_user.get(db, id=int(user_id))
+    # Get user from the user cache, falling back to the database
+    user = crud_user.get_cached(db, id=int(user_id))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
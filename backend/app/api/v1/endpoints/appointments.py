@@ -1,15 +1,17 @@
 """
 Appointments API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.api.deps import get_db, get_current_user
 from app.crud import appointment as crud_appointment
+from app.core.metrics import query_budget
 from app.schemas.appointment import (
     Appointment,
     AppointmentCreate,
+    AppointmentBatchCreate,
     AppointmentUpdate,
     AppointmentWithDetails
 )
@@ -20,6 +22,7 @@ router = APIRouter()
 
 
 @router.post("/", response_model=Appointment)
+@query_budget(7)  # user, day lock, service, conflict check, INSERT, rollup, reload
 def create_appointment(
     appointment: AppointmentCreate,
     db: Session = Depends(get_db),
@@ -28,8 +31,28 @@ def create_appointment(
     """
     Create a new appointment (requires authentication)
     """
+    from app.crud import service as crud_service
+    
     user_id = current_user.id
     
+    # Serialize bookings of the technician's day so two requests cannot both
+    # pass the conflict check; the lock must open a fresh transaction and is
+    # released by the commit in create_appointment (or the session rollback).
+    # Bookings without a technician are not locked (see lock_technician_day)
+    if appointment.technician_id:
+        db.rollback()
+        crud_appointment.lock_technician_day(
+            db,
+            technician_id=appointment.technician_id,
+            lock_date=appointment.appointment_date
+        )
+    
+    # Load the service once for the conflict check and the booking; it must
+    # belong to the booked store, whose daily rollup the appointment joins
+    service = crud_service.get_service(db, service_id=appointment.service_id)
+    if not service or service.store_id != appointment.store_id:
+        raise HTTPException(status_code=400, detail="Service not found")
+    
     # Check for conflicts using improved conflict checker
     conflict_result = crud_appointment.check_time_conflict(
         db,
@@ -37,7 +60,8 @@ def create_appointment(
         appointment_time=appointment.appointment_time,
         service_id=appointment.service_id,
         technician_id=appointment.technician_id,
-        user_id=user_id
+        user_id=user_id,
+        duration_minutes=service.duration_minutes
     )
     
     if conflict_result["has_conflict"]:
@@ -49,28 +73,99 @@ def create_appointment(
     db_appointment = crud_appointment.create_appointment(
         db,
         appointment=appointment,
-        user_id=user_id
+        user_id=user_id,
+        service=service
     )
     return db_appointment
 
 
+@router.post("/batch", response_model=List[Appointment])
+@query_budget(25)  # 5 + 2 per appointment (day lock, INSERT), for the maximum batch of 10
+def create_appointments_batch(
+    batch: AppointmentBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Create a group booking (requires authentication)
+    
+    All requested appointments are validated against each other and against
+    existing bookings, then created in one transaction: the whole group
+    succeeds or fails together.
+    """
+    from app.crud import service as crud_service
+    
+    user_id = current_user.id
+    appointments = batch.appointments
+    
+    # Lock every technician day involved, in a fixed order so two group
+    # bookings sharing technicians cannot deadlock
+    technician_days = sorted({
+        (appointment.technician_id, appointment.appointment_date)
+        for appointment in appointments
+        if appointment.technician_id
+    })
+    if technician_days:
+        db.rollback()
+        for technician_id, lock_date in technician_days:
+            crud_appointment.lock_technician_day(db, technician_id=technician_id, lock_date=lock_date)
+    
+    services = crud_service.get_services_by_ids(db, [appointment.service_id for appointment in appointments])
+    
+    conflict_result = crud_appointment.check_batch_conflicts(
+        db,
+        appointments=appointments,
+        user_id=user_id,
+        services=services
+    )
+    if conflict_result["has_conflict"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Appointment {conflict_result['index'] + 1}: {conflict_result['message']}"
+        )
+    
+    return crud_appointment.create_appointments_batch(
+        db,
+        appointments=appointments,
+        user_id=user_id,
+        services=services
+    )
+
+
 @router.get("/", response_model=List[AppointmentWithDetails])
+@query_budget(2)
 def get_my_appointments(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, description="Deprecated offset pagination, prefer cursor"),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     current_user: UserResponse = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Get current user's appointments with details (requires authentication)
+    
+    When a page is full, the X-Next-Cursor response header holds the cursor
+    of the next page.
     """
+    after = None
+    if cursor:
+        try:
+            after = crud_appointment.decode_appointment_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
     appointments_data = crud_appointment.get_user_appointments_with_details(
         db,
         user_id=current_user.id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        after=after
     )
     
+    if len(appointments_data) == limit:
+        response.headers["X-Next-Cursor"] = crud_appointment.appointment_cursor(appointments_data[-1][0])
+    
     # Format response
     result = []
     for appt, store_name, service_name, service_price, service_duration in appointments_data:
@@ -86,6 +181,7 @@ def get_my_appointments(
 
 
 @router.get("/{appointment_id}", response_model=Appointment)
+@query_budget(2)
 def get_appointment(
     appointment_id: int,
     current_user: UserResponse = Depends(get_current_user),
@@ -107,6 +203,7 @@ def get_appointment(
 
 
 @router.patch("/{appointment_id}", response_model=Appointment)
+@query_budget(8)  # user, appointment, day lock, re-read, conflict check, rollup, UPDATE, reload
 def update_appointment(
     appointment_id: int,
     appointment_update: AppointmentUpdate,
@@ -115,6 +212,10 @@ def update_appointment(
 ):
     """
     Update appointment (requires authentication)
+    
+    Moving an active appointment to another date or time takes the
+    technician-day lock of the new date and runs the same conflict check as
+    a new booking, excluding the appointment itself.
     """
     appointment = crud_appointment.get_appointment(db, appointment_id=appointment_id)
     
@@ -125,16 +226,56 @@ def update_appointment(
     if appointment.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to modify this appointment")
     
+    update_data = appointment_update.dict(exclude_unset=True)
+    new_date = update_data.get("appointment_date") or appointment.appointment_date
+    new_time = update_data.get("appointment_time") or appointment.appointment_time
+    new_status = update_data.get("status") or appointment.status
+    rescheduled = (new_date, new_time) != (appointment.appointment_date, appointment.appointment_time)
+    
+    if rescheduled and new_status in (AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED):
+        # Same serialization as create_appointment; the rollback expires the
+        # appointment, so it is read again under the lock
+        technician_id = appointment.technician_id
+        if technician_id:
+            db.rollback()
+            crud_appointment.lock_technician_day(
+                db,
+                technician_id=technician_id,
+                lock_date=new_date
+            )
+            appointment = crud_appointment.get_appointment(db, appointment_id=appointment_id)
+            if not appointment:
+                raise HTTPException(status_code=404, detail="Appointment not found")
+        
+        conflict_result = crud_appointment.check_time_conflict(
+            db,
+            appointment_date=new_date,
+            appointment_time=new_time,
+            service_id=appointment.service_id,
+            technician_id=appointment.technician_id,
+            user_id=appointment.user_id,
+            exclude_appointment_id=appointment.id,
+            duration_minutes=appointment.duration_minutes
+        )
+        
+        if conflict_result["has_conflict"]:
+            raise HTTPException(
+                status_code=400,
+                detail=conflict_result["message"]
+            )
+    
     updated_appointment = crud_appointment.update_appointment(
         db,
         appointment_id=appointment_id,
-        appointment=appointment_update
+        appointment=appointment_update,
+        db_appointment=appointment
     )
     
     return updated_appointment
 
 
 @router.delete("/{appointment_id}", response_model=Appointment)
+@query_budget(5)  # user, appointment, rollup, UPDATE, reload
 def cancel_appointment(
     appointment_id: int,
     current_user: UserResponse = Depends(get_current_user),
@@ -152,12 +293,17 @@ def cancel_appointment(
     if appointment.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to cancel this appointment")
     
-    cancelled_appointment = crud_appointment.cancel_appointment(db, appointment_id=appointment_id)
+    cancelled_appointment = crud_appointment.cancel_appointment(
+        db,
+        appointment_id=appointment_id,
+        db_appointment=appointment
+    )
     
     return cancelled_appointment
 
 
 @router.patch("/{appointment_id}/confirm", response_model=Appointment)
+@query_budget(5)  # user, appointment, rollup, UPDATE, reload
 def confirm_appointment(
     appointment_id: int,
     db: Session = Depends(get_db),
@@ -169,9 +315,6 @@ def confirm_appointment(
     - Super admin can confirm appointments from any store
     - Store manager can only confirm appointments from their own store
     """
-    from app.models.service import Service
-    from app.api.deps import get_current_store_admin
-    
     # Verify user is store admin
     if not current_user.is_admin and not current_user.store_id:
         raise HTTPException(
@@ -184,14 +327,9 @@ def confirm_appointment(
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
-    # Get service to check store ownership
-    service = db.query(Service).filter(Service.id == appointment.service_id).first()
-    if not service:
-        raise HTTPException(status_code=404, detail="Service not found")
-    
     # If user is store manager (not super admin), enforce store ownership
     if not current_user.is_admin:
-        if service.store_id != current_user.store_id:
+        if appointment.store_id != current_user.store_id:
             raise HTTPException(
                 status_code=403,
                 detail="You can only confirm appointments from your own store"
@@ -204,6 +342,12 @@ def confirm_appointment(
             detail="Cannot confirm a cancelled appointment"
         )
     
+    if appointment.status == AppointmentStatus.EXPIRED:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot confirm an expired appointment"
+        )
+    
     if appointment.status == AppointmentStatus.COMPLETED:
         raise HTTPException(
             status_code=400,
@@ -214,13 +358,15 @@ def confirm_appointment(
     updated_appointment = crud_appointment.update_appointment(
         db,
         appointment_id=appointment_id,
-        appointment=AppointmentUpdate(status=AppointmentStatus.CONFIRMED)
+        appointment=AppointmentUpdate(status=AppointmentStatus.CONFIRMED),
+        db_appointment=appointment
     )
     
     return updated_appointment
 
 
 @router.patch("/{appointment_id}/complete", response_model=Appointment)
+@query_budget(5)  # user, appointment, rollup, UPDATE, reload
 def complete_appointment(
     appointment_id: int,
     db: Session = Depends(get_db),
@@ -232,8 +378,6 @@ def complete_appointment(
     - Super admin can complete appointments from any store
     - Store manager can only complete appointments from their own store
     """
-    from app.models.service import Service
-    
     # Verify user is store admin
     if not current_user.is_admin and not current_user.store_id:
         raise HTTPException(
@@ -246,14 +390,9 @@ def complete_appointment(
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
-    # Get service to check store ownership
-    service = db.query(Service).filter(Service.id == appointment.service_id).first()
-    if not service:
-        raise HTTPException(status_code=404, detail="Service not found")
-    
     # If user is store manager (not super admin), enforce store ownership
     if not current_user.is_admin:
-        if service.store_id != current_user.store_id:
+        if appointment.store_id != current_user.store_id:
             raise HTTPException(
                 status_code=403,
                 detail="You can only complete appointments from your own store"
@@ -266,6 +405,12 @@ def complete_appointment(
             detail="Cannot complete a cancelled appointment"
         )
     
+    if appointment.status == AppointmentStatus.EXPIRED:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot complete an expired appointment"
+        )
+    
     if appointment.status == AppointmentStatus.COMPLETED:
         raise HTTPException(
             status_code=400,
@@ -276,7 +421,8 @@ def complete_appointment(
     updated_appointment = crud_appointment.update_appointment(
         db,
         appointment_id=appointment_id,
-        appointment=AppointmentUpdate(status=AppointmentStatus.COMPLETED)
+        appointment=AppointmentUpdate(status=AppointmentStatus.COMPLETED),
+        db_appointment=appointment
     )
     
     return updated_appointment
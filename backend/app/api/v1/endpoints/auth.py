@@ -1,25 +1,58 @@
 """
 Authentication API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, SessionLocal
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
 from app.schemas.verification import SendVerificationCodeRequest, VerifyCodeRequest, SendVerificationCodeResponse
 from app.crud import user as crud_user
 from app.crud import verification_code as crud_verification
-from app.core.security import create_access_token, create_refresh_token, verify_password
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    verify_password_async,
+    dummy_verify_password_async,
+    get_password_hash_async,
+    password_needs_rehash
+)
 from app.core.config import settings
+from app.core.rate_limit import rate_limit
+from app.core.metrics import query_budget
+from app.core.phone_filter import get_phone_filter
 from app.api.deps import get_current_user
 from app.models.user import User
 import os
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# Checked before the handlers touch the database or hash a password
+send_code_limit = rate_limit(
+    "send-code",
+    per_ip=settings.RATE_LIMIT_SEND_CODE_PER_IP,
+    per_phone=settings.RATE_LIMIT_SEND_CODE_PER_PHONE
+)
+verify_code_limit = rate_limit(
+    "verify-code",
+    per_ip=settings.RATE_LIMIT_VERIFY_CODE_PER_IP,
+    per_phone=settings.RATE_LIMIT_VERIFY_CODE_PER_PHONE
+)
+login_limit = rate_limit(
+    "login",
+    per_ip=settings.RATE_LIMIT_LOGIN_PER_IP,
+    per_phone=settings.RATE_LIMIT_LOGIN_PER_PHONE
+)
+
 
-@router.post("/send-verification-code", response_model=SendVerificationCodeResponse)
-async def send_verification_code(
+@router.post("/send-verification-code", response_model=SendVerificationCodeResponse, dependencies=[Depends(send_code_limit)])
+@query_budget(2)
+def send_verification_code(
     request: SendVerificationCodeRequest,
     db: Session = Depends(get_db)
 ):
@@ -35,7 +68,8 @@ async def send_verification_code(
         
     Note:
         In production, this should integrate with SMS service (Twilio, etc.)
-        For now, the code is stored in database and can be retrieved for testing
+        For now, the code is stored in database (or the configured code store)
+        and can be retrieved for testing
     """
     # Create verification code
     verification = crud_verification.create_verification_code(
@@ -60,12 +94,13 @@ async def send_verification_code(
     
     return {
         "message": message,
-        "expires_in": 600  # 10 minutes in seconds
+        "expires_in": settings.VERIFICATION_CODE_EXPIRE_MINUTES * 60
     }
 
 
-@router.post("/verify-code")
-async def verify_code(
+@router.post("/verify-code", dependencies=[Depends(verify_code_limit)])
+@query_budget(1)
+def verify_code(
     request: VerifyCodeRequest,
     db: Session = Depends(get_db)
 ):
@@ -92,7 +127,8 @@ async def verify_code(
         return {"valid": False, "message": "Invalid or expired verification code"}
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(verify_code_limit)])
+@query_budget(7)
 async def register(
     user_in: UserCreate,
     db: Session = Depends(get_db)
@@ -111,7 +147,8 @@ async def register(
         HTTPException: If phone/username already exists or verification code is invalid
     """
     # Verify the verification code first
-    is_valid = crud_verification.verify_code(
+    is_valid = await run_in_threadpool(
+        crud_verification.verify_code,
         db,
         phone=user_in.phone,
         code=user_in.verification_code,
@@ -125,7 +162,7 @@ async def register(
         )
     
     # Check if phone already exists
-    existing_user = crud_user.get_by_phone(db, phone=user_in.phone)
+    existing_user = await run_in_threadpool(crud_user.get_by_phone, db, phone=user_in.phone)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -133,7 +170,7 @@ async def register(
         )
     
     # Check if username already exists
-    existing_username = crud_user.get_by_username(db, username=user_in.username)
+    existing_username = await run_in_threadpool(crud_user.get_by_username, db, username=user_in.username)
     if existing_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -142,31 +179,64 @@ async def register(
     
     # Check if email already exists (if provided)
     if user_in.email:
-        existing_email = crud_user.get_by_email(db, email=user_in.email)
+        existing_email = await run_in_threadpool(crud_user.get_by_email, db, email=user_in.email)
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
     
-    # Mark verification code as used
-    crud_verification.mark_as_used(db, phone=user_in.phone, code=user_in.verification_code)
+    # Hash the password on the dedicated pool
+    password_hash = await get_password_hash_async(user_in.password)
+    
+    # Use up the verification code (fails if a concurrent request got it first)
+    consumed = await run_in_threadpool(
+        crud_verification.consume_code,
+        db,
+        phone=user_in.phone,
+        code=user_in.verification_code,
+        code_type="register"
+    )
+    if not consumed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or expired verification code"
+        )
     
     # Create new user with phone_verified=True
-    user = crud_user.create(db, obj_in=user_in)
+    user = await run_in_threadpool(crud_user.create, db, obj_in=user_in, password_hash=password_hash)
     return user
 
 
-@router.post("/login", response_model=Token)
+async def _rehash_password(user_id: int, password: str, old_hash: str) -> None:
+    """Upgrade a password hash to the current hashing settings after a successful login"""
+    try:
+        new_hash = await get_password_hash_async(password)
+        db = SessionLocal()
+        try:
+            await run_in_threadpool(crud_user.rehash_password, db, user_id, old_hash, new_hash)
+        finally:
+            db.close()
+    except Exception:
+        logger.exception("Password rehash failed for user %s", user_id)
+
+
+@router.post("/login", response_model=Token, dependencies=[Depends(login_limit)])
+@query_budget(2)  # Lookup, plus the background rehash of an outdated hash
 async def login(
     user_credentials: UserLogin,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
     User login with phone number
     
+    A password hashed with an outdated scheme or cost is re-hashed after the
+    response has been sent.
+    
     Args:
         user_credentials: User login credentials (phone, password)
+        background_tasks: Tasks run after the response
         db: Database session
         
     Returns:
@@ -175,16 +245,22 @@ async def login(
     Raises:
         HTTPException: If credentials are invalid
     """
-    # Get user by phone
-    user = crud_user.get_by_phone(db, phone=user_credentials.phone)
+    # Get user by phone, skipping the lookup for phones known not to be registered
+    user = None
+    phone_filter = get_phone_filter()
+    if phone_filter is None or phone_filter.might_contain(user_credentials.phone):
+        user = await run_in_threadpool(crud_user.get_by_phone, db, phone=user_credentials.phone)
     if not user:
+        # Answer as slowly as a wrong password, so response times do not reveal
+        # whether the phone is registered
+        await dummy_verify_password_async()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect phone number or password"
         )
     
     # Verify password
-    if not verify_password(user_credentials.password, user.password_hash):
+    if not await verify_password_async(user_credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect phone number or password"
@@ -197,6 +273,9 @@ async def login(
             detail="User account is inactive"
         )
     
+    if password_needs_rehash(user.password_hash):
+        background_tasks.add_task(_rehash_password, user.id, user_credentials.password, user.password_hash)
+    
     # Create tokens
     access_token = create_access_token(data={"sub": str(user.id), "phone": user.phone})
     refresh_token = create_refresh_token(data={"sub": str(user.id)})
@@ -209,6 +288,7 @@ async def login(
 
 
 @router.get("/me", response_model=UserResponse)
+@query_budget(1)
 async def get_current_user_info(
     current_user: User = Depends(get_current_user)
 ):
@@ -225,7 +305,8 @@ async def get_current_user_info(
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(
+@query_budget(1)
+def refresh_token(
     refresh_token: str,
     db: Session = Depends(get_db)
 ):
@@ -1,25 +1,30 @@
 """
 Services API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.api.deps import get_db, get_current_admin_user, get_current_store_admin
+from app.api.deps import get_db, get_async_db, get_current_admin_user, get_current_store_admin
 from app.models.user import User
 from app.crud import service as crud_service
+from app.core import catalog_cache
+from app.core.metrics import query_budget
 from app.schemas.service import Service, ServiceCreate, ServiceUpdate
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Service])
-def get_services(
+@query_budget(3)
+async def get_services(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     store_id: Optional[int] = None,
     category: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get list of services with optional filters
@@ -29,41 +34,61 @@ def get_services(
     - **store_id**: Filter by store ID
     - **category**: Filter by service category
     """
-    services = crud_service.get_services(
-        db,
-        skip=skip,
-        limit=limit,
-        store_id=store_id,
-        category=category
-    )
-    return services
+    async def load():
+        return await crud_service.get_services_async(
+            db,
+            skip=skip,
+            limit=limit,
+            store_id=store_id,
+            category=category
+        )
+    
+    async def version():
+        return await crud_service.get_services_version_async(db, store_id=store_id, category=category)
+    
+    return await catalog_cache.cached_response(request, db, catalog_cache.SERVICES, List[Service], load, version)
 
 
 @router.get("/categories", response_model=List[str])
-def get_service_categories(db: Session = Depends(get_db)):
+@query_budget(3)
+async def get_service_categories(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Get list of all service categories
     """
-    categories = crud_service.get_service_categories(db)
-    return categories
+    async def load():
+        return await crud_service.get_service_categories_async(db)
+    
+    async def version():
+        return await crud_service.get_service_categories_version_async(db)
+    
+    return await catalog_cache.cached_response(request, db, catalog_cache.SERVICES, List[str], load, version)
 
 
 @router.get("/{service_id}", response_model=Service)
-def get_service(
+@query_budget(3)
+async def get_service(
     service_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get service details by ID
     """
-    service = crud_service.get_service(db, service_id=service_id)
-    if not service:
-        raise HTTPException(status_code=404, detail="Service not found")
+    async def load():
+        service = await crud_service.get_service_async(db, service_id=service_id)
+        if not service:
+            raise HTTPException(status_code=404, detail="Service not found")
+        
+        return service
+    
+    async def version():
+        return await crud_service.get_service_version_async(db, service_id=service_id)
     
-    return service
+    return await catalog_cache.cached_response(request, db, catalog_cache.SERVICES, Service, load, version)
 
 
 @router.post("/", response_model=Service, status_code=201)
+@query_budget(4)
 def create_service(
     service: ServiceCreate,
     db: Session = Depends(get_db),
@@ -88,6 +113,7 @@ def create_service(
 
 
 @router.patch("/{service_id}", response_model=Service)
+@query_budget(6)
 def update_service(
     service_id: int,
     service: ServiceUpdate,
@@ -118,6 +144,7 @@ def update_service(
 
 
 @router.delete("/{service_id}", status_code=204)
+@query_budget(5)
 def delete_service(
     service_id: int,
     db: Session = Depends(get_db),
@@ -146,6 +173,7 @@ def delete_service(
 
 
 @router.patch("/{service_id}/availability", response_model=Service)
+@query_budget(6)
 def toggle_service_availability(
     service_id: int,
     is_active: int = Query(..., ge=0, le=1, description="0 for inactive, 1 for active"),
@@ -1,26 +1,38 @@
 """
 Stores API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.api.deps import get_db, get_current_admin_user, get_current_store_admin
+from app.api.deps import get_db, get_async_db, get_current_admin_user, get_current_store_admin
 from app.models.user import User
 from app.crud import store as crud_store, service as crud_service
+from app.core import catalog_cache
+from app.core.metrics import query_budget
 from app.schemas.store import Store, StoreWithImages, StoreImage, StoreCreate, StoreUpdate, StoreImageCreate
 from app.schemas.service import Service
+from app.schemas.appointment import AppointmentBulkStatusUpdate
 
 router = APIRouter()
 
+# Maximum number of days returned by the availability endpoint
+MAX_AVAILABILITY_DAYS = 31
+
+# Maximum number of extra date windows accepted by the stats endpoint
+MAX_STATS_WINDOWS = 12
+
 
 @router.get("/", response_model=List[Store])
-def get_stores(
+@query_budget(3)
+async def get_stores(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     city: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get list of stores with optional filters
@@ -30,67 +42,186 @@ def get_stores(
     - **city**: Filter by city name
     - **search**: Search in store name and address
     """
-    stores = crud_store.get_stores(db, skip=skip, limit=limit, city=city, search=search)
-    return stores
+    async def load():
+        return await crud_store.get_stores_async(db, skip=skip, limit=limit, city=city, search=search)
+    
+    async def version():
+        return await crud_store.get_stores_version_async(db, city=city, search=search)
+    
+    return await catalog_cache.cached_response(request, db, catalog_cache.STORES, List[Store], load, version)
 
 
 @router.get("/{store_id}", response_model=StoreWithImages)
-def get_store(
+@query_budget(5)
+async def get_store(
     store_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get store details by ID including images
     """
-    store = crud_store.get_store(db, store_id=store_id)
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
-    
-    # Get store images
-    images = crud_store.get_store_images(db, store_id=store_id)
+    async def load():
+        store = await crud_store.get_store_async(db, store_id=store_id)
+        if not store:
+            raise HTTPException(status_code=404, detail="Store not found")
+        
+        # Get store images
+        images = await crud_store.get_store_images_async(db, store_id=store_id)
+        
+        # Convert to response model
+        return {
+            **store.__dict__,
+            "images": images
+        }
     
-    # Convert to response model
-    store_dict = {
-        **store.__dict__,
-        "images": images
-    }
+    async def version():
+        return await crud_store.get_store_version_async(db, store_id=store_id)
     
-    return store_dict
+    return await catalog_cache.cached_response(request, db, catalog_cache.STORES, StoreWithImages, load, version)
 
 
 @router.get("/{store_id}/images", response_model=List[StoreImage])
-def get_store_images(
+@query_budget(4)
+async def get_store_images(
     store_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get store images
     """
-    store = crud_store.get_store(db, store_id=store_id)
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
+    async def load():
+        store = await crud_store.get_store_async(db, store_id=store_id)
+        if not store:
+            raise HTTPException(status_code=404, detail="Store not found")
+        
+        return await crud_store.get_store_images_async(db, store_id=store_id)
+    
+    async def version():
+        return await crud_store.get_store_images_version_async(db, store_id=store_id)
     
-    images = crud_store.get_store_images(db, store_id=store_id)
-    return images
+    return await catalog_cache.cached_response(request, db, catalog_cache.STORES, List[StoreImage], load, version)
 
 
 @router.get("/{store_id}/services", response_model=List[Service])
-def get_store_services(
+@query_budget(4)
+async def get_store_services(
     store_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all services offered by a store
     """
+    async def load():
+        store = await crud_store.get_store_async(db, store_id=store_id)
+        if not store:
+            raise HTTPException(status_code=404, detail="Store not found")
+        
+        return await crud_service.get_store_services_async(db, store_id=store_id)
+    
+    async def version():
+        return await crud_service.get_services_version_async(db, store_id=store_id)
+    
+    return await catalog_cache.cached_response(request, db, catalog_cache.SERVICES, List[Service], load, version)
+
+
+@router.get("/{store_id}/availability", response_model=dict)
+@query_budget(4)
+def get_store_availability(
+    store_id: int,
+    date_from: str = Query(..., alias="from", description="First date to check (YYYY-MM-DD)"),
+    date_to: str = Query(..., alias="to", description="Last date to check, inclusive (YYYY-MM-DD)"),
+    service_id: int = Query(..., description="Service ID to calculate duration"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get available time slots for every technician of a store over a date range
+    
+    All active appointments in the range are loaded with a single query and the
+    free slots are computed in memory. The response is a matrix keyed by
+    technician ID and date, listing slot start times (HH:MM).
+    """
+    from app.crud import technician as crud_technician, appointment as crud_appointment
+    from app.core.availability import (
+        busy_intervals,
+        find_free_slots,
+        STORE_OPEN_TIME,
+        STORE_CLOSE_TIME,
+        SLOT_INTERVAL_MINUTES
+    )
+    from datetime import datetime, timedelta
+    from collections import defaultdict
+    
+    # Check if store exists
     store = crud_store.get_store(db, store_id=store_id)
     if not store:
         raise HTTPException(status_code=404, detail="Store not found")
     
-    services = crud_service.get_store_services(db, store_id=store_id)
-    return services
+    # Check if service exists and belongs to the store
+    service = crud_service.get_service(db, service_id=service_id)
+    if not service or service.store_id != store_id:
+        raise HTTPException(status_code=404, detail="Service not found")
+    
+    # Parse date range
+    try:
+        start_date = datetime.strptime(date_from, "%Y-%m-%d").date()
+        end_date = datetime.strptime(date_to, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    
+    if (end_date - start_date).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date range cannot exceed {MAX_AVAILABILITY_DAYS} days"
+        )
+    
+    technicians = crud_technician.get_store_technicians(db, store_id=store_id)
+    technician_ids = [technician.id for technician in technicians]
+    
+    # Group every active appointment in the range by technician and date
+    busy_rows = defaultdict(list)
+    rows = crud_appointment.get_technician_busy_rows(
+        db,
+        technician_ids=technician_ids,
+        start_date=start_date,
+        end_date=end_date
+    )
+    for technician_id, appointment_date, appointment_time, duration_minutes in rows:
+        busy_rows[(technician_id, appointment_date)].append((appointment_time, duration_minutes))
+    
+    duration = timedelta(minutes=service.duration_minutes)
+    step = timedelta(minutes=SLOT_INTERVAL_MINUTES)
+    dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    
+    slots = {}
+    for technician_id in technician_ids:
+        slots[technician_id] = {}
+        for day in dates:
+            free = find_free_slots(
+                busy_intervals(day, busy_rows.get((technician_id, day), [])),
+                day_start=datetime.combine(day, STORE_OPEN_TIME),
+                day_end=datetime.combine(day, STORE_CLOSE_TIME),
+                duration=duration,
+                step=step
+            )
+            slots[technician_id][day.isoformat()] = [slot_start.strftime("%H:%M") for slot_start, _ in free]
+    
+    return {
+        "store_id": store_id,
+        "service_id": service_id,
+        "duration_minutes": service.duration_minutes,
+        "slot_interval_minutes": SLOT_INTERVAL_MINUTES,
+        "technicians": slots
+    }
 
 
 @router.post("/", response_model=Store, status_code=201)
+@query_budget(4)
 def create_store(
     store: StoreCreate,
     db: Session = Depends(get_db),
@@ -106,6 +237,7 @@ def create_store(
 
 
 @router.patch("/{store_id}", response_model=Store)
+@query_budget(5)
 def update_store(
     store_id: int,
     store: StoreUpdate,
@@ -133,6 +265,7 @@ def update_store(
 
 
 @router.delete("/{store_id}", status_code=204)
+@query_budget(8)
 def delete_store(
     store_id: int,
     db: Session = Depends(get_db),
@@ -152,6 +285,7 @@ def delete_store(
 
 
 @router.post("/{store_id}/images", response_model=StoreImage, status_code=201)
+@query_budget(5)
 def create_store_image(
     store_id: int,
     image_url: str,
@@ -189,6 +323,7 @@ def create_store_image(
 
 
 @router.delete("/{store_id}/images/{image_id}", status_code=204)
+@query_budget(4)  # user, image, DELETE, catalog version
 def delete_store_image(
     store_id: int,
     image_id: int,
@@ -200,11 +335,10 @@ def delete_store_image(
     
     - Super admin can delete images from any store
     - Store manager can only delete images from their own store
-    """
-    store = crud_store.get_store(db, store_id=store_id)
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
     
+    The image is looked up within the store, so a missing store is reported
+    as a missing image.
+    """
     # If user is store manager (not super admin), enforce store ownership
     if not current_user.is_admin:
         if current_user.store_id != store_id:
@@ -221,25 +355,31 @@ def delete_store_image(
 
 
 @router.get("/{store_id}/appointments", response_model=List[dict])
+@query_budget(3)
 def get_store_appointments(
     store_id: int,
+    response: Response,
     date: Optional[str] = Query(None, description="Filter by date (YYYY-MM-DD)"),
     status: Optional[str] = Query(None, description="Filter by status"),
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0, description="Deprecated offset pagination, prefer cursor"),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_store_admin)
 ):
     """
-    Get store's appointments (Store admin only)
+    Get store's appointments (Store admin only), newest first
     
     - Super admin can view appointments from any store
     - Store manager can only view appointments from their own store
+    - When a page is full, the X-Next-Cursor response header holds the cursor of the next page
     """
     from app.models.appointment import Appointment, AppointmentStatus
     from app.models.service import Service
     from app.models.technician import Technician
     from app.models.user import User as UserModel
+    from app.crud import appointment as crud_appointment
+    from app.core.pagination import keyset
     from datetime import datetime
     
     # Check if store exists
@@ -259,7 +399,7 @@ def get_store_appointments(
     query = db.query(
         Appointment,
         Service.name.label('service_name'),
-        Service.duration_minutes.label('duration'),
+        Appointment.duration_minutes.label('duration'),
         Technician.name.label('technician_name'),
         UserModel.username.label('customer_name'),
         UserModel.phone.label('customer_phone')
@@ -270,6 +410,7 @@ def get_store_appointments(
     ).join(
         UserModel, Appointment.user_id == UserModel.id
     ).filter(
+        Appointment.store_id == store_id,
         Service.store_id == store_id
     )
     
@@ -288,12 +429,24 @@ def get_store_appointments(
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid status. Use: {', '.join([s.value for s in AppointmentStatus])}")
     
-    # Execute query with pagination
-    appointments = query.order_by(
-        Appointment.appointment_date.desc(),
-        Appointment.appointment_time.desc()
+    after = None
+    if cursor:
+        try:
+            after = crud_appointment.decode_appointment_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    # Execute query with keyset pagination
+    appointments = keyset(
+        query,
+        crud_appointment.APPOINTMENT_SORT_KEY,
+        after=after,
+        descending=True
     ).offset(skip).limit(limit).all()
     
+    if len(appointments) == limit:
+        response.headers["X-Next-Cursor"] = crud_appointment.appointment_cursor(appointments[-1][0])
+    
     # Format response
     result = []
     for appt, service_name, duration, tech_name, cust_name, cust_phone in appointments:
@@ -314,21 +467,93 @@ def get_store_appointments(
     return result
 
 
+@router.post("/{store_id}/appointments/bulk-status", response_model=dict)
+@query_budget(5)
+def bulk_update_appointment_status(
+    store_id: int,
+    update: AppointmentBulkStatusUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_store_admin)
+):
+    """
+    Confirm or complete many appointments at once (Store admin only)
+    
+    - Pass either **appointment_ids** or **appointment_date** (every appointment of that day)
+    - **status**: confirmed or completed
+    - Only pending or confirmed appointments of this store change; cancelled and
+      completed ones are reported as skipped
+    """
+    from app.crud import appointment as crud_appointment
+    from app.models.appointment import AppointmentStatus
+    
+    # Check if store exists
+    store = crud_store.get_store(db, store_id=store_id)
+    if not store:
+        raise HTTPException(status_code=404, detail="Store not found")
+    
+    # If user is store manager (not super admin), enforce store ownership
+    if not current_user.is_admin:
+        if store_id != current_user.store_id:
+            raise HTTPException(
+                status_code=403,
+                detail="You can only update appointments from your own store"
+            )
+    
+    if (update.appointment_ids is None) == (update.appointment_date is None):
+        raise HTTPException(
+            status_code=400,
+            detail="Provide either appointment_ids or appointment_date"
+        )
+    
+    if update.status not in (AppointmentStatus.CONFIRMED, AppointmentStatus.COMPLETED):
+        raise HTTPException(
+            status_code=400,
+            detail="Status must be confirmed or completed"
+        )
+    
+    updated_ids = crud_appointment.bulk_update_status(
+        db,
+        store_id=store_id,
+        status=update.status,
+        appointment_ids=update.appointment_ids,
+        appointment_date=update.appointment_date
+    )
+    
+    result = {
+        "status": update.status.value,
+        "updated": len(updated_ids),
+        "updated_ids": updated_ids
+    }
+    if update.appointment_ids is not None:
+        updated = set(updated_ids)
+        result["skipped_ids"] = [
+            appointment_id for appointment_id in dict.fromkeys(update.appointment_ids)
+            if appointment_id not in updated
+        ]
+    
+    return result
+
+
 @router.get("/{store_id}/appointments/stats", response_model=dict)
+@query_budget(3)
 def get_store_appointment_stats(
     store_id: int,
+    window: Optional[List[str]] = Query(
+        None,
+        description="Extra date window(s) as YYYY-MM-DD:YYYY-MM-DD (repeatable)"
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_store_admin)
 ):
     """
     Get store's appointment statistics (Store admin only)
     
-    Returns statistics for today, this week, and this month
+    Returns statistics for today, this week, and this month, plus any extra
+    windows requested via `window`. All windows are read from the
+    store_daily_stats rollup in a single query.
     """
-    from app.models.appointment import Appointment, AppointmentStatus
-    from app.models.service import Service
+    from app.crud import store_daily_stats as crud_stats
     from datetime import datetime, date, timedelta
-    from sqlalchemy import func
     
     # Check if store exists
     store = crud_store.get_store(db, store_id=store_id)
@@ -348,75 +573,42 @@ def get_store_appointment_stats(
     week_start = today - timedelta(days=today.weekday())  # Monday of current week
     month_start = today.replace(day=1)
     
-    # Base query
-    base_query = db.query(Appointment).join(
-        Service, Appointment.service_id == Service.id
-    ).filter(
-        Service.store_id == store_id
-    )
+    windows = {
+        "today": (today, today),
+        "this_week": (week_start, None),
+        "this_month": (month_start, None)
+    }
     
-    # Today's stats
-    today_total = base_query.filter(Appointment.appointment_date == today).count()
-    today_pending = base_query.filter(
-        Appointment.appointment_date == today,
-        Appointment.status == AppointmentStatus.PENDING
-    ).count()
-    today_confirmed = base_query.filter(
-        Appointment.appointment_date == today,
-        Appointment.status == AppointmentStatus.CONFIRMED
-    ).count()
-    today_completed = base_query.filter(
-        Appointment.appointment_date == today,
-        Appointment.status == AppointmentStatus.COMPLETED
-    ).count()
-    
-    # This week's stats
-    week_total = base_query.filter(Appointment.appointment_date >= week_start).count()
-    week_pending = base_query.filter(
-        Appointment.appointment_date >= week_start,
-        Appointment.status == AppointmentStatus.PENDING
-    ).count()
-    week_confirmed = base_query.filter(
-        Appointment.appointment_date >= week_start,
-        Appointment.status == AppointmentStatus.CONFIRMED
-    ).count()
-    week_completed = base_query.filter(
-        Appointment.appointment_date >= week_start,
-        Appointment.status == AppointmentStatus.COMPLETED
-    ).count()
-    
-    # This month's stats
-    month_total = base_query.filter(Appointment.appointment_date >= month_start).count()
-    month_pending = base_query.filter(
-        Appointment.appointment_date >= month_start,
-        Appointment.status == AppointmentStatus.PENDING
-    ).count()
-    month_confirmed = base_query.filter(
-        Appointment.appointment_date >= month_start,
-        Appointment.status == AppointmentStatus.CONFIRMED
-    ).count()
-    month_completed = base_query.filter(
-        Appointment.appointment_date >= month_start,
-        Appointment.status == AppointmentStatus.COMPLETED
-    ).count()
+    # Parse extra windows
+    extra_windows = window or []
+    if len(extra_windows) > MAX_STATS_WINDOWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_STATS_WINDOWS} windows can be requested"
+        )
     
-    return {
-        "today": {
-            "total": today_total,
-            "pending": today_pending,
-            "confirmed": today_confirmed,
-            "completed": today_completed
-        },
-        "this_week": {
-            "total": week_total,
-            "pending": week_pending,
-            "confirmed": week_confirmed,
-            "completed": week_completed
-        },
-        "this_month": {
-            "total": month_total,
-            "pending": month_pending,
-            "confirmed": month_confirmed,
-            "completed": month_completed
-        }
+    for window_value in extra_windows:
+        try:
+            start_value, end_value = window_value.split(":")
+            start = datetime.strptime(start_value, "%Y-%m-%d").date()
+            end = datetime.strptime(end_value, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid window format. Use YYYY-MM-DD:YYYY-MM-DD"
+            )
+        if end < start:
+            raise HTTPException(status_code=400, detail="Window end must not be before its start")
+        windows[window_value] = (start, end)
+    
+    counts = crud_stats.get_status_totals(db, store_id=store_id, windows=windows)
+    
+    result = {
+        "today": counts["today"],
+        "this_week": counts["this_week"],
+        "this_month": counts["this_month"]
     }
+    if extra_windows:
+        result["windows"] = {name: counts[name] for name in extra_windows}
+    
+    return result
@@ -1,24 +1,29 @@
 """
 Technicians API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.api.deps import get_db, get_current_admin_user, get_current_store_admin
+from app.api.deps import get_db, get_async_db, get_current_admin_user, get_current_store_admin
 from app.models.user import User
 from app.crud import technician as crud_technician
+from app.core import catalog_cache
+from app.core.metrics import query_budget
 from app.schemas.technician import Technician, TechnicianCreate, TechnicianUpdate
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Technician])
-def get_technicians(
+@query_budget(3)
+async def get_technicians(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     store_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get list of technicians with optional filters
@@ -27,31 +32,45 @@ def get_technicians(
     - **limit**: Maximum number of records to return
     - **store_id**: Filter by store ID
     """
-    technicians = crud_technician.get_technicians(
-        db,
-        skip=skip,
-        limit=limit,
-        store_id=store_id
-    )
-    return technicians
+    async def load():
+        return await crud_technician.get_technicians_async(
+            db,
+            skip=skip,
+            limit=limit,
+            store_id=store_id
+        )
+    
+    async def version():
+        return await crud_technician.get_technicians_version_async(db, store_id=store_id)
+    
+    return await catalog_cache.cached_response(request, db, catalog_cache.TECHNICIANS, List[Technician], load, version)
 
 
 @router.get("/{technician_id}", response_model=Technician)
-def get_technician(
+@query_budget(3)
+async def get_technician(
     technician_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get technician details by ID
     """
-    technician = crud_technician.get_technician(db, technician_id=technician_id)
-    if not technician:
-        raise HTTPException(status_code=404, detail="Technician not found")
+    async def load():
+        technician = await crud_technician.get_technician_async(db, technician_id=technician_id)
+        if not technician:
+            raise HTTPException(status_code=404, detail="Technician not found")
+        
+        return technician
     
-    return technician
+    async def version():
+        return await crud_technician.get_technician_version_async(db, technician_id=technician_id)
+    
+    return await catalog_cache.cached_response(request, db, catalog_cache.TECHNICIANS, Technician, load, version)
 
 
 @router.post("/", response_model=Technician, status_code=201)
+@query_budget(4)
 def create_technician(
     technician: TechnicianCreate,
     db: Session = Depends(get_db),
@@ -76,6 +95,7 @@ def create_technician(
 
 
 @router.patch("/{technician_id}", response_model=Technician)
+@query_budget(6)
 def update_technician(
     technician_id: int,
     technician: TechnicianUpdate,
@@ -110,6 +130,7 @@ def update_technician(
 
 
 @router.delete("/{technician_id}", status_code=204)
+@query_budget(5)
 def delete_technician(
     technician_id: int,
     db: Session = Depends(get_db),
@@ -138,6 +159,7 @@ def delete_technician(
 
 
 @router.patch("/{technician_id}/availability", response_model=Technician)
+@query_budget(6)
 def toggle_technician_availability(
     technician_id: int,
     is_active: int = Query(..., ge=0, le=1, description="0 for inactive, 1 for active"),
@@ -171,18 +193,27 @@ def toggle_technician_availability(
 
 
 @router.get("/{technician_id}/appointments", response_model=List[dict])
+@query_budget(2)
 def get_technician_appointments(
     technician_id: int,
+    response: Response,
     date: Optional[str] = Query(None, description="Filter by date (YYYY-MM-DD)"),
     status: Optional[str] = Query(None, description="Filter by status"),
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     db: Session = Depends(get_db)
 ):
     """
-    Get technician's appointments (public endpoint)
+    Get technician's appointments in chronological order (public endpoint)
+    
+    When a page is full, the X-Next-Cursor response header holds the cursor
+    of the next page.
     """
     from app.models.appointment import Appointment, AppointmentStatus
     from app.models.service import Service
     from app.models.user import User
+    from app.crud import appointment as crud_appointment
+    from app.core.pagination import keyset
     from datetime import datetime, date as date_type
     
     # Check if technician exists
@@ -194,7 +225,7 @@ def get_technician_appointments(
     query = db.query(
         Appointment,
         Service.name.label('service_name'),
-        Service.duration_minutes.label('duration'),
+        Appointment.duration_minutes.label('duration'),
         User.username.label('customer_name')
     ).join(
         Service, Appointment.service_id == Service.id
@@ -219,11 +250,18 @@ def get_technician_appointments(
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid status. Use: {', '.join([s.value for s in AppointmentStatus])}")
     
-    # Execute query
-    appointments = query.order_by(
-        Appointment.appointment_date,
-        Appointment.appointment_time
-    ).all()
+    after = None
+    if cursor:
+        try:
+            after = crud_appointment.decode_appointment_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    # Execute query with keyset pagination
+    appointments = keyset(query, crud_appointment.APPOINTMENT_SORT_KEY, after=after).limit(limit).all()
+    
+    if len(appointments) == limit:
+        response.headers["X-Next-Cursor"] = crud_appointment.appointment_cursor(appointments[-1][0])
     
     # Format response
     result = []
@@ -243,6 +281,7 @@ def get_technician_appointments(
 
 
 @router.get("/{technician_id}/available-slots", response_model=List[dict])
+@query_budget(3)
 def get_technician_available_slots(
     technician_id: int,
     date: str = Query(..., description="Date to check availability (YYYY-MM-DD)"),
@@ -254,8 +293,14 @@ def get_technician_available_slots(
     """
     from app.models.appointment import Appointment, AppointmentStatus
     from app.models.service import Service
-    from app.models.store import Store
-    from datetime import datetime, timedelta, time as time_type
+    from app.core.availability import (
+        busy_intervals,
+        find_free_slots,
+        STORE_OPEN_TIME,
+        STORE_CLOSE_TIME,
+        SLOT_INTERVAL_MINUTES
+    )
+    from datetime import datetime, timedelta
     
     # Check if technician exists
     technician = crud_technician.get_technician(db, technician_id=technician_id)
@@ -273,51 +318,30 @@ def get_technician_available_slots(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    # Get store hours (assuming 9:00-18:00 for now, can be enhanced later)
-    store_open_time = time_type(9, 0)
-    store_close_time = time_type(18, 0)
-    slot_interval = 30  # 30-minute slots
-    
     # Get technician's existing appointments for the date
-    existing_appointments = db.query(Appointment, Service).join(
-        Service, Appointment.service_id == Service.id
+    existing_appointments = db.query(
+        Appointment.appointment_time,
+        Appointment.duration_minutes
     ).filter(
         Appointment.technician_id == technician_id,
         Appointment.appointment_date == check_date,
         Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED])
     ).all()
     
-    # Build list of busy time ranges
-    busy_ranges = []
-    for appt, appt_service in existing_appointments:
-        start_datetime = datetime.combine(check_date, appt.appointment_time)
-        end_datetime = start_datetime + timedelta(minutes=appt_service.duration_minutes)
-        busy_ranges.append((start_datetime, end_datetime))
-    
-    # Generate available slots
-    available_slots = []
-    current_time = datetime.combine(check_date, store_open_time)
-    end_time = datetime.combine(check_date, store_close_time)
-    service_duration = timedelta(minutes=service.duration_minutes)
-    
-    while current_time + service_duration <= end_time:
-        slot_end_time = current_time + service_duration
-        
-        # Check if this slot conflicts with any busy range
-        is_available = True
-        for busy_start, busy_end in busy_ranges:
-            if (current_time < busy_end and slot_end_time > busy_start):
-                is_available = False
-                break
-        
-        if is_available:
-            available_slots.append({
-                "start_time": current_time.strftime("%H:%M"),
-                "end_time": slot_end_time.strftime("%H:%M"),
-                "duration_minutes": service.duration_minutes
-            })
-        
-        # Move to next slot
-        current_time += timedelta(minutes=slot_interval)
+    # Sweep the free gaps between busy ranges
+    slots = find_free_slots(
+        busy_intervals(check_date, existing_appointments),
+        day_start=datetime.combine(check_date, STORE_OPEN_TIME),
+        day_end=datetime.combine(check_date, STORE_CLOSE_TIME),
+        duration=timedelta(minutes=service.duration_minutes),
+        step=timedelta(minutes=SLOT_INTERVAL_MINUTES)
+    )
     
-    return available_slots
+    return [
+        {
+            "start_time": slot_start.strftime("%H:%M"),
+            "end_time": slot_end.strftime("%H:%M"),
+            "duration_minutes": service.duration_minutes
+        }
+        for slot_start, slot_end in slots
+    ]
@@ -0,0 +1,154 @@
+"""
+Availability engine for technician scheduling
+
+Busy time is represented as (start, end) datetime intervals. Intervals are
+sorted and merged once, after which free slots and overlaps can be found with
+a single forward sweep (or a binary search) instead of comparing every
+candidate slot against every booking.
+"""
+from bisect import bisect_left
+from datetime import date, datetime, timedelta, time
+from typing import Iterable, List, Optional, Tuple
+
+
+Interval = Tuple[datetime, datetime]
+
+# Store hours (assuming 9:00-18:00 for now, can be enhanced later)
+STORE_OPEN_TIME = time(9, 0)
+STORE_CLOSE_TIME = time(18, 0)
+SLOT_INTERVAL_MINUTES = 30
+
+# Appointments are stored per date; one running past midnight ends here
+DAY_END_TIME = time(23, 59, 59)
+
+
+def appointment_end_time(start_time: time, duration_minutes: int) -> time:
+    """
+    Compute the end time of an appointment, clamped to the end of its day
+
+    Args:
+        start_time: Appointment start time
+        duration_minutes: Service duration
+
+    Returns:
+        End time, or DAY_END_TIME if the appointment would run past midnight
+    """
+    end = datetime.combine(date.min, start_time) + timedelta(minutes=duration_minutes)
+    if end.date() != date.min:
+        return DAY_END_TIME
+    return end.time()
+
+
+def busy_intervals(day: date, rows: Iterable[Tuple[time, int]]) -> List[Interval]:
+    """
+    Convert (appointment_time, duration_minutes) rows to sorted busy intervals
+
+    Args:
+        day: Date the appointments take place on
+        rows: Appointment start times with their service durations
+
+    Returns:
+        Busy (start, end) intervals sorted by start time
+    """
+    intervals = []
+    for start_time, duration_minutes in rows:
+        # Legacy rows whose service no longer exists have no duration
+        if duration_minutes is None:
+            continue
+        start = datetime.combine(day, start_time)
+        intervals.append((start, start + timedelta(minutes=duration_minutes)))
+    intervals.sort()
+    return intervals
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """
+    Sort intervals by start time and merge overlapping or touching ones
+
+    Args:
+        intervals: Busy (start, end) intervals in any order
+
+    Returns:
+        Sorted, non-overlapping intervals
+    """
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def find_free_slots(
+    busy: Iterable[Interval],
+    day_start: datetime,
+    day_end: datetime,
+    duration: timedelta,
+    step: timedelta = timedelta(minutes=SLOT_INTERVAL_MINUTES)
+) -> List[Interval]:
+    """
+    Find every slot of the given duration on the step grid that fits between
+    day_start and day_end without touching a busy interval
+
+    Runs in O(n log n) for sorting plus O(n + slots) for the sweep.
+
+    Args:
+        busy: Busy (start, end) intervals in any order
+        day_start: Opening time, also the origin of the slot grid
+        day_end: Closing time
+        duration: Length of the requested slot
+        step: Distance between candidate slot starts
+
+    Returns:
+        Available (start, end) slots in chronological order
+    """
+    merged = merge_intervals(busy)
+    slots: List[Interval] = []
+    index = 0
+    current = day_start
+
+    while current + duration <= day_end:
+        slot_end = current + duration
+
+        # Skip busy intervals that end before this slot starts
+        while index < len(merged) and merged[index][1] <= current:
+            index += 1
+
+        if index < len(merged) and merged[index][0] < slot_end:
+            # Jump to the first grid point at or after the busy interval ends
+            busy_end = merged[index][1]
+            steps = -((current - busy_end) // step)
+            current += step * max(steps, 1)
+            continue
+
+        slots.append((current, slot_end))
+        current += step
+
+    return slots
+
+
+def first_overlap(
+    intervals: List[Interval],
+    start: datetime,
+    end: datetime
+) -> Optional[Interval]:
+    """
+    Find the earliest interval that overlaps [start, end)
+
+    Args:
+        intervals: Intervals sorted by start time (not necessarily merged)
+        start: Start of the range to check
+        end: End of the range to check
+
+    Returns:
+        The overlapping interval, or None if the range is free
+    """
+    # Intervals starting at or after `end` cannot overlap, so only the prefix
+    # before that position needs to be scanned for an end past `start`.
+    stop = bisect_left(intervals, (end,))
+    for interval in intervals[:stop]:
+        if interval[1] > start:
+            return interval
+    return None
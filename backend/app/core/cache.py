@@ -0,0 +1,202 @@
+"""
+Cache backends
+
+Every cache is a named namespace with its own TTL and hit/miss counters.
+The in-process backend is a size-bounded LRU; the Redis backend shares
+entries between workers through settings.REDIS_URL. Cache failures never
+break a request: a Redis error is logged and treated as a miss.
+"""
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# All caches created through get_cache, by name (used for stats reporting)
+caches: Dict[str, "CacheBackend"] = {}
+
+
+class CacheBackend:
+    """Base cache backend with hit/miss accounting"""
+
+    def __init__(self, name: str, ttl: int):
+        self.name = name
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any) -> Optional[Any]:
+        """Get a cached value, or None on a miss"""
+        value = self._get(str(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[int] = None) -> None:
+        """Store a value; ttl overrides the cache default (seconds)"""
+        if value is None:
+            return
+        self._set(str(key), value, ttl if ttl is not None else self.ttl)
+
+    def delete(self, key: Any) -> None:
+        """Remove a single entry"""
+        self._delete(str(key))
+
+    def clear(self) -> None:
+        """Remove every entry of this cache"""
+        self._clear()
+
+    async def aget(self, key: Any) -> Optional[Any]:
+        """Get a cached value from async code without blocking the event loop"""
+        return await run_in_threadpool(self.get, key)
+
+    async def aset(self, key: Any, value: Any, ttl: Optional[int] = None) -> None:
+        """Store a value from async code without blocking the event loop"""
+        await run_in_threadpool(self.set, key, value, ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and hit ratio"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: Any, ttl: int) -> None:
+        raise NotImplementedError
+
+    def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def _clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, name: str, ttl: int, maxsize: int = 1024):
+        super().__init__(name, ttl)
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def aget(self, key: Any) -> Optional[Any]:
+        # Purely in-memory, safe to call on the event loop
+        return self.get(key)
+
+    async def aset(self, key: Any, value: Any, ttl: Optional[int] = None) -> None:
+        self.set(key, value, ttl)
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Any, ttl: int) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "size": len(self._data)}
+
+
+class RedisCache(CacheBackend):
+    """Redis-backed cache shared between workers (values are pickled)"""
+
+    def __init__(self, name: str, ttl: int, url: str):
+        super().__init__(name, ttl)
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._prefix = f"nailsdash:{name}:"
+
+    def _get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self._client.get(self._prefix + key)
+        except Exception as e:
+            logger.warning("Cache %s get failed: %s", self.name, e)
+            return None
+        return pickle.loads(raw) if raw is not None else None
+
+    def _set(self, key: str, value: Any, ttl: int) -> None:
+        if ttl <= 0:
+            return
+        try:
+            self._client.set(self._prefix + key, pickle.dumps(value), ex=ttl)
+        except Exception as e:
+            logger.warning("Cache %s set failed: %s", self.name, e)
+
+    def _delete(self, key: str) -> None:
+        try:
+            self._client.delete(self._prefix + key)
+        except Exception as e:
+            logger.warning("Cache %s delete failed: %s", self.name, e)
+
+    def _clear(self) -> None:
+        try:
+            keys = list(self._client.scan_iter(match=self._prefix + "*", count=500))
+            if keys:
+                self._client.delete(*keys)
+        except Exception as e:
+            logger.warning("Cache %s clear failed: %s", self.name, e)
+
+
+def get_cache(name: str, ttl: int, maxsize: int = 1024, backend: Optional[str] = None) -> CacheBackend:
+    """
+    Get (or create) a named cache
+
+    Args:
+        name: Cache namespace, also used as the Redis key prefix
+        ttl: Default entry lifetime in seconds
+        maxsize: Maximum number of entries (in-process backend only)
+        backend: "memory" or "redis"; defaults to settings.CACHE_BACKEND
+
+    Returns:
+        Cache backend instance
+    """
+    if name in caches:
+        return caches[name]
+
+    backend = (backend or settings.CACHE_BACKEND).lower()
+    if backend == "redis":
+        cache: CacheBackend = RedisCache(name, ttl=ttl, url=settings.REDIS_URL)
+    else:
+        cache = MemoryCache(name, ttl=ttl, maxsize=maxsize)
+
+    caches[name] = cache
+    return cache
@@ -0,0 +1,222 @@
+"""
+Read-through cache for the public catalog endpoints
+
+Store, service and technician listings change a few times a day but are read
+on every page view. Responses are cached as serialized JSON together with an
+ETag, one cache namespace per resource, so a write only has to drop the
+namespace it touched. Clients sending a matching If-None-Match get a 304.
+
+Endpoints can also pass a validator: a cheap COUNT/MAX(updated_at) query over
+the rows behind the response, plus the resource's write counter from
+catalog_versions. It yields a weak ETag and Last-Modified, so a cache miss
+with a current client copy is answered with a 304 without loading rows or
+building the pydantic response. The counter is bumped by every catalog write
+in its own transaction, so two edits within the same second (the resolution
+of updated_at) still produce different ETags.
+
+A write only clears the cache of the worker that handled it, so cached
+entries also carry the counter they were loaded under, and a hit is served
+only while that is still the resource's current counter (one primary key
+lookup). This keeps the in-process backend correct with several workers.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import CacheBackend, get_cache
+from app.core.config import settings
+from app.models.catalog_version import CatalogVersion
+
+
+STORES = "stores"
+SERVICES = "services"
+TECHNICIANS = "technicians"
+
+_TTLS = {
+    STORES: settings.CATALOG_CACHE_TTL_STORES,
+    SERVICES: settings.CATALOG_CACHE_TTL_SERVICES,
+    TECHNICIANS: settings.CATALOG_CACHE_TTL_TECHNICIANS,
+}
+
+
+def get_catalog_cache(resource: str) -> CacheBackend:
+    """Get the cache namespace of a catalog resource"""
+    return get_cache(
+        f"catalog:{resource}",
+        ttl=_TTLS[resource],
+        maxsize=settings.CATALOG_CACHE_MAX_SIZE
+    )
+
+
+def bump_version(db: Session, *resources: str) -> None:
+    """
+    Increment the write counters of catalog resources (no commit)
+
+    Call before committing a catalog write, so the counter changes in the same
+    transaction as the rows. Uses an upsert, so the first write of a resource
+    creates its counter.
+    """
+    for resource in resources:
+        values = {"resource": resource, "version": 1}
+        increment = {"version": CatalogVersion.version + 1, "updated_at": func.now()}
+
+        if db.get_bind().dialect.name == "mysql":
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            stmt = mysql_insert(CatalogVersion).values(**values).on_duplicate_key_update(**increment)
+        else:
+            # SQLite (local development) supports ON CONFLICT DO UPDATE
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+            stmt = sqlite_insert(CatalogVersion).values(**values).on_conflict_do_update(
+                index_elements=["resource"],
+                set_=increment
+            )
+
+        db.execute(stmt)
+
+
+async def get_version_async(db: AsyncSession, resource: str) -> int:
+    """Get the current write counter of a catalog resource (0 if never written)"""
+    result = await db.execute(select(CatalogVersion.version).where(CatalogVersion.resource == resource))
+    return result.scalar() or 0
+
+
+def invalidate(*resources: str) -> None:
+    """Drop every cached response of the given catalog resources"""
+    for resource in resources:
+        get_catalog_cache(resource).clear()
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_model: Any) -> TypeAdapter:
+    """Build (once) the validator/serializer for a response model"""
+    return TypeAdapter(response_model)
+
+
+def _cache_key(request: Request) -> str:
+    """Build a cache key from the request path and its sorted query parameters"""
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def version_columns(model, resource: str) -> Tuple[Any, Any, Any]:
+    """
+    Build the COUNT, MAX(last change) and write counter columns for a validator query
+
+    Rows that were never updated fall back to created_at; a resource that was
+    never written has counter 0.
+    """
+    changed = model.created_at
+    if hasattr(model, "updated_at"):
+        changed = func.coalesce(model.updated_at, model.created_at)
+    version = select(CatalogVersion.version).where(CatalogVersion.resource == resource).scalar_subquery()
+    return func.count(model.id), func.max(changed), func.coalesce(version, 0)
+
+
+def weak_etag(count: int, last_modified: Optional[datetime], version: int = 0) -> str:
+    """Build a weak ETag from a row count, the latest change time and the write counter"""
+    stamp = last_modified.strftime("%Y%m%d%H%M%S%f") if last_modified else "0"
+    return f'W/"{count}-{stamp}-{version}"'
+
+
+def http_date(value: datetime) -> str:
+    """Format a datetime for the Last-Modified header (naive values are UTC)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _opaque(etag: str) -> str:
+    """Strip the weak prefix; If-None-Match uses weak comparison"""
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(value.strip()) for value in header.split(",")}
+
+
+async def cached_response(
+    request: Request,
+    db: AsyncSession,
+    resource: str,
+    response_model: Any,
+    loader: Callable[[], Awaitable[Any]],
+    validator: Optional[Callable[[], Awaitable[Tuple[int, Optional[datetime], int]]]] = None
+) -> Response:
+    """
+    Serve a catalog response from cache, loading and storing it on a miss
+
+    Revalidation is by ETag only. Last-Modified is sent for information but
+    If-Modified-Since is not honored, since deleting a row does not move
+    MAX(updated_at) and only the row count and write counter in the ETag
+    catch it.
+
+    The entry is stored with the write counter read before loading (by the
+    validator, in the same transaction as the loader), so a load that raced
+    with a write is stored under the old counter and never served.
+
+    Args:
+        request: Incoming request (path and query form the cache key)
+        db: Session the validator and loader use, for the write counter check
+        resource: Catalog resource the response belongs to
+        response_model: Type used to validate and serialize the loaded data
+        loader: Coroutine function returning the data; may raise HTTPException
+        validator: Optional coroutine function returning (row count, last change,
+            write counter) of the rows behind the response; enables weak ETags
+
+    Returns:
+        JSON response with an ETag, or an empty 304 if the client copy is current
+    """
+    cache = get_catalog_cache(resource)
+    key = _cache_key(request)
+
+    entry = await cache.aget(key)
+    # Written since the entry was loaded, possibly by another worker
+    if entry is not None and entry[0] != await get_version_async(db, resource):
+        entry = None
+
+    if entry is None:
+        version = etag = last_modified = None
+        if validator is not None:
+            count, changed, version = await validator()
+            # Nothing to validate against; let the loader produce the 404
+            if count:
+                etag = weak_etag(count, changed, version)
+                last_modified = http_date(changed) if changed else None
+                headers = {"ETag": etag, "Cache-Control": "no-cache"}
+                if last_modified:
+                    headers["Last-Modified"] = last_modified
+                if _etag_matches(request, etag):
+                    return Response(status_code=304, headers=headers)
+
+        if version is None:
+            version = await get_version_async(db, resource)
+
+        data = await loader()
+        adapter = _adapter(response_model)
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        if etag is None:
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        entry = (version, etag, last_modified, body)
+        await cache.aset(key, entry)
+
+    _, etag, last_modified, body = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
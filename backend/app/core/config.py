@@ -21,6 +21,13 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    # Async driver URL; derived from DATABASE_URL (aiomysql / aiosqlite) when empty
+    ASYNC_DATABASE_URL: str = ""
+    # Pool of the async engine, kept on top of the sync pool (10 + 20
+    # overflow) in every worker: each worker may open up to
+    # 30 + ASYNC_DB_POOL_SIZE + ASYNC_DB_MAX_OVERFLOW connections
+    ASYNC_DB_POOL_SIZE: int = 5
+    ASYNC_DB_MAX_OVERFLOW: int = 5
     
     # JWT
     SECRET_KEY: str
@@ -28,14 +35,17 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # Password hashing
+    PASSWORD_HASH_WORKERS: int = 4  # Threads dedicated to bcrypt hash/verify
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # bcrypt or argon2 (needs argon2-cffi)
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 2
+    PASSWORD_ARGON2_MEMORY_COST: int = 19456  # KiB
+    PASSWORD_ARGON2_PARALLELISM: int = 1
+    
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:5173,https://github.com"
     
-    @property
-    def cors_origins_list(self) -> List[str]:
-        """Parse CORS origins from comma-separated string"""
-        return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
-    
     # AWS S3
     AWS_ACCESS_KEY_ID: str = ""
     AWS_SECRET_ACCESS_KEY: str = ""
@@ -45,6 +55,66 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # Cache
+    CACHE_BACKEND: str = "memory"  # memory or redis (uses REDIS_URL)
+    # With the memory backend a user deactivated, deleted or changed through
+    # another worker stays cached here for up to this long; use redis to make
+    # such changes take effect at once
+    USER_CACHE_TTL_SECONDS: int = 10
+    USER_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300  # Capped by each token's own exp
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    CATALOG_CACHE_TTL_STORES: int = 300
+    CATALOG_CACHE_TTL_SERVICES: int = 300
+    CATALOG_CACHE_TTL_TECHNICIANS: int = 120
+    CATALOG_CACHE_MAX_SIZE: int = 2048
+    
+    # Appointment sweeper (expires past pending/confirmed appointments)
+    APPOINTMENT_SWEEPER_ENABLED: bool = True
+    APPOINTMENT_SWEEPER_INTERVAL_SECONDS: int = 3600
+    APPOINTMENT_SWEEPER_BATCH_SIZE: int = 500
+    APPOINTMENT_EXPIRE_AFTER_DAYS: int = 1  # Days after the appointment date
+    
+    # Verification codes
+    VERIFICATION_CODE_BACKEND: str = "database"  # database, memory or redis (uses REDIS_URL)
+    VERIFICATION_CODE_EXPIRE_MINUTES: int = 10
+    VERIFICATION_CODE_MEMORY_MAX_SIZE: int = 10000
+    
+    # Rate limiting ("count/seconds" rules, comma-separated)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory or redis (uses REDIS_URL)
+    RATE_LIMIT_MEMORY_MAX_KEYS: int = 100000
+    RATE_LIMIT_TRUST_PROXY: bool = False  # Take the client IP from X-Forwarded-For
+    RATE_LIMIT_PROXY_HOPS: int = 1  # Trusted proxies appending to X-Forwarded-For
+    RATE_LIMIT_SEND_CODE_PER_PHONE: str = "1/60,5/3600"
+    RATE_LIMIT_SEND_CODE_PER_IP: str = "20/3600"
+    RATE_LIMIT_VERIFY_CODE_PER_PHONE: str = "10/600"
+    RATE_LIMIT_VERIFY_CODE_PER_IP: str = "50/600"
+    RATE_LIMIT_LOGIN_PER_PHONE: str = "10/900"
+    RATE_LIMIT_LOGIN_PER_IP: str = "50/900"
+    
+    # Registered phone filter (lets login skip the lookup for unknown phones)
+    PHONE_FILTER_ENABLED: bool = False
+    PHONE_FILTER_BACKEND: str = "memory"  # memory or redis (uses REDIS_URL)
+    PHONE_FILTER_SINGLE_WORKER: bool = False  # Required by the memory backend: one process serves all requests
+    PHONE_FILTER_CAPACITY: int = 1000000
+    PHONE_FILTER_ERROR_RATE: float = 0.01
+    PHONE_FILTER_REFRESH_SECONDS: int = 10
+    PASSWORD_DUMMY_VERIFY_RATE: float = 0.1  # Share of failed logins that run a real dummy verify
+    
+    # Metrics (/metrics endpoint and Server-Timing header)
+    METRICS_ENABLED: bool = True
+    METRICS_ALLOWED_IPS: str = "127.0.0.1,::1"  # Clients allowed to scrape /metrics: IPs or networks, * for any
+    # off, warn or raise when an endpoint exceeds its @query_budget; warn in
+    # development and off elsewhere when empty
+    QUERY_BUDGET_MODE: str = ""
+    
+    # Verification code purge (deletes expired codes in batches)
+    VERIFICATION_CODE_PURGE_ENABLED: bool = True
+    VERIFICATION_CODE_PURGE_INTERVAL_SECONDS: int = 3600
+    VERIFICATION_CODE_PURGE_BATCH_SIZE: int = 1000
+    VERIFICATION_CODE_RETENTION_HOURS: int = 24  # Kept this long after expiry
+    
     # Email
     SMTP_HOST: str = ""
     SMTP_PORT: int = 587
@@ -55,15 +125,32 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB
     ALLOWED_IMAGE_EXTENSIONS: str = "jpg,jpeg,png,gif,webp"
     
+    # Pagination
+    DEFAULT_PAGE_SIZE: int = 20
+    MAX_PAGE_SIZE: int = 100
+    
+    @property
+    def cors_origins_list(self) -> List[str]:
+        """Parse CORS origins from comma-separated string"""
+        return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
+    
+    @property
+    def metrics_allowed_ips_list(self) -> List[str]:
+        """Parse the /metrics allowlist from comma-separated string"""
+        return [entry.strip() for entry in self.METRICS_ALLOWED_IPS.split(",") if entry.strip()]
+    
+    @property
+    def query_budget_mode(self) -> str:
+        """QUERY_BUDGET_MODE, or the default for ENVIRONMENT when empty"""
+        if self.QUERY_BUDGET_MODE:
+            return self.QUERY_BUDGET_MODE.lower()
+        return "warn" if self.ENVIRONMENT == "development" else "off"
+    
     @property
     def allowed_extensions_list(self) -> List[str]:
         """Parse allowed extensions from comma-separated string"""
         return [ext.strip() for ext in self.ALLOWED_IMAGE_EXTENSIONS.split(",")]
     
-    # Pagination
-    DEFAULT_PAGE_SIZE: int = 20
-    MAX_PAGE_SIZE: int = 100
-    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,299 @@
+"""
+Request metrics
+
+A pure ASGI middleware times every request and, through SQLAlchemy cursor
+events, counts the SQL statements it issues and the time spent in them. The
+per-request figures are returned in a Server-Timing header and aggregated
+per route template (never per raw path, to keep label cardinality bounded)
+into counters and histograms rendered in the Prometheus text format.
+
+Statements are attributed through a context variable holding a mutable
+RequestMetrics object: sync sessions run in threadpool workers that inherit a
+copy of the request context, so they update the same object.
+
+Endpoints declare how many statements they may issue with @query_budget(n).
+QUERY_BUDGET_MODE decides what happens when a request goes over: nothing
+("off"), a warning log ("warn", the default with ENVIRONMENT=development) or
+QueryBudgetExceeded raised from the statement that crosses the budget
+("raise", for tests).
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A request issued more SQL statements than its endpoint's query budget"""
+
+
+class RequestMetrics:
+    """SQL activity and timing of the current request"""
+
+    __slots__ = ("started", "db_statements", "db_seconds", "scope")
+
+    def __init__(self, scope: Optional[Dict[str, Any]] = None):
+        self.started = time.perf_counter()
+        self.db_statements = 0
+        self.db_seconds = 0.0
+        self.scope = scope
+
+    @property
+    def budget(self) -> Optional[int]:
+        """Query budget of the matched endpoint, once routing has happened"""
+        route = self.scope.get("route") if self.scope else None
+        return getattr(getattr(route, "endpoint", None), "query_budget", None)
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current_request_metrics() -> Optional[RequestMetrics]:
+    """Get the metrics of the request being handled, or None outside a request"""
+    return _current.get()
+
+
+def query_budget(statements: int) -> Callable:
+    """
+    Declare the maximum number of SQL statements an endpoint issues per request
+
+    Apply below the router decorator, so the route registers the annotated
+    function. The count includes statements run by dependencies (e.g. the
+    current-user lookup on a cache miss).
+
+    Args:
+        statements: Statement budget
+    """
+    def decorator(func: Callable) -> Callable:
+        func.query_budget = statements
+        return func
+    return decorator
+
+
+@contextmanager
+def count_queries() -> Iterator[RequestMetrics]:
+    """
+    Count the statements executed in the current context (outside of requests)
+
+    Yields:
+        Metrics object whose db_statements grows as statements run
+    """
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+# Aggregates keyed by (method, route) or (method, route, status); only updated
+# from the event loop, so no locking is needed
+requests_total: Dict[Tuple[str, str, str], int] = {}
+request_duration: Dict[Tuple[str, str], Histogram] = {}
+request_db_statements: Dict[Tuple[str, str], Histogram] = {}
+request_db_seconds: Dict[Tuple[str, str], float] = {}
+response_bytes: Dict[Tuple[str, str], int] = {}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current.get()
+    if metrics is None:
+        return
+    if settings.query_budget_mode == "raise":
+        budget = metrics.budget
+        if budget is not None and metrics.db_statements >= budget:
+            raise QueryBudgetExceeded(
+                f"{_route_label(metrics.scope)} exceeded its query budget of {budget} statements: {statement}"
+            )
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current.get()
+    started = getattr(context, "_metrics_started", None)
+    if metrics is not None and started is not None:
+        metrics.db_statements += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+def instrument_engine(target: Any = Engine) -> None:
+    """
+    Count statements executed through an engine
+
+    Args:
+        target: Engine to instrument; defaults to the Engine class, which
+            covers the sync engine and the async engine's sync_engine alike
+    """
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_label(scope: Optional[Dict[str, Any]]) -> str:
+    route = scope.get("route") if scope else None
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _record(method: str, route: str, status: int, metrics: RequestMetrics, elapsed: float, size: int) -> None:
+    key = (method, route)
+    status_key = (method, route, str(status))
+    requests_total[status_key] = requests_total.get(status_key, 0) + 1
+    request_duration.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+    request_db_statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(metrics.db_statements)
+    request_db_seconds[key] = request_db_seconds.get(key, 0.0) + metrics.db_seconds
+    response_bytes[key] = response_bytes.get(key, 0) + size
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request metrics and adding Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics(scope)
+        token = _current.set(metrics)
+        status_code = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                app_ms = (time.perf_counter() - metrics.started) * 1000
+                timing = (
+                    f'app;dur={app_ms:.1f}, '
+                    f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.db_statements} queries"'
+                )
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode())]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _current.reset(token)
+            budget = metrics.budget
+            if budget is not None and metrics.db_statements > budget and settings.query_budget_mode == "warn":
+                logger.warning(
+                    "%s %s issued %d SQL statements, over its query budget of %d",
+                    scope["method"], _route_label(scope), metrics.db_statements, budget
+                )
+            _record(
+                scope["method"], _route_label(scope), status_code, metrics,
+                time.perf_counter() - metrics.started, size
+            )
+
+
+def _labels(**labels: str) -> str:
+    escaped = (
+        name + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _render_histogram(lines: List[str], name: str, histograms: Dict[Tuple[str, str], Histogram]) -> None:
+    for (method, route), histogram in histograms.items():
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=str(bound))} {count}")
+        lines.append(f'{name}_bucket{_labels(method=method, route=route, le="+Inf")} {histogram.count}')
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.count}")
+
+
+def render_metrics(
+    cache_stats: Optional[Dict[str, Dict[str, Any]]] = None,
+    gauges: Optional[Iterable[Tuple[str, str, float]]] = None
+) -> str:
+    """
+    Render all metrics in the Prometheus text exposition format
+
+    Args:
+        cache_stats: Stats of each named cache (CacheBackend.stats())
+        gauges: Extra (name, help, value) gauges, e.g. background task counters
+
+    Returns:
+        Metrics text
+    """
+    lines = [
+        "# HELP nailsdash_http_requests_total HTTP requests by route and status",
+        "# TYPE nailsdash_http_requests_total counter",
+    ]
+    for (method, route, status), count in requests_total.items():
+        lines.append(f"nailsdash_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    lines += [
+        "# HELP nailsdash_http_request_duration_seconds Request latency",
+        "# TYPE nailsdash_http_request_duration_seconds histogram",
+    ]
+    _render_histogram(lines, "nailsdash_http_request_duration_seconds", request_duration)
+
+    lines += [
+        "# HELP nailsdash_http_request_db_statements SQL statements per request",
+        "# TYPE nailsdash_http_request_db_statements histogram",
+    ]
+    _render_histogram(lines, "nailsdash_http_request_db_statements", request_db_statements)
+
+    lines += [
+        "# HELP nailsdash_http_request_db_seconds_total Time spent executing SQL",
+        "# TYPE nailsdash_http_request_db_seconds_total counter",
+    ]
+    for (method, route), seconds in request_db_seconds.items():
+        lines.append(f"nailsdash_http_request_db_seconds_total{_labels(method=method, route=route)} {seconds}")
+
+    lines += [
+        "# HELP nailsdash_http_response_bytes_total Response body bytes",
+        "# TYPE nailsdash_http_response_bytes_total counter",
+    ]
+    for (method, route), size in response_bytes.items():
+        lines.append(f"nailsdash_http_response_bytes_total{_labels(method=method, route=route)} {size}")
+
+    if cache_stats:
+        for metric, suffix, kind in (("hits", "_total", "counter"), ("misses", "_total", "counter"), ("size", "", "gauge")):
+            name = f"nailsdash_cache_{metric}{suffix}"
+            lines += [f"# HELP {name} Cache {metric}", f"# TYPE {name} {kind}"]
+            for cache, stats in cache_stats.items():
+                if metric in stats:
+                    lines.append(f"{name}{_labels(cache=cache)} {stats[metric]}")
+
+    for name, help_text, value in gauges or ():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,79 @@
+"""
+Keyset (cursor) pagination helpers
+
+A cursor is the sort key of the last row of a page, encoded as an opaque
+URL-safe string. The next page continues strictly after that key, so every
+page costs one index range scan no matter how deep it is, unlike OFFSET which
+reads and discards all preceding rows.
+"""
+import base64
+from datetime import date, time
+from typing import Any, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode a sort key as an opaque cursor
+
+    Args:
+        values: Sort key values (date, time, int or str)
+
+    Returns:
+        URL-safe cursor string
+    """
+    raw = "|".join(value.isoformat() if isinstance(value, (date, time)) else str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> Tuple[Any, ...]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor: Cursor string from a previous response
+        types: Type of each sort key value (date, time, int or str)
+
+    Returns:
+        Tuple of sort key values
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+    parts = raw.split("|")
+    if len(parts) != len(types):
+        raise ValueError("Invalid cursor")
+
+    values = []
+    for part, value_type in zip(parts, types):
+        if value_type in (date, time):
+            values.append(value_type.fromisoformat(part))
+        else:
+            values.append(value_type(part))
+    return tuple(values)
+
+
+def keyset(query, columns: Sequence[Any], after: Optional[Sequence[Any]] = None, descending: bool = False):
+    """
+    Order a query by a unique sort key and continue after a previous key
+
+    Args:
+        query: SQLAlchemy query to paginate
+        columns: Sort key columns; the last one must be unique (e.g. the primary key)
+        after: Sort key of the last row already returned, or None for the first page
+        descending: Sort newest first
+
+    Returns:
+        Ordered (and filtered) query; apply .limit() to take a page
+    """
+    if after is not None:
+        key, bound = tuple_(*columns), tuple_(*after)
+        query = query.filter(key < bound if descending else key > bound)
+
+    return query.order_by(*[column.desc() if descending else column for column in columns])
@@ -0,0 +1,252 @@
+"""
+Registered phone membership filter
+
+A Bloom filter over backend_users.phone lets login reject unknown phones
+without a database lookup. It can answer "maybe registered" for a phone that
+is not (a false positive, which just takes the normal path) but never "not
+registered" for one that is, as long as every new phone is added:
+
+- crud.user.create/update add phones as they are written
+- app.tasks.phone_filter_refresh builds the filter after startup and then
+  adds the phones of users created or changed since the last refresh (by
+  updated_at), which also covers writes handled by other processes
+
+Until the first build completes every phone is reported as maybe registered.
+A negative answer is only safe when every write is seen by the filter before
+the next login, so the in-process backend is refused unless
+PHONE_FILTER_SINGLE_WORKER declares that one process serves all requests:
+with several workers a phone registered or changed on one worker would be
+rejected by the others until their next refresh. The Redis backend shares
+one bit array between workers. A Redis error is treated as "maybe", and so is
+a bit array that lost its build marker (the key was evicted or flushed, or
+Redis restarted without persistence) until the refresh task has rebuilt it.
+"""
+import hashlib
+import logging
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+
+
+logger = logging.getLogger(__name__)
+
+# Refreshes re-read this much before the newest updated_at already seen, so a
+# transaction that committed late with an older timestamp is not missed
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+class PhoneFilter:
+    """Base Bloom filter of registered phone numbers"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.ready = False
+        self.last_updated_at: Optional[datetime] = None
+
+    def might_contain(self, phone: str) -> bool:
+        """False only if the phone is certainly not registered"""
+        if not self.ready:
+            return True
+        return self._test(self._positions(phone))
+
+    def add(self, phone: Optional[str]) -> None:
+        """Add a phone number"""
+        if phone:
+            self._set(self._positions(phone))
+
+    def rebuild(self, db: Session, batch_size: int = 10000) -> int:
+        """
+        Load every registered phone
+
+        Args:
+            db: Database session
+            batch_size: Rows fetched per round trip
+
+        Returns:
+            Number of phones loaded
+        """
+        bits = bytearray((self.size + 7) // 8)
+        count = 0
+        last_updated_at = None
+        rows = db.query(User.id, User.phone, User.updated_at).order_by(User.id).yield_per(batch_size)
+        for _, phone, updated_at in rows:
+            for position in self._positions(phone):
+                bits[position >> 3] |= 1 << (position & 7)
+            count += 1
+            if last_updated_at is None or updated_at > last_updated_at:
+                last_updated_at = updated_at
+        self._merge(bytes(bits))
+        self._advance(last_updated_at)
+        self.ready = True
+        return count
+
+    def is_intact(self) -> bool:
+        """False if the stored bits were lost since the last build"""
+        return True
+
+    def refresh(self, db: Session) -> int:
+        """
+        Add phones of users created or changed since the last build or refresh
+
+        Args:
+            db: Database session
+
+        Returns:
+            Number of phones added
+        """
+        query = db.query(User.phone, User.updated_at)
+        if self.last_updated_at is not None:
+            query = query.filter(User.updated_at >= self.last_updated_at - REFRESH_OVERLAP)
+        rows = query.all()
+        for phone, updated_at in rows:
+            self.add(phone)
+            self._advance(updated_at)
+        return len(rows)
+
+    def _advance(self, updated_at: Optional[datetime]) -> None:
+        if updated_at is not None and (self.last_updated_at is None or updated_at > self.last_updated_at):
+            self.last_updated_at = updated_at
+
+    def _positions(self, phone: str) -> List[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(phone.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def _test(self, positions: List[int]) -> bool:
+        raise NotImplementedError
+
+    def _set(self, positions: List[int]) -> None:
+        raise NotImplementedError
+
+    def _merge(self, bits: bytes) -> None:
+        raise NotImplementedError
+
+
+class MemoryPhoneFilter(PhoneFilter):
+    """Bit array held by this process"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        super().__init__(capacity, error_rate)
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _test(self, positions: List[int]) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in positions)
+
+    def _set(self, positions: List[int]) -> None:
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+
+    def _merge(self, bits: bytes) -> None:
+        # OR, not replace, so phones added during the build are kept
+        with self._lock:
+            merged = int.from_bytes(self._bits, "little") | int.from_bytes(bits, "little")
+            self._bits[:] = merged.to_bytes(len(self._bits), "little")
+
+
+class RedisPhoneFilter(PhoneFilter):
+    """Bit array in a Redis string shared between workers"""
+
+    def __init__(self, capacity: int, error_rate: float, url: str):
+        super().__init__(capacity, error_rate)
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        # Sized key, so changing capacity or error rate starts a fresh array
+        self._key = f"nailsdash:phone_filter:{self.size}:{self.hashes}"
+        # Set by each build, past the filter bits. A key that was evicted or
+        # flushed comes back without it, even once add() has recreated it
+        self._marker = self.size
+
+    def is_intact(self) -> bool:
+        try:
+            return bool(self._client.getbit(self._key, self._marker))
+        except Exception as e:
+            logger.warning("Phone filter check failed: %s", e)
+            return True
+
+    def _test(self, positions: List[int]) -> bool:
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            pipe.getbit(self._key, self._marker)
+            for position in positions:
+                pipe.getbit(self._key, self._redis_offset(position))
+            marker, *bits = pipe.execute()
+        except Exception as e:
+            logger.warning("Phone filter lookup failed: %s", e)
+            return True
+        if not marker:
+            if self.ready:
+                logger.warning("Phone filter bits lost, waiting for a rebuild")
+            self.ready = False
+            return True
+        return all(bits)
+
+    def _set(self, positions: List[int]) -> None:
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for position in positions:
+                pipe.setbit(self._key, self._redis_offset(position), 1)
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Phone filter update failed: %s", e)
+            # A missed bit would be a false negative; fall back to the database
+            self.ready = False
+
+    def _merge(self, bits: bytes) -> None:
+        staging = self._key + ":build"
+        pipe = self._client.pipeline(transaction=True)
+        pipe.set(staging, bits, ex=300)
+        pipe.bitop("OR", self._key, self._key, staging)
+        pipe.setbit(self._key, self._marker, 1)
+        pipe.delete(staging)
+        pipe.execute()
+
+    @staticmethod
+    def _redis_offset(position: int) -> int:
+        # Redis numbers bits from the most significant end of each byte; map
+        # so that the byte layout matches the one built by rebuild()
+        return (position & ~7) | (7 - (position & 7))
+
+
+_filter: Optional[PhoneFilter] = None
+_refused = False
+
+
+def get_phone_filter() -> Optional[PhoneFilter]:
+    """
+    Get the configured phone filter
+
+    Returns:
+        Filter instance, or None when PHONE_FILTER_ENABLED is off or the
+        memory backend is configured without PHONE_FILTER_SINGLE_WORKER
+    """
+    global _filter, _refused
+    if not settings.PHONE_FILTER_ENABLED:
+        return None
+
+    if _filter is None:
+        if settings.PHONE_FILTER_BACKEND.lower() == "redis":
+            _filter = RedisPhoneFilter(settings.PHONE_FILTER_CAPACITY, settings.PHONE_FILTER_ERROR_RATE, settings.REDIS_URL)
+        elif settings.PHONE_FILTER_SINGLE_WORKER:
+            _filter = MemoryPhoneFilter(settings.PHONE_FILTER_CAPACITY, settings.PHONE_FILTER_ERROR_RATE)
+        else:
+            if not _refused:
+                logger.warning(
+                    "Phone filter disabled: the memory backend needs PHONE_FILTER_SINGLE_WORKER=True "
+                    "(use the redis backend with several workers)"
+                )
+                _refused = True
+            return None
+    return _filter
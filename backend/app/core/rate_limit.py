@@ -0,0 +1,249 @@
+"""
+Request rate limiting
+
+Sliding-window limits keyed by client IP and by the phone number in the
+request body. Limits are written as comma-separated "count/seconds" rules,
+e.g. "1/60,5/3600" allows one request a minute and five an hour. The
+in-process backend keeps a timestamp log per key; the Redis backend keeps
+the same log in a sorted set, updated by a single Lua script so workers
+share one view. A Redis error lets the request through rather than locking
+everyone out.
+"""
+import logging
+import math
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+Rule = Tuple[int, int]  # (max requests, window seconds)
+
+
+def parse_rules(spec: str) -> List[Rule]:
+    """
+    Parse a "count/seconds[,count/seconds...]" limit specification
+
+    Args:
+        spec: Limit specification; empty means no limit
+
+    Returns:
+        List of (count, seconds) rules
+    """
+    rules = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        count, seconds = part.split("/")
+        rules.append((int(count), int(seconds)))
+    return rules
+
+
+class RateLimiter:
+    """Base sliding-window rate limiter"""
+
+    def hit(self, limits: List[Tuple[str, List[Rule]]]) -> float:
+        """
+        Check a request against the rules of every key, then record it
+
+        The request is recorded in every window only if all rules pass, so a
+        rejected request never uses up a slot of another rule or key.
+
+        Args:
+            limits: (key, rules) pairs, key being the limited identity (scope
+                plus IP or phone) and rules the (count, seconds) rules that
+                all have to pass
+
+        Returns:
+            0 if the request is allowed, otherwise seconds until it would be
+        """
+        windows = [(f"{key}:{window}", limit, window) for key, rules in limits for limit, window in rules]
+        if not windows:
+            return 0.0
+        return self._hit(windows)
+
+    async def ahit(self, limits: List[Tuple[str, List[Rule]]]) -> float:
+        """Check and record a request from async code without blocking the event loop"""
+        return await run_in_threadpool(self.hit, limits)
+
+    def _hit(self, windows: List[Tuple[str, int, int]]) -> float:
+        raise NotImplementedError
+
+
+class MemoryRateLimiter(RateLimiter):
+    """In-process limiter; least recently seen keys are dropped beyond max_keys"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._log: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def ahit(self, limits: List[Tuple[str, List[Rule]]]) -> float:
+        # Purely in-memory, safe to call on the event loop
+        return self.hit(limits)
+
+    def _hit(self, windows: List[Tuple[str, int, int]]) -> float:
+        now = time.monotonic()
+        with self._lock:
+            retry_after = 0.0
+            logs = []
+            for key, limit, window in windows:
+                log = self._log.get(key)
+                if log is None:
+                    log = self._log[key] = deque()
+                self._log.move_to_end(key)
+                while log and log[0] <= now - window:
+                    log.popleft()
+                if len(log) >= limit:
+                    retry_after = max(retry_after, log[0] + window - now)
+                logs.append(log)
+            if not retry_after:
+                for log in logs:
+                    log.append(now)
+            while len(self._log) > self.max_keys:
+                self._log.popitem(last=False)
+            return retry_after
+
+
+class RedisRateLimiter(RateLimiter):
+    """Redis limiter shared between workers"""
+
+    # Trim every window and find the longest wait; record the hit in all of
+    # them only if none is full. ARGV: now, (window, limit) per key, member
+    _HIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local window = tonumber(ARGV[2 * i])
+    local limit = tonumber(ARGV[2 * i + 1])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        retry_after = math.max(retry_after, tonumber(oldest[2]) + window - now)
+    end
+end
+if retry_after > 0 then
+    return tostring(retry_after)
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[#ARGV])
+    redis.call('EXPIRE', key, tonumber(ARGV[2 * i]))
+end
+return '0'
+"""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self._client.register_script(self._HIT_SCRIPT)
+        self._prefix = "nailsdash:ratelimit:"
+
+    def _hit(self, windows: List[Tuple[str, int, int]]) -> float:
+        args = [time.time()]
+        for _, limit, window in windows:
+            args += [window, limit]
+        args.append(uuid.uuid4().hex)
+        try:
+            result = self._script(keys=[self._prefix + key for key, _, _ in windows], args=args)
+        except Exception as e:
+            logger.warning("Rate limit check for %s failed: %s", windows[0][0], e)
+            return 0.0
+        return max(float(result), 0.0)
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the configured rate limiter (created on first use)"""
+    global _limiter
+    if _limiter is None:
+        if settings.RATE_LIMIT_BACKEND.lower() == "redis":
+            _limiter = RedisRateLimiter(settings.REDIS_URL)
+        else:
+            _limiter = MemoryRateLimiter(max_keys=settings.RATE_LIMIT_MEMORY_MAX_KEYS)
+    return _limiter
+
+
+def client_ip(request: Request) -> str:
+    """
+    Client address, from X-Forwarded-For when running behind trusted proxies
+
+    Each proxy appends the address it received the request from, and the
+    client can put anything in front of those. The client is therefore the
+    entry RATE_LIMIT_PROXY_HOPS places from the right (the address the
+    outermost trusted proxy saw), never the client-controlled leftmost one.
+    """
+    if settings.RATE_LIMIT_TRUST_PROXY:
+        forwarded = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",") if entry.strip()]
+        if forwarded:
+            return forwarded[max(0, len(forwarded) - settings.RATE_LIMIT_PROXY_HOPS)]
+    return request.client.host if request.client else "unknown"
+
+
+async def _request_phone(request: Request) -> Optional[str]:
+    # Starlette caches the body, so the route still parses it normally
+    try:
+        body = await request.json()
+    except Exception:
+        return None
+    phone = body.get("phone") if isinstance(body, dict) else None
+    if not isinstance(phone, str):
+        return None
+    digits = re.sub(r"\D", "", phone)
+    if len(digits) == 10:
+        digits = "1" + digits
+    return digits or None
+
+
+def rate_limit(scope: str, per_ip: str = "", per_phone: str = ""):
+    """
+    Build a route dependency enforcing per-IP and per-phone limits
+
+    Use it in the route decorator (dependencies=[Depends(...)]) so it runs
+    before the handler does any database or password hashing work.
+
+    Args:
+        scope: Name separating the counters of different routes
+        per_ip: Limit specification per client IP
+        per_phone: Limit specification per "phone" field of the JSON body
+
+    Returns:
+        Dependency raising HTTP 429 with Retry-After when over the limit
+    """
+    ip_rules = parse_rules(per_ip)
+    phone_rules = parse_rules(per_phone)
+
+    async def dependency(request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        limits = []
+        if ip_rules:
+            limits.append((f"{scope}:ip:{client_ip(request)}", ip_rules))
+        if phone_rules:
+            phone = await _request_phone(request)
+            if phone:
+                limits.append((f"{scope}:phone:{phone}", phone_rules))
+
+        retry_after = await get_rate_limiter().ahit(limits)
+
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please try again later",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+    return dependency
@@ -1,16 +1,56 @@
 """
 Security utilities for authentication and authorization
 """
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from app.core.config import settings
+from app.core.cache import get_cache
+
+
+def create_password_context() -> CryptContext:
+    """
+    Build the password hashing context from the current settings
+    
+    New hashes use PASSWORD_HASH_SCHEME with the configured cost; hashes made
+    with the other scheme or different parameters still verify, and are
+    reported by password_needs_rehash.
+    """
+    return CryptContext(
+        schemes=[settings.PASSWORD_HASH_SCHEME] + [
+            scheme for scheme in ("bcrypt", "argon2") if scheme != settings.PASSWORD_HASH_SCHEME
+        ],
+        deprecated="auto",
+        bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+        argon2__time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+        argon2__memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST,
+        argon2__parallelism=settings.PASSWORD_ARGON2_PARALLELISM
+    )
 
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = create_password_context()
+
+# Bounded pool for CPU-bound password hashing, so bcrypt never runs on the
+# event loop and cannot starve the default threadpool used for DB work
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+
+# Verified token -> payload cache; always in-process so tokens never leave the worker
+token_cache = get_cache(
+    "token",
+    ttl=settings.TOKEN_CACHE_TTL_SECONDS,
+    maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+    backend="memory"
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -25,6 +65,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(password_truncated, hashed_password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a hash was made with another scheme or cost than the current settings
+    """
+    return pwd_context.needs_update(hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     """
     Generate password hash
@@ -55,6 +102,56 @@ def get_password_hash(password: str) -> str:
         raise
 
 
+# Moving average of verify_password run time and a fixed hash to verify
+# against, used to make logins without a user take as long as those with one
+verify_seconds: Optional[float] = None
+_dummy_password_hash: Optional[str] = None
+
+
+def _timed_verify_password(plain_password: str, hashed_password: str) -> bool:
+    global verify_seconds
+    started = time.perf_counter()
+    try:
+        return verify_password(plain_password, hashed_password)
+    finally:
+        elapsed = time.perf_counter() - started
+        verify_seconds = elapsed if verify_seconds is None else 0.9 * verify_seconds + 0.1 * elapsed
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password on the password hashing pool without blocking the event loop
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, _timed_verify_password, plain_password, hashed_password)
+
+
+async def dummy_verify_password_async() -> None:
+    """
+    Take about as long as verify_password_async when there is no hash to check
+    
+    A PASSWORD_DUMMY_VERIFY_RATE sample of calls (and every call until a real
+    timing is known) verifies against a fixed hash, which keeps the timing
+    current; the others just sleep for the average verification time, so
+    junk logins cost no CPU.
+    """
+    global _dummy_password_hash
+    if verify_seconds is None or random.random() < settings.PASSWORD_DUMMY_VERIFY_RATE:
+        if _dummy_password_hash is None:
+            _dummy_password_hash = await get_password_hash_async("dummy-password")
+        await verify_password_async("not-the-dummy-password", _dummy_password_hash)
+    else:
+        await asyncio.sleep(verify_seconds)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Generate a password hash on the password hashing pool without blocking the event loop
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
     Create JWT access token
@@ -101,6 +198,10 @@ def decode_token(token: str) -> Dict[str, Any]:
     """
     Decode and verify JWT token
     
+    Verified payloads are kept in an in-process LRU cache until the token's
+    exp (or TOKEN_CACHE_TTL_SECONDS, whichever comes first), so repeated
+    requests with the same token skip signature verification.
+    
     Args:
         token: JWT token to decode
         
@@ -110,15 +211,28 @@ def decode_token(token: str) -> Dict[str, Any]:
     Raises:
         HTTPException: If token is invalid or expired
     """
+    now = time.time()
+    
+    cached = token_cache.get(token)
+    if cached is not None and cached.get("exp", now + 1) > now:
+        return dict(cached)
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    ttl = settings.TOKEN_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = min(ttl, int(exp - now))
+    token_cache.set(token, payload, ttl=ttl)
+    
+    return dict(payload)
 
 
 def verify_token_type(payload: Dict[str, Any], expected_type: str) -> bool:
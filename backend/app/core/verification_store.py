@@ -0,0 +1,133 @@
+"""
+Verification code stores
+
+By default codes live in the verification_codes table, which costs an INSERT,
+a SELECT and an UPDATE per code. Since codes are short-lived and single-use,
+they can instead be kept as one key per (phone, purpose) with a TTL:
+
+- memory: in-process dict, for tests and single-worker development
+- redis: shared between workers through settings.REDIS_URL; consume is a
+  single Lua script, so a code can only ever be used once
+
+Issuing a new code replaces the previous one for the same phone and purpose.
+"""
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+
+
+class CodeStore:
+    """Key/TTL verification code store"""
+
+    def issue(self, phone: str, purpose: str, code: str, ttl: int) -> None:
+        """Store a code for ttl seconds, replacing any previous one"""
+        raise NotImplementedError
+
+    def check(self, phone: str, purpose: str, code: str) -> bool:
+        """Check a code without using it up"""
+        raise NotImplementedError
+
+    def consume(self, phone: str, purpose: str, code: str) -> bool:
+        """Atomically check a code and delete it; True if it was valid"""
+        raise NotImplementedError
+
+    @staticmethod
+    def _key(phone: str, purpose: str) -> str:
+        return f"{purpose}:{phone}"
+
+
+class MemoryCodeStore(CodeStore):
+    """In-process store; the oldest codes are dropped beyond maxsize"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def issue(self, phone: str, purpose: str, code: str, ttl: int) -> None:
+        key = self._key(phone, purpose)
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + ttl, code)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def check(self, phone: str, purpose: str, code: str) -> bool:
+        with self._lock:
+            return self._match(self._key(phone, purpose), code)
+
+    def consume(self, phone: str, purpose: str, code: str) -> bool:
+        key = self._key(phone, purpose)
+        with self._lock:
+            if not self._match(key, code):
+                return False
+            del self._data[key]
+            return True
+
+    def _match(self, key: str, code: str) -> bool:
+        # Caller holds the lock
+        entry = self._data.get(key)
+        if entry is None:
+            return False
+        expires_at, stored = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return False
+        return hmac.compare_digest(stored, code)
+
+
+class RedisCodeStore(CodeStore):
+    """Redis store with native key expiry"""
+
+    # Delete the key only if it still holds the submitted code
+    _CONSUME_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return 0
+"""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._consume = self._client.register_script(self._CONSUME_SCRIPT)
+        self._prefix = "nailsdash:verification:"
+
+    def issue(self, phone: str, purpose: str, code: str, ttl: int) -> None:
+        self._client.set(self._prefix + self._key(phone, purpose), code, ex=ttl)
+
+    def check(self, phone: str, purpose: str, code: str) -> bool:
+        stored = self._client.get(self._prefix + self._key(phone, purpose))
+        return stored is not None and hmac.compare_digest(stored, code.encode())
+
+    def consume(self, phone: str, purpose: str, code: str) -> bool:
+        return bool(self._consume(keys=[self._prefix + self._key(phone, purpose)], args=[code]))
+
+
+_store: Optional[CodeStore] = None
+
+
+def get_code_store() -> Optional[CodeStore]:
+    """
+    Get the configured code store
+
+    Returns:
+        Store instance, or None when codes are kept in the database
+    """
+    global _store
+    backend = settings.VERIFICATION_CODE_BACKEND.lower()
+    if backend == "database":
+        return None
+
+    if _store is None:
+        if backend == "redis":
+            _store = RedisCodeStore(settings.REDIS_URL)
+        else:
+            _store = MemoryCodeStore(maxsize=settings.VERIFICATION_CODE_MEMORY_MAX_SIZE)
+    return _store
@@ -1,13 +1,33 @@
 """
 Appointment CRUD operations
 """
+from collections import defaultdict
+from sqlalchemy import case, func, literal, or_, select, union_all
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import date, time, datetime, timedelta
 from app.models.appointment import Appointment, AppointmentStatus
 from app.models.store import Store
 from app.models.service import Service
+from app.models.technician_day_lock import TechnicianDayLock
 from app.schemas.appointment import AppointmentCreate, AppointmentUpdate
+from app.crud import store_daily_stats as crud_stats
+from app.core.availability import appointment_end_time, first_overlap
+from app.core.pagination import decode_cursor, encode_cursor, keyset
+
+
+# Sort key of appointment listings; the id makes it unique for keyset pagination
+APPOINTMENT_SORT_KEY = (Appointment.appointment_date, Appointment.appointment_time, Appointment.id)
+
+
+def decode_appointment_cursor(cursor: str) -> tuple:
+    """Decode an appointment listing cursor (raises ValueError if malformed)"""
+    return decode_cursor(cursor, (date, time, int))
+
+
+def appointment_cursor(appointment: Appointment) -> str:
+    """Build the cursor that continues a listing after this appointment"""
+    return encode_cursor((appointment.appointment_date, appointment.appointment_time, appointment.id))
 
 
 def get_appointment(db: Session, appointment_id: int) -> Optional[Appointment]:
@@ -31,71 +51,380 @@ def get_user_appointments(
     return query.order_by(Appointment.appointment_date.desc(), Appointment.appointment_time.desc()).offset(skip).limit(limit).all()
 
 
-def get_user_appointments_with_details(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    """Get user's appointments with store and service details"""
-    appointments = db.query(
+def get_user_appointments_with_details(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[tuple] = None
+):
+    """
+    Get user's appointments with store and service details, newest first
+    
+    Pass the decoded cursor of the last row already returned as `after` to get
+    the next page by keyset instead of offset.
+    """
+    query = db.query(
         Appointment,
         Store.name.label('store_name'),
         Service.name.label('service_name'),
         Service.price.label('service_price'),
-        Service.duration_minutes.label('service_duration')
+        Appointment.duration_minutes.label('service_duration')
     ).join(
         Store, Appointment.store_id == Store.id
     ).join(
         Service, Appointment.service_id == Service.id
     ).filter(
         Appointment.user_id == user_id
-    ).order_by(
-        Appointment.appointment_date.desc(),
-        Appointment.appointment_time.desc()
-    ).offset(skip).limit(limit).all()
+    )
     
-    return appointments
+    return keyset(query, APPOINTMENT_SORT_KEY, after=after, descending=True).offset(skip).limit(limit).all()
+
 
+def get_technician_busy_rows(
+    db: Session,
+    technician_ids: List[int],
+    start_date: date,
+    end_date: date
+):
+    """
+    Get active appointments for several technicians over a date range in one query
 
-def create_appointment(db: Session, appointment: AppointmentCreate, user_id: int) -> Appointment:
-    """Create new appointment"""
+    Legacy rows without a duration (their service was deleted before the
+    duration was stored) are left out, as they cannot block a slot.
+
+    Returns (technician_id, appointment_date, appointment_time, duration_minutes) rows
+    """
+    if not technician_ids:
+        return []
+    
+    return db.query(
+        Appointment.technician_id,
+        Appointment.appointment_date,
+        Appointment.appointment_time,
+        Appointment.duration_minutes
+    ).filter(
+        Appointment.technician_id.in_(technician_ids),
+        Appointment.appointment_date >= start_date,
+        Appointment.appointment_date <= end_date,
+        Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]),
+        Appointment.duration_minutes.isnot(None)
+    ).all()
+
+
+def lock_technician_day(db: Session, technician_id: int, lock_date: date) -> None:
+    """
+    Take an exclusive row lock serializing bookings of a technician on a day
+    
+    The lock row is created on first use and locked by the same upsert, which
+    takes an exclusive lock directly (no shared-then-exclusive upgrade that
+    could deadlock two bookings). It is held until the caller commits or
+    rolls back.
+    
+    Must be the first statement of the booking transaction: under REPEATABLE
+    READ a snapshot taken before the lock was granted would not see bookings
+    committed while waiting for it.
+    
+    Taken by every write that puts a technician's appointment on a day
+    (create, batch create and rescheduling). Appointments without a
+    technician hold no shared resource and are not locked; the only check
+    that applies to them, the booking user's own overlaps, is not
+    serialized.
+    """
+    values = {"technician_id": technician_id, "lock_date": lock_date}
+    
+    if db.get_bind().dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(TechnicianDayLock).values(**values).on_duplicate_key_update(locked_at=func.now())
+    else:
+        # SQLite (local development) serializes writers on the database lock
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(TechnicianDayLock).values(**values).on_conflict_do_update(
+            index_elements=["technician_id", "lock_date"],
+            set_={"locked_at": func.now()}
+        )
+    
+    db.execute(stmt)
+
+
+def _add_appointment(
+    db: Session,
+    appointment: AppointmentCreate,
+    user_id: int,
+    service: Optional[Service],
+    stats_deltas: Optional[Dict[tuple, list]] = None
+) -> Appointment:
+    """
+    Add a pending appointment and its rollup change to the session (no commit)
+    
+    When stats_deltas is given, the rollup change is added to it (keyed by
+    (store_id, date, status)) for the caller to write in one upsert.
+    """
     db_appointment = Appointment(
         **appointment.dict(),
-        user_id=user_id
+        user_id=user_id,
+        status=AppointmentStatus.PENDING.value
     )
     db.add(db_appointment)
+    
+    if service:
+        # Capture the duration so later overlap checks are plain range queries
+        db_appointment.duration_minutes = service.duration_minutes
+        db_appointment.end_time = appointment_end_time(
+            db_appointment.appointment_time,
+            service.duration_minutes
+        )
+        # and the price, so rollup revenue does not follow later price edits
+        db_appointment.price = service.price
+        
+        # Keep the daily rollup in the same transaction
+        if stats_deltas is not None:
+            delta = stats_deltas[(db_appointment.store_id, db_appointment.appointment_date, db_appointment.status)]
+            delta[0] += 1
+            delta[1] += service.price or 0.0
+        else:
+            crud_stats.record_change(
+                db,
+                store_id=db_appointment.store_id,
+                price=service.price,
+                new_date=db_appointment.appointment_date,
+                new_status=db_appointment.status
+            )
+    
+    return db_appointment
+
+
+def create_appointment(
+    db: Session,
+    appointment: AppointmentCreate,
+    user_id: int,
+    service: Optional[Service] = None
+) -> Appointment:
+    """Create new appointment (pass the booked service if already loaded)"""
+    if service is None:
+        service = db.query(Service).filter(Service.id == appointment.service_id).first()
+    
+    db_appointment = _add_appointment(db, appointment, user_id, service)
     db.commit()
     db.refresh(db_appointment)
     return db_appointment
 
 
+def create_appointments_batch(
+    db: Session,
+    appointments: List[AppointmentCreate],
+    user_id: int,
+    services: Dict[int, Service]
+) -> List[Appointment]:
+    """
+    Create several appointments in one transaction
+    
+    Args:
+        appointments: Appointments to book, already checked for conflicts
+        user_id: Booking user
+        services: Booked services by ID
+    
+    Returns:
+        Created appointments in request order
+    """
+    stats_deltas = defaultdict(lambda: [0, 0.0])
+    db_appointments = [
+        _add_appointment(db, appointment, user_id, services.get(appointment.service_id), stats_deltas)
+        for appointment in appointments
+    ]
+    crud_stats.apply_deltas(db, stats_deltas)
+    db.flush()
+    appointment_ids = [db_appointment.id for db_appointment in db_appointments]
+    db.commit()
+    
+    # Reload the expired instances with one query instead of a refresh per row
+    db.query(Appointment).filter(Appointment.id.in_(appointment_ids)).all()
+    return db_appointments
+
+
+def _record_stats_change(db: Session, db_appointment: Appointment, old_date: date, old_status) -> None:
+    """Move an appointment between daily rollup buckets after a date or status change"""
+    price = db_appointment.price
+    if price is None:
+        # Booked before the price was captured: fall back to the service price
+        price = db.query(Service.price).filter(Service.id == db_appointment.service_id).scalar()
+    
+    crud_stats.record_change(
+        db,
+        store_id=db_appointment.store_id,
+        price=price,
+        old_date=old_date,
+        old_status=old_status,
+        new_date=db_appointment.appointment_date,
+        new_status=db_appointment.status
+    )
+
+
 def update_appointment(
     db: Session,
     appointment_id: int,
-    appointment: AppointmentUpdate
+    appointment: AppointmentUpdate,
+    db_appointment: Optional[Appointment] = None
 ) -> Optional[Appointment]:
-    """Update appointment"""
-    db_appointment = get_appointment(db, appointment_id)
+    """Update appointment (pass the appointment if already loaded)"""
+    if db_appointment is None:
+        db_appointment = get_appointment(db, appointment_id)
     if not db_appointment:
         return None
     
+    old_date = db_appointment.appointment_date
+    old_status = db_appointment.status
+    
     update_data = appointment.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_appointment, field, value)
     
+    if "appointment_time" in update_data and db_appointment.duration_minutes is not None:
+        db_appointment.end_time = appointment_end_time(
+            db_appointment.appointment_time,
+            db_appointment.duration_minutes
+        )
+    
+    if "appointment_date" in update_data or "status" in update_data:
+        _record_stats_change(db, db_appointment, old_date, old_status)
+    
     db.commit()
     db.refresh(db_appointment)
     return db_appointment
 
 
-def cancel_appointment(db: Session, appointment_id: int) -> Optional[Appointment]:
-    """Cancel appointment"""
-    db_appointment = get_appointment(db, appointment_id)
+def cancel_appointment(
+    db: Session,
+    appointment_id: int,
+    db_appointment: Optional[Appointment] = None
+) -> Optional[Appointment]:
+    """Cancel appointment (pass the appointment if already loaded)"""
+    if db_appointment is None:
+        db_appointment = get_appointment(db, appointment_id)
     if not db_appointment:
         return None
     
+    old_status = db_appointment.status
     db_appointment.status = AppointmentStatus.CANCELLED
+    _record_stats_change(db, db_appointment, db_appointment.appointment_date, old_status)
+    
     db.commit()
     db.refresh(db_appointment)
     return db_appointment
 
 
+def _move_to_status(db: Session, rows, status: AppointmentStatus) -> List[int]:
+    """
+    Set a new status on already selected rows with one UPDATE (no commit)
+    
+    Rows are (id, store_id, appointment_date, status, price) tuples; the daily
+    rollup changes of all (store, date, status) buckets are written by one
+    upsert, so the statement count does not grow with the data.
+    
+    Returns:
+        IDs of the updated appointments
+    """
+    updated_ids = [row.id for row in rows]
+    if not updated_ids:
+        return []
+    
+    db.query(Appointment).filter(
+        Appointment.id.in_(updated_ids)
+    ).update({Appointment.status: status.value}, synchronize_session=False)
+    
+    deltas = defaultdict(lambda: [0, 0.0])
+    for row in rows:
+        price = row.price or 0.0
+        old_bucket = deltas[(row.store_id, row.appointment_date, row.status)]
+        old_bucket[0] -= 1
+        old_bucket[1] -= price
+        new_bucket = deltas[(row.store_id, row.appointment_date, status)]
+        new_bucket[0] += 1
+        new_bucket[1] += price
+    crud_stats.apply_deltas(db, deltas)
+    
+    return updated_ids
+
+
+def _status_rows_query(db: Session, statuses: List[str]):
+    """
+    Select (id, store_id, appointment_date, status, price) rows in the given statuses
+    
+    price is the one captured at booking (the current service price for older
+    rows, 0 if their service was deleted).
+    """
+    return db.query(
+        Appointment.id,
+        Appointment.store_id,
+        Appointment.appointment_date,
+        Appointment.status,
+        func.coalesce(Appointment.price, Service.price).label("price")
+    ).outerjoin(
+        Service, Appointment.service_id == Service.id
+    ).filter(
+        Appointment.status.in_(statuses)
+    )
+
+
+def bulk_update_status(
+    db: Session,
+    store_id: int,
+    status: AppointmentStatus,
+    appointment_ids: Optional[List[int]] = None,
+    appointment_date: Optional[date] = None
+) -> List[int]:
+    """
+    Move many appointments of a store to a new status with one UPDATE
+    
+    Only pending or confirmed appointments of the store are changed (the same rules as confirming or completing one appointment);
+    rows already in the target status are left alone. The matching rows are
+    locked first so the daily rollup can be adjusted per (date, old status)
+    bucket in the same transaction.
+    
+    Returns:
+        IDs of the appointments that were updated
+    """
+    source_statuses = [
+        value for value in (AppointmentStatus.PENDING.value, AppointmentStatus.CONFIRMED.value)
+        if value != status.value
+    ]
+    
+    query = _status_rows_query(db, source_statuses).filter(Appointment.store_id == store_id)
+    if appointment_ids is not None:
+        query = query.filter(Appointment.id.in_(appointment_ids))
+    if appointment_date is not None:
+        query = query.filter(Appointment.appointment_date == appointment_date)
+    
+    updated_ids = _move_to_status(db, query.with_for_update().all(), status)
+    db.commit()
+    return updated_ids
+
+
+def expire_past_appointments(db: Session, before: date, batch_size: int) -> int:
+    """
+    Expire one batch of pending or confirmed appointments dated before a day
+    
+    Rows are taken in id order, locked, updated with a single UPDATE and
+    committed together with their rollup changes. Call repeatedly until it
+    returns less than batch_size.
+    
+    Returns:
+        Number of appointments expired
+    """
+    rows = _status_rows_query(
+        db,
+        [AppointmentStatus.PENDING.value, AppointmentStatus.CONFIRMED.value]
+    ).filter(
+        Appointment.appointment_date < before
+    ).order_by(
+        Appointment.id
+    ).limit(batch_size).with_for_update().all()
+    
+    expired = len(_move_to_status(db, rows, AppointmentStatus.EXPIRED))
+    db.commit()
+    return expired
+
+
 def check_appointment_conflict(
     db: Session,
     store_id: int,
@@ -120,67 +449,170 @@ def check_time_conflict(
     service_id: int,
     technician_id: Optional[int] = None,
     user_id: Optional[int] = None,
-    exclude_appointment_id: Optional[int] = None
+    exclude_appointment_id: Optional[int] = None,
+    duration_minutes: Optional[int] = None
 ) -> dict:
     """
     Check for time conflicts considering service duration
+    
+    Technician and user conflicts are found by one statement: a UNION ALL of
+    two lookups resolved inside the covering *_date_status indexes, ordered so
+    the earliest technician overlap is reported first. Pass duration_minutes
+    when the service is already loaded to skip the service lookup.
+    
     Returns: {"has_conflict": bool, "conflict_type": str, "message": str}
     """
-    from app.models.service import Service
+    if duration_minutes is None:
+        # Get service duration
+        service = db.query(Service).filter(Service.id == service_id).first()
+        if not service:
+            return {"has_conflict": True, "conflict_type": "invalid_service", "message": "Service not found"}
+        duration_minutes = service.duration_minutes
     
-    # Get service duration
-    service = db.query(Service).filter(Service.id == service_id).first()
-    if not service:
-        return {"has_conflict": True, "conflict_type": "invalid_service", "message": "Service not found"}
+    end_time = appointment_end_time(appointment_time, duration_minutes)
     
-    duration_minutes = service.duration_minutes
+    def overlaps(conflict_type: str, owner_filter):
+        # Active appointments on the same date whose [start, end) overlaps the new one
+        query = select(
+            literal(conflict_type).label("conflict_type"),
+            Appointment.appointment_time,
+            Appointment.end_time
+        ).where(
+            owner_filter,
+            Appointment.appointment_date == appointment_date,
+            Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]),
+            Appointment.appointment_time < end_time,
+            Appointment.end_time > appointment_time
+        )
+        # Exclude current appointment if updating
+        if exclude_appointment_id:
+            query = query.where(Appointment.id != exclude_appointment_id)
+        # No ORDER BY here: it would steer the planner to the keyset index,
+        # which gives time order but needs a row lookup per candidate
+        return query
     
-    # Convert appointment_time to datetime for calculation
-    appt_datetime = datetime.combine(appointment_date, appointment_time)
-    appt_end_time = appt_datetime + timedelta(minutes=duration_minutes)
+    branches = []
+    if technician_id:
+        branches.append(overlaps("technician", Appointment.technician_id == technician_id))
+    if user_id:
+        branches.append(overlaps("user", Appointment.user_id == user_id))
     
-    # Build base query for active appointments on the same date
-    query = db.query(Appointment, Service).join(
-        Service, Appointment.service_id == Service.id
-    ).filter(
-        Appointment.appointment_date == appointment_date,
-        Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED])
-    )
+    if branches:
+        candidates = union_all(*branches).subquery()
+        conflict = db.execute(
+            select(candidates).order_by(
+                case((candidates.c.conflict_type == "technician", 0), else_=1),
+                candidates.c.appointment_time
+            ).limit(1)
+        ).first()
+        
+        if conflict:
+            conflict_type, existing_time, existing_end_time = conflict
+            if conflict_type == "technician":
+                message = f"The technician is already booked from {existing_time.strftime('%H:%M')} to {existing_end_time.strftime('%H:%M')}"
+            else:
+                message = f"You already have an appointment from {existing_time.strftime('%H:%M')} to {existing_end_time.strftime('%H:%M')}"
+            return {"has_conflict": True, "conflict_type": conflict_type, "message": message}
+    
+    return {"has_conflict": False, "conflict_type": None, "message": "No conflict"}
+
+
+def check_batch_conflicts(
+    db: Session,
+    appointments: List[AppointmentCreate],
+    user_id: int,
+    services: Dict[int, Service]
+) -> dict:
+    """
+    Check a group booking against itself and existing bookings in one pass
     
-    # Exclude current appointment if updating
-    if exclude_appointment_id:
-        query = query.filter(Appointment.id != exclude_appointment_id)
+    Requested appointments must not overlap each other on the same
+    technician, nor overlap active appointments of their technician or of
+    the booking user. Overlapping requests for different technicians are
+    allowed, since a group books parallel services. Existing bookings are
+    loaded with a single query.
     
-    # Check technician conflict
-    if technician_id:
-        technician_appointments = query.filter(Appointment.technician_id == technician_id).all()
-        
-        for appt, svc in technician_appointments:
-            existing_datetime = datetime.combine(appointment_date, appt.appointment_time)
-            existing_end_time = existing_datetime + timedelta(minutes=svc.duration_minutes)
-            
-            # Check if time ranges overlap
-            if (appt_datetime < existing_end_time and appt_end_time > existing_datetime):
+    Returns: {"has_conflict": bool, "conflict_type": str, "message": str, "index": int}
+    where index is the position of the offending request
+    """
+    requested = []
+    for index, appointment in enumerate(appointments):
+        service = services.get(appointment.service_id)
+        if not service or service.store_id != appointment.store_id:
+            return {"has_conflict": True, "conflict_type": "invalid_service", "message": "Service not found", "index": index}
+        start = datetime.combine(appointment.appointment_date, appointment.appointment_time)
+        end = datetime.combine(
+            appointment.appointment_date,
+            appointment_end_time(appointment.appointment_time, service.duration_minutes)
+        )
+        requested.append((index, appointment, start, end))
+    
+    # Requests sharing a technician and date must not overlap each other
+    by_technician = defaultdict(list)
+    for index, appointment, start, end in requested:
+        if appointment.technician_id:
+            by_technician[(appointment.technician_id, appointment.appointment_date)].append((start, end, index))
+    for intervals in by_technician.values():
+        intervals.sort()
+        for (_, previous_end, _), (start, _, index) in zip(intervals, intervals[1:]):
+            if start < previous_end:
                 return {
                     "has_conflict": True,
-                    "conflict_type": "technician",
-                    "message": f"The technician is already booked from {existing_datetime.strftime('%H:%M')} to {existing_end_time.strftime('%H:%M')}"
+                    "conflict_type": "batch",
+                    "message": "Appointments in the group overlap on the same technician",
+                    "index": index
                 }
     
-    # Check user conflict
-    if user_id:
-        user_appointments = query.filter(Appointment.user_id == user_id).all()
-        
-        for appt, svc in user_appointments:
-            existing_datetime = datetime.combine(appointment_date, appt.appointment_time)
-            existing_end_time = existing_datetime + timedelta(minutes=svc.duration_minutes)
-            
-            # Check if time ranges overlap
-            if (appt_datetime < existing_end_time and appt_end_time > existing_datetime):
+    # One query for every active booking of the involved technicians and the user
+    technician_ids = {appointment.technician_id for appointment in appointments if appointment.technician_id}
+    owner_filter = Appointment.user_id == user_id
+    if technician_ids:
+        owner_filter = or_(owner_filter, Appointment.technician_id.in_(technician_ids))
+    rows = db.query(
+        Appointment.technician_id,
+        Appointment.user_id,
+        Appointment.appointment_date,
+        Appointment.appointment_time,
+        Appointment.end_time
+    ).filter(
+        owner_filter,
+        Appointment.appointment_date.in_({appointment.appointment_date for appointment in appointments}),
+        Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]),
+        Appointment.end_time.isnot(None)
+    ).all()
+    
+    technician_busy = defaultdict(list)
+    user_busy = defaultdict(list)
+    for technician_id, row_user_id, appointment_date, appointment_time, end_time in rows:
+        interval = (
+            datetime.combine(appointment_date, appointment_time),
+            datetime.combine(appointment_date, end_time)
+        )
+        if technician_id in technician_ids:
+            technician_busy[(technician_id, appointment_date)].append(interval)
+        if row_user_id == user_id:
+            user_busy[appointment_date].append(interval)
+    for intervals in (*technician_busy.values(), *user_busy.values()):
+        intervals.sort()
+    
+    for index, appointment, start, end in requested:
+        if appointment.technician_id:
+            overlap = first_overlap(technician_busy[(appointment.technician_id, appointment.appointment_date)], start, end)
+            if overlap:
                 return {
                     "has_conflict": True,
-                    "conflict_type": "user",
-                    "message": f"You already have an appointment from {existing_datetime.strftime('%H:%M')} to {existing_end_time.strftime('%H:%M')}"
+                    "conflict_type": "technician",
+                    "message": f"The technician is already booked from {overlap[0].strftime('%H:%M')} to {overlap[1].strftime('%H:%M')}",
+                    "index": index
                 }
+        
+        overlap = first_overlap(user_busy[appointment.appointment_date], start, end)
+        if overlap:
+            return {
+                "has_conflict": True,
+                "conflict_type": "user",
+                "message": f"You already have an appointment from {overlap[0].strftime('%H:%M')} to {overlap[1].strftime('%H:%M')}",
+                "index": index
+            }
     
-    return {"has_conflict": False, "conflict_type": None, "message": "No conflict"}
+    return {"has_conflict": False, "conflict_type": None, "message": "No conflict", "index": None}
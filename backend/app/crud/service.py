@@ -1,10 +1,14 @@
 """
 Service CRUD operations
 """
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
 from app.models.service import Service
 from app.schemas.service import ServiceCreate, ServiceUpdate
+from app.core import catalog_cache
 
 
 def get_service(db: Session, service_id: int) -> Optional[Service]:
@@ -12,6 +16,27 @@ def get_service(db: Session, service_id: int) -> Optional[Service]:
     return db.query(Service).filter(Service.id == service_id).first()
 
 
+def get_services_by_ids(db: Session, service_ids) -> Dict[int, Service]:
+    """Get several services with one query, keyed by ID"""
+    if not service_ids:
+        return {}
+    services = db.query(Service).filter(Service.id.in_(set(service_ids))).all()
+    return {service.id: service for service in services}
+
+
+def _filter_services(query, store_id: Optional[int] = None, category: Optional[str] = None):
+    """Apply the service list filters to a select() or Query"""
+    query = query.where(Service.is_active == 1)
+    
+    if store_id:
+        query = query.where(Service.store_id == store_id)
+    
+    if category:
+        query = query.where(Service.category == category)
+    
+    return query
+
+
 def get_services(
     db: Session,
     skip: int = 0,
@@ -20,14 +45,7 @@ def get_services(
     category: Optional[str] = None
 ) -> List[Service]:
     """Get list of services with optional filters"""
-    query = db.query(Service).filter(Service.is_active == 1)
-    
-    if store_id:
-        query = query.filter(Service.store_id == store_id)
-    
-    if category:
-        query = query.filter(Service.category == category)
-    
+    query = _filter_services(db.query(Service), store_id=store_id, category=category)
     return query.offset(skip).limit(limit).all()
 
 
@@ -43,7 +61,9 @@ def create_service(db: Session, service: ServiceCreate) -> Service:
     """Create new service"""
     db_service = Service(**service.dict())
     db.add(db_service)
+    catalog_cache.bump_version(db, catalog_cache.SERVICES)
     db.commit()
+    catalog_cache.invalidate(catalog_cache.SERVICES)
     db.refresh(db_service)
     return db_service
 
@@ -58,7 +78,9 @@ def update_service(db: Session, service_id: int, service: ServiceUpdate) -> Opti
     for field, value in update_data.items():
         setattr(db_service, field, value)
     
+    catalog_cache.bump_version(db, catalog_cache.SERVICES)
     db.commit()
+    catalog_cache.invalidate(catalog_cache.SERVICES)
     db.refresh(db_service)
     return db_service
 
@@ -79,5 +101,82 @@ def delete_service(db: Session, service_id: int) -> bool:
         return False
     
     db.delete(db_service)
+    catalog_cache.bump_version(db, catalog_cache.SERVICES)
     db.commit()
+    catalog_cache.invalidate(catalog_cache.SERVICES)
     return True
+
+
+async def get_service_async(db: AsyncSession, service_id: int) -> Optional[Service]:
+    """Get service by ID (async)"""
+    result = await db.execute(select(Service).where(Service.id == service_id))
+    return result.scalars().first()
+
+
+async def get_services_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    store_id: Optional[int] = None,
+    category: Optional[str] = None
+) -> List[Service]:
+    """Get list of services with optional filters (async)"""
+    query = _filter_services(select(Service), store_id=store_id, category=category)
+    result = await db.execute(query.offset(skip).limit(limit))
+    return list(result.scalars().all())
+
+
+async def get_services_version_async(
+    db: AsyncSession,
+    store_id: Optional[int] = None,
+    category: Optional[str] = None
+) -> Tuple[int, Optional[datetime], int]:
+    """Get (count, last change, write counter) of the services matching the list filters"""
+    query = _filter_services(
+        select(*catalog_cache.version_columns(Service, catalog_cache.SERVICES)),
+        store_id=store_id,
+        category=category
+    )
+    result = await db.execute(query)
+    return tuple(result.one())
+
+
+async def get_service_version_async(db: AsyncSession, service_id: int) -> Tuple[int, Optional[datetime], int]:
+    """Get (count, last change, write counter) of a single service"""
+    result = await db.execute(
+        select(*catalog_cache.version_columns(Service, catalog_cache.SERVICES)).where(Service.id == service_id)
+    )
+    return tuple(result.one())
+
+
+async def get_store_services_async(db: AsyncSession, store_id: int) -> List[Service]:
+    """Get all services for a specific store (async)"""
+    result = await db.execute(
+        select(Service).where(
+            Service.store_id == store_id,
+            Service.is_active == 1
+        )
+    )
+    return list(result.scalars().all())
+
+
+async def get_service_categories_async(db: AsyncSession) -> List[str]:
+    """Get list of unique service categories (async)"""
+    result = await db.execute(
+        select(Service.category).where(
+            Service.is_active == 1,
+            Service.category.isnot(None)
+        ).distinct()
+    )
+    return [cat for cat in result.scalars().all() if cat]
+
+
+async def get_service_categories_version_async(db: AsyncSession) -> Tuple[int, Optional[datetime], int]:
+    """Get (count, last change, write counter) of the services that contribute a category"""
+    result = await db.execute(
+        select(*catalog_cache.version_columns(Service, catalog_cache.SERVICES)).where(
+            Service.is_active == 1,
+            Service.category.isnot(None)
+        )
+    )
+    return tuple(result.one())
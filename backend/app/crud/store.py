@@ -1,10 +1,14 @@
 """
 Store CRUD operations
 """
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from datetime import datetime
 from app.models.store import Store, StoreImage
 from app.schemas.store import StoreCreate, StoreUpdate
+from app.core import catalog_cache
 
 
 def get_store(db: Session, store_id: int) -> Optional[Store]:
@@ -12,6 +16,20 @@ def get_store(db: Session, store_id: int) -> Optional[Store]:
     return db.query(Store).filter(Store.id == store_id).first()
 
 
+def _filter_stores(query, city: Optional[str] = None, search: Optional[str] = None):
+    """Apply the store list filters to a select() or Query"""
+    if city:
+        query = query.where(Store.city == city)
+    
+    if search:
+        query = query.where(
+            (Store.name.contains(search)) |
+            (Store.address.contains(search))
+        )
+    
+    return query
+
+
 def get_stores(
     db: Session,
     skip: int = 0,
@@ -20,17 +38,7 @@ def get_stores(
     search: Optional[str] = None
 ) -> List[Store]:
     """Get list of stores with optional filters"""
-    query = db.query(Store)
-    
-    if city:
-        query = query.filter(Store.city == city)
-    
-    if search:
-        query = query.filter(
-            (Store.name.contains(search)) |
-            (Store.address.contains(search))
-        )
-    
+    query = _filter_stores(db.query(Store), city=city, search=search)
     return query.offset(skip).limit(limit).all()
 
 
@@ -38,7 +46,9 @@ def create_store(db: Session, store: StoreCreate) -> Store:
     """Create new store"""
     db_store = Store(**store.dict())
     db.add(db_store)
+    catalog_cache.bump_version(db, catalog_cache.STORES)
     db.commit()
+    catalog_cache.invalidate(catalog_cache.STORES)
     db.refresh(db_store)
     return db_store
 
@@ -53,7 +63,9 @@ def update_store(db: Session, store_id: int, store: StoreUpdate) -> Optional[Sto
     for field, value in update_data.items():
         setattr(db_store, field, value)
     
+    catalog_cache.bump_version(db, catalog_cache.STORES)
     db.commit()
+    catalog_cache.invalidate(catalog_cache.STORES)
     db.refresh(db_store)
     return db_store
 
@@ -74,7 +86,9 @@ def create_store_image(db: Session, store_id: int, image_url: str, is_primary: i
         display_order=display_order
     )
     db.add(db_image)
+    catalog_cache.bump_version(db, catalog_cache.STORES)
     db.commit()
+    catalog_cache.invalidate(catalog_cache.STORES)
     db.refresh(db_image)
     return db_image
 
@@ -90,7 +104,9 @@ def delete_store(db: Session, store_id: int) -> bool:
     
     # Delete store
     db.delete(db_store)
+    catalog_cache.bump_version(db, catalog_cache.STORES, catalog_cache.SERVICES, catalog_cache.TECHNICIANS)
     db.commit()
+    catalog_cache.invalidate(catalog_cache.STORES, catalog_cache.SERVICES, catalog_cache.TECHNICIANS)
     return True
 
 
@@ -105,5 +121,71 @@ def delete_store_image(db: Session, image_id: int, store_id: int) -> bool:
         return False
     
     db.delete(db_image)
+    catalog_cache.bump_version(db, catalog_cache.STORES)
     db.commit()
+    catalog_cache.invalidate(catalog_cache.STORES)
     return True
+
+
+async def get_store_async(db: AsyncSession, store_id: int) -> Optional[Store]:
+    """Get store by ID (async)"""
+    result = await db.execute(select(Store).where(Store.id == store_id))
+    return result.scalars().first()
+
+
+async def get_stores_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    city: Optional[str] = None,
+    search: Optional[str] = None
+) -> List[Store]:
+    """Get list of stores with optional filters (async)"""
+    query = _filter_stores(select(Store), city=city, search=search)
+    result = await db.execute(query.offset(skip).limit(limit))
+    return list(result.scalars().all())
+
+
+async def get_stores_version_async(
+    db: AsyncSession,
+    city: Optional[str] = None,
+    search: Optional[str] = None
+) -> Tuple[int, Optional[datetime], int]:
+    """Get (count, last change, write counter) of the stores matching the list filters"""
+    query = _filter_stores(select(*catalog_cache.version_columns(Store, catalog_cache.STORES)), city=city, search=search)
+    result = await db.execute(query)
+    return tuple(result.one())
+
+
+async def get_store_version_async(db: AsyncSession, store_id: int) -> Tuple[int, Optional[datetime], int]:
+    """Get (count, last change, write counter) of a store together with its images"""
+    result = await db.execute(
+        select(*catalog_cache.version_columns(Store, catalog_cache.STORES)).where(Store.id == store_id)
+    )
+    count, changed, version = result.one()
+    if not count:
+        return 0, None, version
+    
+    result = await db.execute(
+        select(*catalog_cache.version_columns(StoreImage, catalog_cache.STORES)).where(StoreImage.store_id == store_id)
+    )
+    image_count, image_changed, _ = result.one()
+    return count + image_count, max(filter(None, [changed, image_changed]), default=None), version
+
+
+async def get_store_images_version_async(db: AsyncSession, store_id: int) -> Tuple[int, Optional[datetime], int]:
+    """Get (count, last change, write counter) of a store's images"""
+    result = await db.execute(
+        select(*catalog_cache.version_columns(StoreImage, catalog_cache.STORES)).where(StoreImage.store_id == store_id)
+    )
+    return tuple(result.one())
+
+
+async def get_store_images_async(db: AsyncSession, store_id: int) -> List[StoreImage]:
+    """Get store images (async)"""
+    result = await db.execute(
+        select(StoreImage).where(
+            StoreImage.store_id == store_id
+        ).order_by(StoreImage.display_order)
+    )
+    return list(result.scalars().all())
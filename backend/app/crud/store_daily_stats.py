@@ -0,0 +1,213 @@
+"""
+Store daily stats CRUD operations
+
+The store_daily_stats table is a rollup of appointments per store, date and
+status. It is maintained incrementally by the appointment CRUD functions and
+can be rebuilt from the appointments table at any time. Revenue is based on
+the price each appointment captured at booking (Appointment.price), so editing
+a service price later does not make the rollup disagree with a rebuild.
+Appointments count towards their own store_id, so they stay in the rollup
+when their service is deleted.
+"""
+from collections import defaultdict
+from sqlalchemy import and_, case, func, insert, select
+from sqlalchemy.orm import Session
+from typing import Dict, Optional, Tuple
+from datetime import date
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.service import Service
+from app.models.store_daily_stats import StoreDailyStats
+
+
+def _status_value(status) -> str:
+    """Normalize an AppointmentStatus member or raw string to its value"""
+    return status.value if isinstance(status, AppointmentStatus) else status
+
+
+def apply_deltas(
+    db: Session,
+    deltas: Dict[Tuple[int, date, str], Tuple[int, float]]
+) -> None:
+    """
+    Atomically add deltas to several rollup rows with one upsert statement
+
+    Args:
+        deltas: (count_delta, revenue_delta) by (store_id, stat_date, status);
+            buckets whose deltas cancel out are skipped
+
+    Uses a multi-row upsert so concurrent bookings never race on row creation
+    and the statement count does not grow with the number of buckets.
+    Does not commit; the caller commits together with the appointment change.
+    """
+    merged = defaultdict(lambda: [0, 0.0])
+    for (store_id, stat_date, status), (count_delta, revenue_delta) in deltas.items():
+        # Statuses may be given as enum members or values; one row per key
+        bucket = merged[(store_id, stat_date, _status_value(status))]
+        bucket[0] += count_delta
+        bucket[1] += revenue_delta
+    rows = [
+        {
+            "store_id": store_id,
+            "stat_date": stat_date,
+            "status": status,
+            "appointment_count": count_delta,
+            "revenue": revenue_delta
+        }
+        for (store_id, stat_date, status), (count_delta, revenue_delta) in merged.items()
+        if count_delta or revenue_delta
+    ]
+    if not rows:
+        return
+
+    if db.get_bind().dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(StoreDailyStats).values(rows)
+        stmt = stmt.on_duplicate_key_update(
+            appointment_count=StoreDailyStats.appointment_count + stmt.inserted.appointment_count,
+            revenue=StoreDailyStats.revenue + stmt.inserted.revenue,
+            updated_at=func.now()
+        )
+    else:
+        # SQLite (local development) supports ON CONFLICT DO UPDATE
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(StoreDailyStats).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["store_id", "stat_date", "status"],
+            set_={
+                "appointment_count": StoreDailyStats.appointment_count + stmt.excluded.appointment_count,
+                "revenue": StoreDailyStats.revenue + stmt.excluded.revenue,
+                "updated_at": func.now()
+            }
+        )
+
+    db.execute(stmt)
+
+
+def record_change(
+    db: Session,
+    store_id: int,
+    price: float,
+    old_date: Optional[date] = None,
+    old_status=None,
+    new_date: Optional[date] = None,
+    new_status=None
+) -> None:
+    """
+    Move one appointment between rollup buckets
+
+    Pass only the new bucket for a newly created appointment, or both buckets
+    when its date or status changed; both are written by one upsert. Does not
+    commit.
+    """
+    old_bucket = (old_date, _status_value(old_status)) if old_date is not None else None
+    new_bucket = (new_date, _status_value(new_status)) if new_date is not None else None
+    if old_bucket == new_bucket:
+        return
+
+    deltas = {}
+    if old_bucket:
+        deltas[(store_id, *old_bucket)] = (-1, -(price or 0.0))
+    if new_bucket:
+        deltas[(store_id, *new_bucket)] = (1, price or 0.0)
+    apply_deltas(db, deltas)
+
+
+def rebuild(
+    db: Session,
+    store_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> int:
+    """
+    Recompute rollup rows from the appointments table
+
+    Existing rows in the selected scope are replaced in a single transaction.
+
+    Returns:
+        Number of rollup rows written
+    """
+    delete_query = db.query(StoreDailyStats)
+    source = select(
+        Appointment.store_id,
+        Appointment.appointment_date,
+        Appointment.status,
+        func.count(Appointment.id),
+        func.coalesce(func.sum(func.coalesce(Appointment.price, Service.price)), 0.0)
+    ).outerjoin(
+        Service, Appointment.service_id == Service.id
+    )
+
+    if store_id is not None:
+        delete_query = delete_query.filter(StoreDailyStats.store_id == store_id)
+        source = source.where(Appointment.store_id == store_id)
+    if start_date is not None:
+        delete_query = delete_query.filter(StoreDailyStats.stat_date >= start_date)
+        source = source.where(Appointment.appointment_date >= start_date)
+    if end_date is not None:
+        delete_query = delete_query.filter(StoreDailyStats.stat_date <= end_date)
+        source = source.where(Appointment.appointment_date <= end_date)
+
+    source = source.group_by(Appointment.store_id, Appointment.appointment_date, Appointment.status)
+
+    delete_query.delete(synchronize_session=False)
+    result = db.execute(
+        insert(StoreDailyStats).from_select(
+            ["store_id", "stat_date", "status", "appointment_count", "revenue"],
+            source
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def get_status_totals(
+    db: Session,
+    store_id: int,
+    windows: Dict[str, Tuple[date, Optional[date]]]
+) -> Dict[str, Dict[str, float]]:
+    """
+    Sum a store's rollup rows per status for several date windows in one pass
+
+    Each window is an inclusive (start, end) date range; an end of None leaves the
+    window open-ended. All windows are evaluated by a single GROUP BY status query
+    over at most one row per day and status.
+
+    Returns: {window_name: {"total": int, "<status>": int, ..., "revenue": float}}
+    """
+    totals = {
+        name: {"total": 0, **{s.value: 0 for s in AppointmentStatus}, "revenue": 0.0}
+        for name in windows
+    }
+    if not windows:
+        return totals
+
+    columns = []
+    for name, (start, end) in windows.items():
+        condition = StoreDailyStats.stat_date >= start
+        if end is not None:
+            condition = and_(condition, StoreDailyStats.stat_date <= end)
+        columns.append(func.sum(case((condition, StoreDailyStats.appointment_count), else_=0)))
+        columns.append(func.sum(case((condition, StoreDailyStats.revenue), else_=0.0)))
+
+    # Restrict the scan to the union of all windows
+    query = db.query(StoreDailyStats.status, *columns).filter(
+        StoreDailyStats.store_id == store_id,
+        StoreDailyStats.stat_date >= min(start for start, _ in windows.values())
+    )
+    ends = [end for _, end in windows.values()]
+    if None not in ends:
+        query = query.filter(StoreDailyStats.stat_date <= max(ends))
+
+    for status, *sums in query.group_by(StoreDailyStats.status).all():
+        for index, name in enumerate(windows):
+            count = int(sums[2 * index] or 0)
+            totals[name][status] = count
+            totals[name]["total"] += count
+            # Cancelled and expired appointments do not generate revenue
+            if status not in (AppointmentStatus.CANCELLED.value, AppointmentStatus.EXPIRED.value):
+                totals[name]["revenue"] += float(sums[2 * index + 1] or 0.0)
+
+    for name in totals:
+        totals[name]["revenue"] = round(totals[name]["revenue"], 2)
+
+    return totals
@@ -1,10 +1,14 @@
 """
 Technician CRUD operations
 """
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from datetime import datetime
 from app.models.technician import Technician
 from app.schemas.technician import TechnicianCreate, TechnicianUpdate
+from app.core import catalog_cache
 
 
 def get_technician(db: Session, technician_id: int) -> Optional[Technician]:
@@ -12,6 +16,16 @@ def get_technician(db: Session, technician_id: int) -> Optional[Technician]:
     return db.query(Technician).filter(Technician.id == technician_id).first()
 
 
+def _filter_technicians(query, store_id: Optional[int] = None):
+    """Apply the technician list filters to a select() or Query"""
+    query = query.where(Technician.is_active == 1)
+    
+    if store_id:
+        query = query.where(Technician.store_id == store_id)
+    
+    return query
+
+
 def get_technicians(
     db: Session,
     skip: int = 0,
@@ -19,11 +33,7 @@ def get_technicians(
     store_id: Optional[int] = None
 ) -> List[Technician]:
     """Get list of technicians with optional filters"""
-    query = db.query(Technician).filter(Technician.is_active == 1)
-    
-    if store_id:
-        query = query.filter(Technician.store_id == store_id)
-    
+    query = _filter_technicians(db.query(Technician), store_id=store_id)
     return query.offset(skip).limit(limit).all()
 
 
@@ -39,7 +49,9 @@ def create_technician(db: Session, technician: TechnicianCreate) -> Technician:
     """Create new technician"""
     db_technician = Technician(**technician.dict())
     db.add(db_technician)
+    catalog_cache.bump_version(db, catalog_cache.TECHNICIANS)
     db.commit()
+    catalog_cache.invalidate(catalog_cache.TECHNICIANS)
     db.refresh(db_technician)
     return db_technician
 
@@ -58,7 +70,9 @@ def update_technician(
     for field, value in update_data.items():
         setattr(db_technician, field, value)
     
+    catalog_cache.bump_version(db, catalog_cache.TECHNICIANS)
     db.commit()
+    catalog_cache.invalidate(catalog_cache.TECHNICIANS)
     db.refresh(db_technician)
     return db_technician
 
@@ -70,5 +84,43 @@ def delete_technician(db: Session, technician_id: int) -> bool:
         return False
     
     db.delete(db_technician)
+    catalog_cache.bump_version(db, catalog_cache.TECHNICIANS)
     db.commit()
+    catalog_cache.invalidate(catalog_cache.TECHNICIANS)
     return True
+
+
+async def get_technician_async(db: AsyncSession, technician_id: int) -> Optional[Technician]:
+    """Get technician by ID (async)"""
+    result = await db.execute(select(Technician).where(Technician.id == technician_id))
+    return result.scalars().first()
+
+
+async def get_technicians_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    store_id: Optional[int] = None
+) -> List[Technician]:
+    """Get list of technicians with optional filters (async)"""
+    query = _filter_technicians(select(Technician), store_id=store_id)
+    result = await db.execute(query.offset(skip).limit(limit))
+    return list(result.scalars().all())
+
+
+async def get_technicians_version_async(
+    db: AsyncSession,
+    store_id: Optional[int] = None
+) -> Tuple[int, Optional[datetime], int]:
+    """Get (count, last change, write counter) of the technicians matching the list filters"""
+    query = _filter_technicians(select(*catalog_cache.version_columns(Technician, catalog_cache.TECHNICIANS)), store_id=store_id)
+    result = await db.execute(query)
+    return tuple(result.one())
+
+
+async def get_technician_version_async(db: AsyncSession, technician_id: int) -> Tuple[int, Optional[datetime], int]:
+    """Get (count, last change, write counter) of a single technician"""
+    result = await db.execute(
+        select(*catalog_cache.version_columns(Technician, catalog_cache.TECHNICIANS)).where(Technician.id == technician_id)
+    )
+    return tuple(result.one())
@@ -2,10 +2,31 @@
 CRUD operations for User model
 """
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import get_password_hash
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.phone_filter import get_phone_filter
+
+
+# Authenticated-user cache, keyed by user ID (stores column values, not ORM objects)
+user_cache = get_cache(
+    "user",
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    maxsize=settings.USER_CACHE_MAX_SIZE
+)
+
+# Columns kept in the user cache; the password hash never leaves the database
+CACHED_USER_COLUMNS = [column.name for column in User.__table__.columns if column.name != "password_hash"]
+
+
+def _add_to_phone_filter(phone: Optional[str]) -> None:
+    # Login skips the database for phones the filter does not contain
+    phone_filter = get_phone_filter()
+    if phone_filter is not None:
+        phone_filter.add(phone)
 
 
 def get(db: Session, id: int) -> Optional[User]:
@@ -22,6 +43,35 @@ def get(db: Session, id: int) -> Optional[User]:
     return db.query(User).filter(User.id == id).first()
 
 
+def get_cached(db: Session, id: int) -> Optional[User]:
+    """
+    Get user by ID through the user cache
+    
+    On a hit the user is rebuilt from cached column values as a detached
+    instance, so no database round trip is made. Entries are invalidated by
+    update, deactivate and delete. With the in-process backend that only
+    reaches the worker making the change; other workers see it once their
+    entry expires (USER_CACHE_TTL_SECONDS).
+    
+    Args:
+        db: Database session
+        id: User ID
+        
+    Returns:
+        User object or None
+    """
+    data = user_cache.get(id)
+    if data is not None:
+        user = User(**data)
+        make_transient_to_detached(user)
+        return user
+    
+    user = get(db, id=id)
+    if user is not None:
+        user_cache.set(id, {column: getattr(user, column) for column in CACHED_USER_COLUMNS})
+    return user
+
+
 def get_by_phone(db: Session, phone: str) -> Optional[User]:
     """
     Get user by phone number
@@ -64,13 +114,14 @@ def get_by_username(db: Session, username: str) -> Optional[User]:
     return db.query(User).filter(User.username == username).first()
 
 
-def create(db: Session, obj_in: UserCreate) -> User:
+def create(db: Session, obj_in: UserCreate, password_hash: Optional[str] = None) -> User:
     """
     Create new user
     
     Args:
         db: Database session
         obj_in: User creation data
+        password_hash: Pre-computed hash of obj_in.password (hashed here if omitted)
         
     Returns:
         Created user object
@@ -78,7 +129,7 @@ def create(db: Session, obj_in: UserCreate) -> User:
     db_obj = User(
         phone=obj_in.phone,
         username=obj_in.username,
-        password_hash=get_password_hash(obj_in.password),
+        password_hash=password_hash or get_password_hash(obj_in.password),
         full_name=obj_in.full_name,
         email=obj_in.email,
         phone_verified=True  # 注册时验证过验证码，所以设为True
@@ -86,6 +137,7 @@ def create(db: Session, obj_in: UserCreate) -> User:
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    _add_to_phone_filter(db_obj.phone)
     return db_obj
 
 
@@ -109,9 +161,36 @@ def update(db: Session, db_obj: User, obj_in: UserUpdate) -> User:
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    user_cache.delete(db_obj.id)
+    if "phone" in update_data:
+        _add_to_phone_filter(db_obj.phone)
     return db_obj
 
 
+def rehash_password(db: Session, id: int, old_hash: str, new_hash: str) -> bool:
+    """
+    Replace a password hash with an upgraded hash of the same password
+    
+    Only applies if the stored hash is still old_hash, so a password changed
+    in the meantime is never overwritten.
+    
+    Args:
+        db: Database session
+        id: User ID
+        old_hash: Hash the new one was derived from
+        new_hash: Hash made with the current settings
+        
+    Returns:
+        True if the hash was replaced
+    """
+    updated = db.query(User).filter(
+        User.id == id,
+        User.password_hash == old_hash
+    ).update({User.password_hash: new_hash}, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
 def delete(db: Session, id: int) -> Optional[User]:
     """
     Delete user
@@ -127,6 +206,7 @@ def delete(db: Session, id: int) -> Optional[User]:
     if obj:
         db.delete(obj)
         db.commit()
+        user_cache.delete(id)
     return obj
 
 
@@ -147,4 +227,5 @@ def deactivate(db: Session, id: int) -> Optional[User]:
         db.add(obj)
         db.commit()
         db.refresh(obj)
+        user_cache.delete(id)
     return obj
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.models.verification_code import VerificationCode
 from app.core.config import settings
+from app.core.verification_store import get_code_store
 import random
 import string
 import os
@@ -36,7 +37,7 @@ def create(
     db: Session,
     phone: str,
     purpose: str,
-    expires_in_minutes: int = 10
+    expires_in_minutes: Optional[int] = None
 ) -> VerificationCode:
     """
     Create new verification code
@@ -46,10 +47,14 @@ def create(
         phone: Phone number
         purpose: Purpose of the code (register, login, reset_password)
         expires_in_minutes: Code expiration time in minutes
+            (defaults to settings.VERIFICATION_CODE_EXPIRE_MINUTES)
         
     Returns:
-        Created verification code object
+        Created verification code object (not persisted when a key/TTL
+        code store is configured)
     """
+    if expires_in_minutes is None:
+        expires_in_minutes = settings.VERIFICATION_CODE_EXPIRE_MINUTES
     code = generate_code()
     expires_at = datetime.utcnow() + timedelta(minutes=expires_in_minutes)
     
@@ -59,6 +64,12 @@ def create(
         purpose=purpose,
         expires_at=expires_at
     )
+    
+    store = get_code_store()
+    if store is not None:
+        store.issue(phone, purpose, code, ttl=expires_in_minutes * 60)
+        return db_obj
+    
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
@@ -93,9 +104,6 @@ def get_valid_code(
     ).first()
 
 
-
-
-
 def delete_expired(db: Session) -> int:
     """
     Delete expired verification codes
@@ -114,6 +122,37 @@ def delete_expired(db: Session) -> int:
     return deleted
 
 
+def purge_expired_batch(db: Session, expired_before: datetime, batch_size: int) -> int:
+    """
+    Delete one batch of codes that expired before a cutoff
+    
+    Deleting by primary key in small chunks keeps each transaction (and the
+    locks it holds) short. Call repeatedly until it returns less than
+    batch_size.
+    
+    Args:
+        db: Database session
+        expired_before: Delete codes whose expires_at is earlier than this
+        batch_size: Maximum number of rows deleted in this call
+        
+    Returns:
+        Number of deleted codes
+    """
+    ids = [
+        row.id for row in db.query(VerificationCode.id).filter(
+            VerificationCode.expires_at < expired_before
+        ).order_by(VerificationCode.id).limit(batch_size).all()
+    ]
+    if not ids:
+        return 0
+    
+    deleted = db.query(VerificationCode).filter(
+        VerificationCode.id.in_(ids)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
 def verify_code(
     db: Session,
     phone: str,
@@ -132,16 +171,56 @@ def verify_code(
     Returns:
         True if code is valid, False otherwise
     """
+    store = get_code_store()
+    if store is not None:
+        return store.check(phone, code_type, code)
+    
     # Note: code_type parameter maps to purpose field in database
     verification = get_valid_code(db, phone, code, purpose=code_type)
     return verification is not None
 
 
+def consume_code(
+    db: Session,
+    phone: str,
+    code: str,
+    code_type: str
+) -> bool:
+    """
+    Verify a code and use it up in one step
+    
+    Args:
+        db: Database session
+        phone: Phone number
+        code: Verification code
+        code_type: Type of the code (register, login, reset_password)
+        
+    Returns:
+        True if the code was valid and is now used, False otherwise
+    """
+    store = get_code_store()
+    if store is not None:
+        return store.consume(phone, code_type, code)
+    
+    # Conditional UPDATE, so two concurrent requests cannot both use the code
+    now = datetime.utcnow()
+    verification = get_valid_code(db, phone, code, purpose=code_type)
+    if verification is None:
+        return False
+    updated = db.query(VerificationCode).filter(
+        VerificationCode.id == verification.id,
+        VerificationCode.is_used == False,
+        VerificationCode.expires_at > now
+    ).update({VerificationCode.is_used: True}, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
 def create_verification_code(
     db: Session,
     phone: str,
     code_type: str,
-    expires_in_minutes: int = 10
+    expires_in_minutes: Optional[int] = None
 ) -> VerificationCode:
     """
     Create verification code (alias for create function)
@@ -163,6 +242,9 @@ def mark_as_used(db: Session, phone: str, code: str) -> bool:
     """
     Mark verification code as used by phone and code
     
+    Only applies to codes kept in the database; prefer consume_code, which
+    also works with the other code stores.
+    
     Args:
         db: Database session
         phone: Phone number
@@ -2,11 +2,14 @@
 Database session management
 """
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
+from functools import lru_cache
 from app.core.config import settings
 import re
+import ssl
 
 
 # Convert mysql:// to mysql+pymysql:// if needed
@@ -51,3 +54,66 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def get_async_database_url() -> str:
+    """
+    Get the async driver URL
+    
+    Uses ASYNC_DATABASE_URL when set, otherwise swaps the sync driver of
+    DATABASE_URL for its async counterpart (pymysql -> aiomysql, sqlite -> aiosqlite).
+    """
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    
+    if database_url.startswith("mysql+pymysql://"):
+        return database_url.replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+    if database_url.startswith("sqlite://"):
+        return database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return database_url
+
+
+@lru_cache()
+def get_async_engine() -> AsyncEngine:
+    """
+    Get the async database engine
+    
+    Created lazily so scripts that only use the sync engine do not need the
+    async drivers installed. Its pool comes on top of the sync engine's pool,
+    so it is kept small (ASYNC_DB_POOL_SIZE + ASYNC_DB_MAX_OVERFLOW): only the
+    catalog reads use it.
+    """
+    async_url = get_async_database_url()
+    
+    engine_kwargs = {"pool_pre_ping": True, "echo": settings.DEBUG}
+    if not async_url.startswith("sqlite"):
+        engine_kwargs.update(pool_size=settings.ASYNC_DB_POOL_SIZE, max_overflow=settings.ASYNC_DB_MAX_OVERFLOW)
+    
+    # aiomysql expects an SSLContext rather than a dict of options
+    async_connect_args = {}
+    if "tidbcloud.com" in async_url:
+        async_connect_args["ssl"] = ssl.create_default_context()
+    
+    return create_async_engine(async_url, connect_args=async_connect_args, **engine_kwargs)
+
+
+@lru_cache()
+def get_async_session_factory() -> async_sessionmaker:
+    """Get the async session factory bound to the async engine"""
+    return async_sessionmaker(
+        bind=get_async_engine(),
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function to get an async database session
+    
+    Yields:
+        Async database session
+    """
+    async with get_async_session_factory()() as db:
+        yield db
@@ -1,12 +1,44 @@
 """
 FastAPI main application
 """
-from fastapi import FastAPI
+import asyncio
+import ipaddress
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
+from app.core import metrics
 from app.api.v1.api import api_router
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background tasks with the application and stop them on shutdown"""
+    tasks = []
+    if settings.APPOINTMENT_SWEEPER_ENABLED:
+        from app.tasks.appointment_sweeper import run_sweeper
+        tasks.append(asyncio.create_task(run_sweeper()))
+    if settings.VERIFICATION_CODE_PURGE_ENABLED:
+        from app.tasks.verification_code_purge import run_purge
+        tasks.append(asyncio.create_task(run_purge()))
+    if settings.PHONE_FILTER_ENABLED:
+        from app.core.phone_filter import get_phone_filter
+        from app.tasks.phone_filter_refresh import run_refresh
+        # None when the configured backend was refused
+        if get_phone_filter() is not None:
+            tasks.append(asyncio.create_task(run_refresh()))
+    
+    yield
+    
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+
+
 # Create FastAPI application
 app = FastAPI(
     title=settings.APP_NAME,
@@ -14,7 +46,8 @@ app = FastAPI(
     description="NailsDash美甲预约平台后端API",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -24,8 +57,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Next-Cursor", "Server-Timing"],
 )
 
+# Request timing and SQL statement counts (outermost, so it covers CORS too)
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine()
+    app.add_middleware(metrics.MetricsMiddleware)
+
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
@@ -50,6 +89,62 @@ async def health_check():
     }
 
 
+def _metrics_client_allowed(request: Request) -> bool:
+    """
+    Whether the client address matches an entry of METRICS_ALLOWED_IPS
+    
+    The address is the socket peer, or behind trusted proxies the
+    X-Forwarded-For entry they appended (see client_ip), never a value the
+    client chose.
+    """
+    from app.core.rate_limit import client_ip
+    
+    allowed = settings.metrics_allowed_ips_list
+    if "*" in allowed:
+        return True
+    try:
+        address = ipaddress.ip_address(client_ip(request))
+    except ValueError:
+        return False
+    for entry in allowed:
+        try:
+            if address in ipaddress.ip_network(entry, strict=False):
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics_endpoint(request: Request):
+    """
+    Prometheus metrics: request, cache, database pool and background task stats
+    
+    Served only to clients in METRICS_ALLOWED_IPS (localhost by default); any
+    other client gets the same 404 as when metrics are disabled.
+    """
+    if not settings.METRICS_ENABLED or not _metrics_client_allowed(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    from app.core.cache import caches
+    from app.db.session import engine
+    from app.tasks import appointment_sweeper, phone_filter_refresh, verification_code_purge
+    
+    gauges = [("nailsdash_db_pool_checked_out", "Sync pool connections in use", getattr(engine.pool, "checkedout", lambda: 0)())]
+    for prefix, stats in (
+        ("appointment_sweeper", appointment_sweeper.stats),
+        ("verification_code_purge", verification_code_purge.stats),
+        ("phone_filter", phone_filter_refresh.stats),
+    ):
+        for key, value in stats.items():
+            gauges.append((f"nailsdash_{prefix}_{key}", f"{prefix} {key.replace('_', ' ')}", value))
+    
+    return metrics.render_metrics(
+        cache_stats={name: cache.stats() for name, cache in caches.items()},
+        gauges=gauges
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -7,5 +7,8 @@ from app.models.store import Store, StoreImage
 from app.models.service import Service
 from app.models.appointment import Appointment, AppointmentStatus
 from app.models.technician import Technician
+from app.models.store_daily_stats import StoreDailyStats
+from app.models.technician_day_lock import TechnicianDayLock
+from app.models.catalog_version import CatalogVersion
 
-__all__ = ["User", "VerificationCode", "Store", "StoreImage", "Service", "Appointment", "AppointmentStatus", "Technician"]
+__all__ = ["User", "VerificationCode", "Store", "StoreImage", "Service", "Appointment", "AppointmentStatus", "Technician", "StoreDailyStats", "TechnicianDayLock", "CatalogVersion"]
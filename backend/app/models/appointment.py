@@ -1,7 +1,7 @@
 """
 Appointment Model
 """
-from sqlalchemy import Column, Integer, String, Date, Time, Text, DateTime, func, Enum
+from sqlalchemy import Column, Integer, String, Date, Time, Text, DateTime, Float, func, Enum, Index
 from app.db.session import Base
 import enum
 
@@ -12,21 +12,38 @@ class AppointmentStatus(str, enum.Enum):
     CONFIRMED = "confirmed"
     COMPLETED = "completed"
     CANCELLED = "cancelled"
+    EXPIRED = "expired"  # Past date, never completed (set by the appointment sweeper)
 
 
 class Appointment(Base):
     """Appointment model"""
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Keyset pagination of the user, store and technician listings
+        Index("ix_appointments_user_date_time_id", "user_id", "appointment_date", "appointment_time", "id"),
+        Index("ix_appointments_store_date_time_id", "store_id", "appointment_date", "appointment_time", "id"),
+        Index("ix_appointments_technician_date_time_id", "technician_id", "appointment_date", "appointment_time", "id"),
+        # Conflict checks and availability: owner and date equality (or date range),
+        # then the active-status IN list and the time range, all resolved inside the index
+        Index("ix_appointments_technician_date_status", "technician_id", "appointment_date", "status", "appointment_time", "end_time"),
+        Index("ix_appointments_user_date_status", "user_id", "appointment_date", "status", "appointment_time", "end_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, nullable=False, index=True)
-    store_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
+    store_id = Column(Integer, nullable=False)
     service_id = Column(Integer, nullable=False, index=True)
-    technician_id = Column(Integer, nullable=True, index=True)  # Optional: specific technician
+    technician_id = Column(Integer, nullable=True)  # Optional: specific technician
     appointment_date = Column(Date, nullable=False, index=True)
     appointment_time = Column(Time, nullable=False)
+    # Captured from the service at booking so overlap checks need no join
+    duration_minutes = Column(Integer, nullable=True)
+    end_time = Column(Time, nullable=True)
+    # Service price at booking; the daily rollup revenue is based on it, so
+    # later price edits do not make the rollup drift from a rebuild
+    price = Column(Float, nullable=True)
     status = Column(
-        Enum('pending', 'confirmed', 'completed', 'cancelled', name='appointment_status'),
+        Enum('pending', 'confirmed', 'completed', 'cancelled', 'expired', name='appointment_status'),
         default='pending',
         nullable=False,
         index=True
@@ -0,0 +1,14 @@
+"""
+Catalog Version Model
+"""
+from sqlalchemy import Column, Integer, String, DateTime, func
+from app.db.session import Base
+
+
+class CatalogVersion(Base):
+    """Write counter of a catalog resource, bumped in the same transaction as every write"""
+    __tablename__ = "catalog_versions"
+
+    resource = Column(String(20), primary_key=True)  # stores, services or technicians
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,21 @@
+"""
+Store Daily Stats Model
+"""
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, UniqueConstraint, func
+from app.db.session import Base
+
+
+class StoreDailyStats(Base):
+    """Per-store, per-day, per-status appointment rollup"""
+    __tablename__ = "store_daily_stats"
+    __table_args__ = (
+        UniqueConstraint('store_id', 'stat_date', 'status', name='uq_store_daily_stats_store_date_status'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, nullable=False)
+    stat_date = Column(Date, nullable=False)
+    status = Column(String(20), nullable=False)
+    appointment_count = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0.0, nullable=False)  # Sum of Appointment.price (the price at booking time)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,18 @@
+"""
+Technician Day Lock Model
+"""
+from sqlalchemy import Column, Integer, Date, DateTime, UniqueConstraint, func
+from app.db.session import Base
+
+
+class TechnicianDayLock(Base):
+    """One row per technician and day, row-locked to serialize bookings"""
+    __tablename__ = "technician_day_locks"
+    __table_args__ = (
+        UniqueConstraint('technician_id', 'lock_date', name='uq_technician_day_locks_technician_date'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    technician_id = Column(Integer, nullable=False)
+    lock_date = Column(Date, nullable=False)
+    locked_at = Column(DateTime(timezone=True), server_default=func.now())  # Last booking attempt
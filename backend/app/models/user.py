@@ -21,7 +21,7 @@ class User(Base):
     is_admin = Column(Boolean, default=False, nullable=False)  # 超级管理员
     store_id = Column(Integer, nullable=True, index=True)  # 店铺管理员关联的店铺ID
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True)
     
     def __repr__(self):
         return f"<User(id={self.id}, username={self.username}, phone={self.phone})>"
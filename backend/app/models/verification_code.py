@@ -1,20 +1,24 @@
 """
 Verification Code database model for phone verification
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, func
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index, func
 from app.db.session import Base
 
 
 class VerificationCode(Base):
     """Verification code model for phone verification"""
     __tablename__ = "verification_codes"
+    __table_args__ = (
+        # get_valid_code / consume_code lookups
+        Index("ix_verification_codes_phone_purpose_used_expires", "phone", "purpose", "is_used", "expires_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    phone = Column(String(20), nullable=False, index=True)  # 手机号
+    phone = Column(String(20), nullable=False)  # 手机号
     code = Column(String(6), nullable=False)  # 验证码（6位数字）
     purpose = Column(String(50), nullable=False)  # 用途：register, login, reset_password
     is_used = Column(Boolean, default=False, nullable=False)  # 是否已使用
-    expires_at = Column(DateTime(timezone=True), nullable=False)  # 过期时间
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # 过期时间
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
     def __repr__(self):
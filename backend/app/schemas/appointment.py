@@ -1,8 +1,8 @@
 """
 Appointment Schemas
 """
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime, date, time
 from app.models.appointment import AppointmentStatus
 
@@ -22,6 +22,18 @@ class AppointmentCreate(AppointmentBase):
     pass
 
 
+class AppointmentBatchCreate(BaseModel):
+    """Group booking: all appointments are created together or not at all"""
+    appointments: List[AppointmentCreate] = Field(..., min_length=1, max_length=10)
+
+
+class AppointmentBulkStatusUpdate(BaseModel):
+    """Bulk status change: either explicit IDs or every appointment of a date"""
+    appointment_ids: Optional[List[int]] = Field(None, min_length=1, max_length=500)
+    appointment_date: Optional[date] = None
+    status: AppointmentStatus
+
+
 class AppointmentUpdate(BaseModel):
     """Appointment update schema"""
     appointment_date: Optional[date] = None
@@ -36,6 +48,8 @@ class Appointment(AppointmentBase):
     user_id: int
     technician_id: Optional[int] = None
     status: AppointmentStatus
+    duration_minutes: Optional[int] = None
+    end_time: Optional[time] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -0,0 +1,59 @@
+"""
+Appointment sweeper
+
+Pending and confirmed appointments whose date has passed are moved to the
+terminal EXPIRED status, so the active-status filters used by conflict checks
+and availability only ever see current bookings. Runs inside the API process
+as a periodic task started from the application lifespan; the database work
+itself runs in a worker thread in fixed-size batches.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core.config import settings
+from app.crud import appointment as crud_appointment
+from app.tasks.periodic import PeriodicTask, run_in_batches, utcnow
+
+
+logger = logging.getLogger(__name__)
+
+
+def _sweep(now: Optional[datetime] = None) -> int:
+    """
+    Expire every past pending/confirmed appointment, one batch per transaction
+
+    Args:
+        now: Reference time in UTC (defaults to the current time)
+
+    Returns:
+        Number of appointments expired
+    """
+    cutoff = (now or utcnow()).date() - timedelta(days=settings.APPOINTMENT_EXPIRE_AFTER_DAYS)
+    batch_size = settings.APPOINTMENT_SWEEPER_BATCH_SIZE
+    expired, batches = run_in_batches(
+        lambda db: crud_appointment.expire_past_appointments(db, before=cutoff, batch_size=batch_size),
+        batch_size
+    )
+
+    sweeper.stats["expired_total"] += expired
+    sweeper.stats["last_run_expired"] = expired
+    sweeper.stats["last_run_batches"] = batches
+    logger.info(
+        "Appointment sweeper expired %d appointments dated before %s in %d batches",
+        expired, cutoff, batches
+    )
+    return expired
+
+
+sweeper = PeriodicTask(
+    "Appointment sweeper",
+    _sweep,
+    interval_setting="APPOINTMENT_SWEEPER_INTERVAL_SECONDS",
+    expired_total=0,
+    last_run_expired=0,
+    last_run_batches=0,
+)
+stats = sweeper.stats
+sweep_once = sweeper.run_once
+run_sweeper = sweeper.run_forever
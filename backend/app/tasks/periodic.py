@@ -0,0 +1,107 @@
+"""
+Periodic task helper
+
+Background jobs run inside the API process as asyncio tasks started from the
+application lifespan. Each job is a blocking function run in a worker thread
+at a fixed interval; this module holds the loop, the shared counters and the
+batching used by the jobs. Jobs take their reference time from utcnow(), so
+date cutoffs do not depend on the server's time zone.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+
+
+logger = logging.getLogger(__name__)
+
+
+def utcnow() -> datetime:
+    """Current time in UTC (naive, like the stored timestamps)"""
+    return datetime.utcnow()
+
+
+def run_in_batches(step: Callable[[Session], int], batch_size: int) -> Tuple[int, int]:
+    """
+    Call step until it handles less than a full batch
+
+    Args:
+        step: Processes and commits one batch in the given session
+        batch_size: Size of a full batch
+
+    Returns:
+        (rows handled, batches run)
+    """
+    total = batches = 0
+    db = SessionLocal()
+    try:
+        while True:
+            count = step(db)
+            total += count
+            batches += 1
+            if count < batch_size:
+                break
+    finally:
+        db.close()
+    return total, batches
+
+
+class PeriodicTask:
+    """
+    A blocking job run every interval in a worker thread
+
+    stats holds counters since process start (exported with the other
+    metrics): runs, failures and last_run_seconds, plus the job's own
+    counters, which the job updates itself.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        job: Callable[..., Any],
+        interval_setting: str,
+        run_at_start: bool = True,
+        **counters: Any
+    ):
+        """
+        Args:
+            name: Name used in log messages
+            job: Blocking function doing one run
+            interval_setting: Name of the settings attribute holding the
+                interval in seconds (read on every run)
+            run_at_start: Run immediately, or wait one interval first so a
+                backlog never slows down startup
+            counters: Job-specific counters and their initial values
+        """
+        self.name = name
+        self.job = job
+        self.interval_setting = interval_setting
+        self.run_at_start = run_at_start
+        self.stats: Dict[str, Any] = {"runs": 0, "failures": 0, "last_run_seconds": 0.0, **counters}
+
+    def run_once(self, *args: Any, **kwargs: Any) -> Any:
+        """Run the job once in the calling thread and return its result"""
+        started = time.perf_counter()
+        result = self.job(*args, **kwargs)
+        self.stats["runs"] += 1
+        self.stats["last_run_seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    async def run_forever(self) -> None:
+        """Run the job every interval until cancelled"""
+        if not self.run_at_start:
+            await asyncio.sleep(getattr(settings, self.interval_setting))
+        while True:
+            try:
+                await run_in_threadpool(self.run_once)
+            except Exception:
+                self.stats["failures"] += 1
+                logger.exception("%s failed", self.name)
+            await asyncio.sleep(getattr(settings, self.interval_setting))
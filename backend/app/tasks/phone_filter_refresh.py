@@ -0,0 +1,59 @@
+"""
+Phone filter refresh
+
+Builds the registered-phone filter (app.core.phone_filter) in a worker thread
+after startup, then every PHONE_FILTER_REFRESH_SECONDS adds the phones of
+users created or changed since the previous run, or builds it again if the
+stored bits were lost. Login falls back to the database lookup until the
+build has finished.
+"""
+import logging
+
+from app.core.phone_filter import get_phone_filter
+from app.db.session import SessionLocal
+from app.tasks.periodic import PeriodicTask
+
+
+logger = logging.getLogger(__name__)
+
+
+def _refresh() -> int:
+    """
+    Build the filter if it is not ready yet or was lost, otherwise add new or
+    changed users
+
+    Returns:
+        Number of phones added
+    """
+    phone_filter = get_phone_filter()
+    if phone_filter is None:
+        return 0
+
+    db = SessionLocal()
+    try:
+        if not phone_filter.ready or not phone_filter.is_intact():
+            phone_filter.ready = False
+            added = phone_filter.rebuild(db)
+            refresher.stats["builds"] += 1
+            logger.info("Phone filter built with %d phones", added)
+        else:
+            added = phone_filter.refresh(db)
+            refresher.stats["refreshes"] += 1
+    finally:
+        db.close()
+
+    refresher.stats["phones_added"] += added
+    return added
+
+
+refresher = PeriodicTask(
+    "Phone filter refresh",
+    _refresh,
+    interval_setting="PHONE_FILTER_REFRESH_SECONDS",
+    builds=0,
+    refreshes=0,
+    phones_added=0,
+)
+stats = refresher.stats
+refresh_once = refresher.run_once
+run_refresh = refresher.run_forever
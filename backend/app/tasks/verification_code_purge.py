@@ -0,0 +1,60 @@
+"""
+Verification code purge
+
+Every SMS request inserts a verification_codes row. This task deletes codes
+that expired more than VERIFICATION_CODE_RETENTION_HOURS ago, in primary-key
+batches so no delete holds locks for long. It runs inside the API process as
+a periodic task; the first run waits one full interval so application startup
+is never slowed down by a backlog.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core.config import settings
+from app.crud import verification_code as crud_verification_code
+from app.tasks.periodic import PeriodicTask, run_in_batches, utcnow
+
+
+logger = logging.getLogger(__name__)
+
+
+def _purge(now: Optional[datetime] = None) -> int:
+    """
+    Delete every code past the retention window, one batch per transaction
+
+    Args:
+        now: Reference time in UTC (defaults to the current time)
+
+    Returns:
+        Number of deleted codes
+    """
+    cutoff = (now or utcnow()) - timedelta(hours=settings.VERIFICATION_CODE_RETENTION_HOURS)
+    batch_size = settings.VERIFICATION_CODE_PURGE_BATCH_SIZE
+    deleted, batches = run_in_batches(
+        lambda db: crud_verification_code.purge_expired_batch(db, expired_before=cutoff, batch_size=batch_size),
+        batch_size
+    )
+
+    purge.stats["deleted_total"] += deleted
+    purge.stats["last_run_deleted"] = deleted
+    purge.stats["last_run_batches"] = batches
+    logger.info(
+        "Verification code purge deleted %d codes expired before %s in %d batches",
+        deleted, cutoff, batches
+    )
+    return deleted
+
+
+purge = PeriodicTask(
+    "Verification code purge",
+    _purge,
+    interval_setting="VERIFICATION_CODE_PURGE_INTERVAL_SECONDS",
+    run_at_start=False,
+    deleted_total=0,
+    last_run_deleted=0,
+    last_run_batches=0,
+)
+stats = purge.stats
+purge_once = purge.run_once
+run_purge = purge.run_forever
@@ -0,0 +1,151 @@
+"""
+Shared pytest fixtures
+
+Tests run against a throwaway SQLite database that is recreated for every
+test. The environment is set before anything from app is imported, because
+settings are read at import time.
+"""
+import os
+import tempfile
+import time
+
+_test_dir = tempfile.mkdtemp(prefix="nailsdash-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_test_dir}/test.db"
+os.environ["SECRET_KEY"] = "test-secret-key"
+os.environ["ENVIRONMENT"] = "development"
+os.environ["DEBUG"] = "False"
+os.environ["RATE_LIMIT_ENABLED"] = "False"
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.core import metrics, phone_filter, rate_limit, verification_store
+from app.core.cache import caches
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.db.session import Base, SessionLocal, engine
+from app.main import app
+from app.models import Service, Store, Technician, User
+
+# Manual scripts that need a server running on localhost:8000
+collect_ignore = ["test_api.py", "test_appointment_enhancements.py"]
+
+TEST_PASSWORD = "password123"
+CUSTOMER_PHONE = "12125550100"
+STORE_ADMIN_PHONE = "12125550101"
+SUPER_ADMIN_PHONE = "12125550102"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark", action="store_true", default=False,
+        help="also run the wall-clock benchmarks (skipped by default, they are noisy on shared machines)"
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: wall-clock benchmark, run only with --benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def median_seconds(func, repeat: int = 200) -> float:
+    """Median wall-clock time of func over repeat calls"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+@pytest.fixture(scope="session")
+def password_hash():
+    """One hash of TEST_PASSWORD shared by all seeded users (bcrypt is slow)"""
+    return get_password_hash(TEST_PASSWORD)
+
+
+@pytest.fixture
+def db():
+    """Empty schema, fresh caches and a session for the test"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    for cache in caches.values():
+        cache.clear()
+    rate_limit._limiter = None
+    phone_filter._filter = None
+    verification_store._store = None
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def seed(db, password_hash):
+    """
+    Store 1 with services 1 (60 min, $30) and 2 (30 min, $45), technicians
+    1 and 2, a customer, a store admin of store 1 and a super admin
+    """
+    db.add(Store(id=1, name="Store 1", address="1 Main St", city="New York", state="NY"))
+    db.add(Service(id=1, store_id=1, name="Manicure", price=30.0, duration_minutes=60, category="nails"))
+    db.add(Service(id=2, store_id=1, name="Pedicure", price=45.0, duration_minutes=30, category="nails"))
+    db.add(Technician(id=1, store_id=1, name="Technician 1"))
+    db.add(Technician(id=2, store_id=1, name="Technician 2"))
+    db.add(User(id=1, phone=CUSTOMER_PHONE, username="customer", password_hash=password_hash))
+    db.add(User(id=2, phone=STORE_ADMIN_PHONE, username="store_admin", password_hash=password_hash, store_id=1))
+    db.add(User(id=3, phone=SUPER_ADMIN_PHONE, username="super_admin", password_hash=password_hash, is_admin=True))
+    db.commit()
+    return db
+
+
+@pytest.fixture
+def client(db):
+    """Test client for the application (background tasks are not started)"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def login(client):
+    """Log in a seeded user by phone and return the Authorization header"""
+    def _login(phone: str = CUSTOMER_PHONE) -> dict:
+        response = client.post("/api/v1/auth/login", json={"phone": phone, "password": TEST_PASSWORD})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return _login
+
+
+@pytest.fixture
+def query_budget_guard(monkeypatch):
+    """
+    Fail a test when a request issues more SQL statements than its endpoint's
+    @query_budget: the statement that crosses the budget raises
+    QueryBudgetExceeded, which the TestClient re-raises in the test
+    """
+    metrics.instrument_engine()
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "raise")
+    yield
+
+
+@pytest.fixture
+def count_queries():
+    """
+    Count statements run outside of requests, e.g. by CRUD functions:
+
+        with count_queries() as counted:
+            crud_store.get_store(db, store_id=1)
+        assert counted.db_statements == 1
+    """
+    metrics.instrument_engine()
+    return metrics.count_queries
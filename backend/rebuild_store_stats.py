@@ -0,0 +1,43 @@
+"""
+Rebuild the store_daily_stats rollup from the appointments table
+
+Usage:
+    python rebuild_store_stats.py                      # all stores, all dates
+    python rebuild_store_stats.py --store-id 4         # a single store
+    python rebuild_store_stats.py --from 2026-01-01 --to 2026-01-31
+"""
+import argparse
+from datetime import datetime
+from app.db.session import SessionLocal
+from app.crud import store_daily_stats as crud_stats
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD command line argument"""
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def rebuild_store_stats():
+    """Recompute rollup rows for the requested scope"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store-id", type=int, default=None, help="Only rebuild this store")
+    parser.add_argument("--from", dest="start_date", type=parse_date, default=None, help="First date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end_date", type=parse_date, default=None, help="Last date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print("Rebuilding store daily stats...")
+        rows = crud_stats.rebuild(
+            db,
+            store_id=args.store_id,
+            start_date=args.start_date,
+            end_date=args.end_date
+        )
+        print(f"Store daily stats rebuilt: {rows} rows written")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild_store_stats()
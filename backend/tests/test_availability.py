@@ -0,0 +1,100 @@
+"""
+Availability engine tests and slot generation benchmark
+"""
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from conftest import median_seconds
+from app.core.availability import (
+    STORE_CLOSE_TIME,
+    STORE_OPEN_TIME,
+    first_overlap,
+    find_free_slots,
+    merge_intervals,
+)
+
+DAY = date(2026, 11, 7)
+DAY_START = datetime.combine(DAY, STORE_OPEN_TIME)
+DAY_END = datetime.combine(DAY, STORE_CLOSE_TIME)
+
+
+def nested_loop_slots(busy, day_start, day_end, duration, step=timedelta(minutes=30)):
+    """The pre-engine implementation: every candidate slot against every booking"""
+    slots = []
+    current = day_start
+    while current + duration <= day_end:
+        slot_end = current + duration
+        if all(not (current < busy_end and slot_end > busy_start) for busy_start, busy_end in busy):
+            slots.append((current, slot_end))
+        current += step
+    return slots
+
+
+def random_bookings(count, seed):
+    """count bookings of 5-60 minutes starting on a 5-minute grid within opening hours"""
+    rng = random.Random(seed)
+    bookings = []
+    for _ in range(count):
+        start = DAY_START + timedelta(minutes=5 * rng.randrange(0, 108))
+        bookings.append((start, start + timedelta(minutes=rng.choice((5, 15, 30, 45, 60)))))
+    return bookings
+
+
+def test_merge_intervals_joins_overlapping_and_touching():
+    a = DAY_START
+    intervals = [
+        (a + timedelta(minutes=60), a + timedelta(minutes=90)),
+        (a, a + timedelta(minutes=30)),
+        (a + timedelta(minutes=30), a + timedelta(minutes=45)),
+        (a + timedelta(minutes=80), a + timedelta(minutes=120)),
+    ]
+    assert merge_intervals(intervals) == [
+        (a, a + timedelta(minutes=45)),
+        (a + timedelta(minutes=60), a + timedelta(minutes=120)),
+    ]
+
+
+def test_find_free_slots_matches_nested_loop():
+    for seed in range(200):
+        busy = random_bookings(random.Random(seed).randrange(0, 40), seed)
+        for minutes in (30, 45, 60, 90):
+            duration = timedelta(minutes=minutes)
+            assert find_free_slots(busy, DAY_START, DAY_END, duration) == \
+                nested_loop_slots(busy, DAY_START, DAY_END, duration), (seed, minutes)
+
+
+def test_first_overlap_matches_brute_force():
+    busy = sorted(random_bookings(50, seed=7))
+    for offset in range(0, 540, 5):
+        start = DAY_START + timedelta(minutes=offset)
+        end = start + timedelta(minutes=30)
+        expected = next((interval for interval in busy if interval[0] < end and interval[1] > start), None)
+        assert first_overlap(busy, start, end) == expected
+
+
+@pytest.mark.benchmark
+def test_slot_generation_benchmark():
+    """
+    120 bookings in a day stay under a millisecond. With a free morning and a
+    packed afternoon the nested loop compares each free slot against every
+    booking, which is where the sweep pays off; with random overlapping
+    bookings it exits early and both are in the tens of microseconds.
+    """
+    duration = timedelta(minutes=30)
+    afternoon = DAY_START + timedelta(hours=5)
+    layouts = {
+        "packed afternoon": [
+            (afternoon + timedelta(minutes=2 * i), afternoon + timedelta(minutes=2 * i + 2)) for i in range(120)
+        ],
+        "random": random_bookings(120, seed=42),
+    }
+
+    for name, busy in layouts.items():
+        sweep = median_seconds(lambda: find_free_slots(busy, DAY_START, DAY_END, duration))
+        nested = median_seconds(lambda: nested_loop_slots(busy, DAY_START, DAY_END, duration))
+        timings = f"{name}: sweep {sweep * 1e6:.0f} us, nested loop {nested * 1e6:.0f} us"
+        assert sweep < 0.001, timings
+        if name == "packed afternoon":
+            assert sweep < nested, timings
@@ -0,0 +1,52 @@
+"""
+Group booking tests
+"""
+from datetime import date, timedelta
+
+from conftest import STORE_ADMIN_PHONE
+from app.models import Appointment, StoreDailyStats
+
+DAY = (date.today() + timedelta(days=3)).isoformat()
+
+
+def item(technician_id, start, service_id=2):
+    return {
+        "store_id": 1, "service_id": service_id, "technician_id": technician_id,
+        "appointment_date": DAY, "appointment_time": start
+    }
+
+
+def book(client, headers, *items):
+    return client.post("/api/v1/appointments/batch", headers=headers, json={"appointments": list(items)})
+
+
+def test_parallel_services_on_different_technicians(seed, client, login):
+    response = book(client, login(), item(1, "10:00:00"), item(2, "10:00:00"), item(1, "10:30:00"))
+    assert response.status_code == 200, response.text
+    assert [(row["technician_id"], row["appointment_time"]) for row in response.json()] == [
+        (1, "10:00:00"), (2, "10:00:00"), (1, "10:30:00")
+    ]
+    assert seed.query(Appointment).count() == 3
+
+
+def test_conflict_inside_the_group_creates_nothing(seed, client, login):
+    response = book(client, login(), item(2, "09:00:00"), item(1, "10:00:00"), item(1, "10:15:00"))
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Appointment 3: Appointments in the group overlap on the same technician"
+    assert seed.query(Appointment).count() == 0
+    assert seed.query(StoreDailyStats).count() == 0
+
+
+def test_conflict_with_an_existing_booking_creates_nothing(seed, client, login):
+    existing = client.post("/api/v1/appointments/", headers=login(), json=item(1, "11:00:00", service_id=1))
+    assert existing.status_code == 200, existing.text
+
+    # Another customer's group: the second item overlaps the existing booking
+    response = book(client, login(STORE_ADMIN_PHONE), item(2, "11:00:00"), item(1, "11:30:00"))
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Appointment 2: The technician is already booked from 11:00 to 12:00"
+    seed.expire_all()
+    assert [row.id for row in seed.query(Appointment).all()] == [existing.json()["id"]]
+    assert [stats.appointment_count for stats in seed.query(StoreDailyStats).all()] == [1]
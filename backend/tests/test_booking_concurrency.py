@@ -0,0 +1,93 @@
+"""
+Concurrent booking tests
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from threading import Barrier
+
+from app.models import Appointment, User
+
+REQUESTS = 8
+
+
+def test_parallel_bookings_of_one_slot_create_one_appointment(seed, client, login, password_hash):
+    # One customer per request, so only the technician can conflict
+    phones = [f"1212555{index:04d}" for index in range(200, 200 + REQUESTS)]
+    for index, phone in enumerate(phones):
+        seed.add(User(id=10 + index, phone=phone, username=f"customer{index}", password_hash=password_hash))
+    seed.commit()
+    headers = [login(phone) for phone in phones]
+    booking = {
+        "store_id": 1, "service_id": 1, "technician_id": 1,
+        "appointment_date": (date.today() + timedelta(days=3)).isoformat(), "appointment_time": "10:00:00"
+    }
+    barrier = Barrier(REQUESTS)
+
+    def book(index: int):
+        barrier.wait()
+        return client.post("/api/v1/appointments/", headers=headers[index], json=booking)
+
+    with ThreadPoolExecutor(max_workers=REQUESTS) as pool:
+        responses = list(pool.map(book, range(REQUESTS)))
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200] + [400] * (REQUESTS - 1), [response.text for response in responses]
+    assert all("technician is already booked" in response.json()["detail"]
+               for response in responses if response.status_code == 400)
+    seed.expire_all()
+    assert seed.query(Appointment).filter(Appointment.technician_id == 1).count() == 1
+
+
+def test_reschedule_onto_a_booked_slot_is_refused(seed, client, login, password_hash, query_budget_guard):
+    headers = login()
+    day = (date.today() + timedelta(days=3)).isoformat()
+    seed.add(User(id=10, phone="12125550200", username="customer0", password_hash=password_hash))
+    seed.commit()
+    taken = client.post("/api/v1/appointments/", headers=login("12125550200"), json={
+        "store_id": 1, "service_id": 1, "technician_id": 1, "appointment_date": day, "appointment_time": "10:00:00"
+    })
+    assert taken.status_code == 200, taken.text
+    mine = client.post("/api/v1/appointments/", headers=headers, json={
+        "store_id": 1, "service_id": 2, "technician_id": 1, "appointment_date": day, "appointment_time": "14:00:00"
+    }).json()
+
+    response = client.patch(f"/api/v1/appointments/{mine['id']}", headers=headers, json={"appointment_time": "10:30:00"})
+    assert response.status_code == 400
+    assert "technician is already booked" in response.json()["detail"]
+
+    # Moving within its own slot only overlaps the appointment itself
+    response = client.patch(f"/api/v1/appointments/{mine['id']}", headers=headers, json={"appointment_time": "14:15:00"})
+    assert response.status_code == 200, response.text
+    assert response.json()["end_time"] == "14:45:00"
+
+
+def test_parallel_reschedules_into_one_slot_move_one_appointment(seed, client, login, password_hash):
+    phones = [f"1212555{index:04d}" for index in range(200, 200 + REQUESTS)]
+    day = (date.today() + timedelta(days=3)).isoformat()
+    appointment_ids, headers = [], []
+    for index, phone in enumerate(phones):
+        seed.add(User(id=10 + index, phone=phone, username=f"customer{index}", password_hash=password_hash))
+        seed.commit()
+        headers.append(login(phone))
+        booked = client.post("/api/v1/appointments/", headers=headers[index], json={
+            "store_id": 1, "service_id": 2, "technician_id": 1,
+            "appointment_date": day, "appointment_time": f"{9 + index // 2:02d}:{30 * (index % 2):02d}:00"
+        })
+        assert booked.status_code == 200, booked.text
+        appointment_ids.append(booked.json()["id"])
+    barrier = Barrier(REQUESTS)
+    target = (date.today() + timedelta(days=4)).isoformat()
+
+    def reschedule(index: int):
+        barrier.wait()
+        return client.patch(f"/api/v1/appointments/{appointment_ids[index]}", headers=headers[index], json={
+            "appointment_date": target, "appointment_time": "10:00:00"
+        })
+
+    with ThreadPoolExecutor(max_workers=REQUESTS) as pool:
+        responses = list(pool.map(reschedule, range(REQUESTS)))
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200] + [400] * (REQUESTS - 1), [response.text for response in responses]
+    seed.expire_all()
+    assert seed.query(Appointment).filter(Appointment.appointment_date == date.today() + timedelta(days=4)).count() == 1
@@ -0,0 +1,81 @@
+"""
+Catalog cache and ETag tests
+"""
+from conftest import STORE_ADMIN_PHONE, SUPER_ADMIN_PHONE
+from app.core import catalog_cache
+from app.crud import service as crud_service
+from app.schemas.service import ServiceUpdate
+
+
+def test_etag_changes_for_edits_within_one_second(seed, client, login):
+    admin = login(SUPER_ADMIN_PHONE)
+    etags = []
+    for price in (31.0, 32.0, 33.0):
+        # The edits land within the one-second resolution of updated_at
+        assert client.patch("/api/v1/services/1", headers=admin, json={"price": price}).status_code == 200
+        # A cache miss on a worker that did not see the write (validator path)
+        catalog_cache.invalidate(catalog_cache.SERVICES)
+        etags.append(client.get("/api/v1/services/1").headers["etag"])
+
+    assert len(set(etags)) == 3, etags
+    catalog_cache.invalidate(catalog_cache.SERVICES)
+    response = client.get("/api/v1/services/1", headers={"If-None-Match": etags[-1]})
+    assert response.status_code == 304
+
+
+def test_catalog_writes_stay_within_query_budgets(seed, client, login, query_budget_guard):
+    admin, super_admin = login(STORE_ADMIN_PHONE), login(SUPER_ADMIN_PHONE)
+    store = client.post("/api/v1/stores/", headers=super_admin, json={
+        "name": "Store 2", "address": "2 Main St", "city": "New York", "state": "NY"
+    })
+    assert store.status_code == 201, store.text
+    store_id = store.json()["id"]
+    assert client.patch(f"/api/v1/stores/{store_id}", headers=super_admin, json={"name": "Store 2b"}).status_code == 200
+    image = client.post("/api/v1/stores/1/images", headers=admin, params={"image_url": "https://example.com/1.jpg"})
+    assert image.status_code == 201, image.text
+    # Looked up within the store: another store's path does not reach it
+    assert client.delete(f"/api/v1/stores/{store_id}/images/{image.json()['id']}", headers=super_admin).status_code == 404
+    assert client.delete(f"/api/v1/stores/1/images/{image.json()['id']}", headers=admin).status_code == 204
+
+    for resource, payload in (
+        ("services", {"store_id": 1, "name": "Gel", "price": 40.0, "duration_minutes": 45}),
+        ("technicians", {"store_id": 1, "name": "Technician 3"}),
+    ):
+        created = client.post(f"/api/v1/{resource}/", headers=admin, json=payload)
+        assert created.status_code == 201, created.text
+        item_id = created.json()["id"]
+        assert client.patch(f"/api/v1/{resource}/{item_id}", headers=admin, json={"name": "Renamed"}).status_code == 200
+        assert client.patch(f"/api/v1/{resource}/{item_id}/availability", headers=admin, params={"is_active": 0}).status_code == 200
+        assert client.delete(f"/api/v1/{resource}/{item_id}", headers=admin).status_code == 204
+
+    assert client.delete(f"/api/v1/stores/{store_id}", headers=super_admin).status_code == 204
+
+
+def test_hit_is_not_served_after_a_write_on_another_worker(seed, client, login, monkeypatch, query_budget_guard):
+    admin = login(SUPER_ADMIN_PHONE)
+    first = client.get("/api/v1/services/1")
+    assert first.json()["price"] == 30.0
+
+    # The write lands on another worker, whose invalidate() cannot reach this cache
+    monkeypatch.setattr(catalog_cache, "invalidate", lambda *resources: None)
+    assert client.patch("/api/v1/services/1", headers=admin, json={"price": 35.0}).status_code == 200
+
+    second = client.get("/api/v1/services/1")
+    assert second.json()["price"] == 35.0
+    assert second.headers["etag"] != first.headers["etag"]
+
+
+def test_load_racing_with_a_write_is_not_served(seed, client, monkeypatch):
+    get_service_async = crud_service.get_service_async
+
+    async def load_then_write(db, service_id):
+        service = await get_service_async(db, service_id=service_id)
+        # A write commits after the rows were loaded but before they are cached
+        crud_service.update_service(seed, service_id, ServiceUpdate(price=40.0))
+        return service
+
+    monkeypatch.setattr(crud_service, "get_service_async", load_then_write)
+    assert client.get("/api/v1/services/1").json()["price"] == 30.0
+
+    monkeypatch.setattr(crud_service, "get_service_async", get_service_async)
+    assert client.get("/api/v1/services/1").json()["price"] == 40.0
@@ -0,0 +1,51 @@
+"""
+Index usage of the booking conflict check
+"""
+from datetime import date, time
+
+from sqlalchemy import event
+
+from app.crud import appointment as crud_appointment
+from app.models import Appointment
+from app.db.session import engine
+
+
+def test_check_time_conflict_uses_covering_indexes(seed):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        crud_appointment.check_time_conflict(
+            seed, appointment_date=date(2026, 11, 2), appointment_time=time(10), service_id=1,
+            technician_id=1, user_id=1, duration_minutes=60
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    # One statement, both branches answered from the indexes alone
+    (statement, parameters), = captured
+    plan = [row[-1] for row in seed.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    assert any("COVERING INDEX ix_appointments_technician_date_status" in step for step in plan), plan
+    assert any("COVERING INDEX ix_appointments_user_date_status" in step for step in plan), plan
+    assert not any(step.startswith("SCAN appointments") for step in plan), plan
+
+
+def test_check_time_conflict_reports_earliest_technician_overlap(seed):
+    day = date(2026, 11, 2)
+    for user_id, start, end in ((1, time(11), time(12)), (2, time(10), time(11)), (2, time(11, 30), time(12))):
+        seed.add(Appointment(
+            user_id=user_id, store_id=1, service_id=1, technician_id=1, appointment_date=day,
+            appointment_time=start, end_time=end, status="confirmed"
+        ))
+    seed.commit()
+
+    # Overlaps the customer's own 11:00 booking too, but the technician comes first
+    result = crud_appointment.check_time_conflict(
+        seed, appointment_date=day, appointment_time=time(10, 30), service_id=1,
+        technician_id=1, user_id=1, duration_minutes=120
+    )
+    assert result["conflict_type"] == "technician"
+    assert result["message"] == "The technician is already booked from 10:00 to 11:00"
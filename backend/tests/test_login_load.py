@@ -0,0 +1,97 @@
+"""
+Concurrent login load test
+
+Password verification runs on the dedicated password pool, so logins in
+flight never block the event loop and run in parallel up to the number of
+pool threads (or CPU cores, whichever is lower).
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+
+import httpx
+import pytest
+
+from conftest import CUSTOMER_PHONE, TEST_PASSWORD
+from app.core import security
+from app.core.config import settings
+from app.main import app
+
+LOGINS = 4
+
+
+async def login(client: httpx.AsyncClient) -> float:
+    started = time.perf_counter()
+    response = await client.post("/api/v1/auth/login", json={"phone": CUSTOMER_PHONE, "password": TEST_PASSWORD})
+    assert response.status_code == 200, response.text
+    return time.perf_counter() - started
+
+
+async def run_load():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await login(client)  # warm up imports and the connection pool
+        single = await login(client)
+
+        # A heartbeat on the event loop measures how long it is ever blocked
+        lags, done = [], asyncio.Event()
+
+        async def heartbeat():
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - started - 0.005)
+
+        ticker = asyncio.create_task(heartbeat())
+        started = time.perf_counter()
+        logins = asyncio.gather(*(login(client) for _ in range(LOGINS)))
+        # Measured from when it is due, so time spent waiting for a blocked loop counts
+        await asyncio.sleep(0.05)
+        assert (await client.get("/health")).status_code == 200
+        health = time.perf_counter() - started - 0.05
+        await logins
+        wall = time.perf_counter() - started
+        done.set()
+        await ticker
+
+    return single, wall, health, max(lags)
+
+
+def test_password_checks_run_on_the_password_pool(seed, monkeypatch):
+    threads = []
+    verify_password = security.verify_password
+
+    def recording_verify_password(*args):
+        threads.append(threading.current_thread().name)
+        return verify_password(*args)
+
+    monkeypatch.setattr(security, "verify_password", recording_verify_password)
+
+    async def logins():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await asyncio.gather(*(login(client) for _ in range(LOGINS)))
+        return threading.current_thread().name
+
+    loop_thread = asyncio.run(logins())
+    assert len(threads) == LOGINS
+    assert loop_thread not in threads
+    assert all(name.startswith("password-hash") for name in threads)
+
+
+@pytest.mark.benchmark
+def test_concurrent_logins_do_not_block_the_event_loop(seed):
+    single, wall, health, max_lag = asyncio.run(run_load())
+    parallel = max(1, min(settings.PASSWORD_HASH_WORKERS, os.cpu_count() or 1))
+    timings = (
+        f"single login {single * 1e3:.0f} ms, {LOGINS} concurrent {wall * 1e3:.0f} ms "
+        f"({parallel} in parallel), /health during the burst {health * 1e3:.1f} ms, "
+        f"max event loop lag {max_lag * 1e3:.1f} ms"
+    )
+    # A request arriving mid-burst is not queued behind the password checks
+    assert health < single / 2, timings
+    assert max_lag < single / 4, timings
+    # Logins run in batches of `parallel`, not one after another on the loop
+    assert wall < single * math.ceil(LOGINS / parallel) * 1.5, timings
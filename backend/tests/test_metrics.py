@@ -0,0 +1,31 @@
+"""
+Metrics endpoint tests
+"""
+from app.core.config import settings
+
+
+def test_metrics_only_served_to_allowed_clients(db, client, monkeypatch):
+    # The test client is not on the default localhost allowlist
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(settings, "METRICS_ALLOWED_IPS", "10.0.0.0/8,*")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "nailsdash_db_pool_checked_out" in response.text
+
+
+def test_metrics_allowlist_matches_networks(db, client, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_PROXY", True)
+    monkeypatch.setattr(settings, "METRICS_ALLOWED_IPS", "10.0.0.0/8")
+    assert client.get("/metrics", headers={"X-Forwarded-For": "10.1.2.3"}).status_code == 200
+    assert client.get("/metrics", headers={"X-Forwarded-For": "192.168.1.1"}).status_code == 404
+
+
+def test_metrics_allowlist_ignores_spoofed_forwarded_for(db, client, monkeypatch):
+    # Without a trusted proxy the header is ignored entirely
+    assert client.get("/metrics", headers={"X-Forwarded-For": "127.0.0.1"}).status_code == 404
+
+    # Behind one, only the entry the proxy appended counts
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_PROXY", True)
+    assert client.get("/metrics", headers={"X-Forwarded-For": "127.0.0.1, 203.0.113.9"}).status_code == 404
+    assert client.get("/metrics", headers={"X-Forwarded-For": "203.0.113.9, 127.0.0.1"}).status_code == 200
@@ -0,0 +1,111 @@
+"""
+Keyset pagination tests and deep-page benchmark
+"""
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from conftest import median_seconds
+from app.crud import appointment as crud_appointment
+from app.models import Appointment
+
+PAGE_SIZE = 20
+PAGES = 500
+
+
+def add_history(db, count):
+    """count appointments of user 1, several per day, some sharing a start time"""
+    start = date(2020, 1, 1)
+    db.execute(insert(Appointment), [
+        {
+            "user_id": 1, "store_id": 1, "service_id": 1, "technician_id": 1,
+            "appointment_date": start + timedelta(days=index // 8),
+            "appointment_time": time(9 + index % 8 // 2), "status": "completed", "price": 30.0
+        }
+        for index in range(count)
+    ])
+    db.commit()
+
+
+def page_ids(rows):
+    return [row[0].id for row in rows]
+
+
+def vm_steps(db, func) -> int:
+    """SQLite virtual machine instructions run by func: the work done, independent of machine load"""
+    connection = db.connection().connection.dbapi_connection
+    steps = 0
+
+    def count():
+        nonlocal steps
+        steps += 1
+        return 0
+
+    connection.set_progress_handler(count, 1)
+    try:
+        func()
+    finally:
+        connection.set_progress_handler(None, 1)
+    return steps
+
+
+def deep_page_queries(db):
+    """Page 1 and page PAGES by offset and by keyset, as (offset, keyset) pairs of callables"""
+    add_history(db, PAGE_SIZE * PAGES)
+    skip = PAGE_SIZE * (PAGES - 1)
+    last_of_previous = crud_appointment.get_user_appointments_with_details(db, user_id=1, skip=skip - 1, limit=1)
+    after = (last_of_previous[0][0].appointment_date, last_of_previous[0][0].appointment_time, last_of_previous[0][0].id)
+
+    def offset_page(page_skip):
+        return lambda: crud_appointment.get_user_appointments_with_details(db, user_id=1, skip=page_skip, limit=PAGE_SIZE)
+
+    def keyset_page(page_after):
+        return lambda: crud_appointment.get_user_appointments_with_details(db, user_id=1, limit=PAGE_SIZE, after=page_after)
+
+    assert page_ids(keyset_page(after)()) == page_ids(offset_page(skip)())
+    return (offset_page(0), keyset_page(None)), (offset_page(skip), keyset_page(after))
+
+
+def test_keyset_pages_match_offset_pages(seed):
+    add_history(seed, 95)
+    offset_ids, keyset_ids, after = [], [], None
+    for page in range(5):
+        offset_ids += page_ids(crud_appointment.get_user_appointments_with_details(
+            seed, user_id=1, skip=page * PAGE_SIZE, limit=PAGE_SIZE))
+        rows = crud_appointment.get_user_appointments_with_details(seed, user_id=1, limit=PAGE_SIZE, after=after)
+        keyset_ids += page_ids(rows)
+        if rows:
+            after = crud_appointment.decode_appointment_cursor(crud_appointment.appointment_cursor(rows[-1][0]))
+    assert keyset_ids == offset_ids
+    assert len(set(keyset_ids)) == 95
+
+
+def test_deep_page_work(seed):
+    """
+    Page 500 by OFFSET reads and discards 9980 rows; by keyset it is one index
+    seek past the cursor, so it does about the same work as page 1
+    """
+    (offset_first, keyset_first), (offset_deep, keyset_deep) = deep_page_queries(seed)
+    steps = {
+        name: vm_steps(seed, query) for name, query in (
+            ("offset first", offset_first), ("keyset first", keyset_first),
+            ("offset deep", offset_deep), ("keyset deep", keyset_deep),
+        )
+    }
+    assert steps["offset deep"] > steps["offset first"] * 50, steps
+    assert steps["keyset deep"] < steps["offset deep"] / 50, steps
+    assert steps["keyset deep"] < steps["keyset first"] * 2, steps
+
+
+@pytest.mark.benchmark
+def test_deep_page_benchmark(seed):
+    (offset_first, keyset_first), (offset_deep, keyset_deep) = deep_page_queries(seed)
+    timings = {
+        name: median_seconds(query, repeat=15) for name, query in (
+            ("offset first", offset_first), ("keyset first", keyset_first),
+            ("offset deep", offset_deep), ("keyset deep", keyset_deep),
+        )
+    }
+    assert timings["keyset deep"] < timings["offset deep"] / 2, timings
+    assert timings["keyset deep"] < timings["keyset first"] * 2, timings
@@ -0,0 +1,50 @@
+"""
+Password hashing tests
+"""
+import pytest
+
+from conftest import CUSTOMER_PHONE, TEST_PASSWORD
+from app.core import security
+from app.core.config import settings
+from app.models import User
+
+
+@pytest.fixture
+def argon2(monkeypatch):
+    """New hashes made with argon2, as with PASSWORD_HASH_SCHEME=argon2"""
+    pytest.importorskip("argon2")
+    monkeypatch.setattr(settings, "PASSWORD_HASH_SCHEME", "argon2")
+    monkeypatch.setattr(security, "pwd_context", security.create_password_context())
+
+
+def test_argon2_hashes_verify(argon2, password_hash):
+    hashed = security.get_password_hash(TEST_PASSWORD)
+
+    assert hashed.startswith("$argon2id$")
+    assert security.verify_password(TEST_PASSWORD, hashed)
+    assert not security.verify_password("wrong", hashed)
+    assert not security.password_needs_rehash(hashed)
+    # Existing bcrypt hashes still verify, and are due for an upgrade
+    assert security.verify_password(TEST_PASSWORD, password_hash)
+    assert security.password_needs_rehash(password_hash)
+
+
+def test_login_upgrades_a_bcrypt_hash(seed, client, argon2, password_hash):
+    def stored_hash():
+        seed.expire_all()
+        return seed.query(User).filter(User.id == 1).one().password_hash
+
+    response = client.post("/api/v1/auth/login", json={"phone": CUSTOMER_PHONE, "password": "wrong"})
+    assert response.status_code == 401
+    assert stored_hash() == password_hash
+
+    # The rehash runs as a background task once the response has been sent
+    response = client.post("/api/v1/auth/login", json={"phone": CUSTOMER_PHONE, "password": TEST_PASSWORD})
+    assert response.status_code == 200, response.text
+    upgraded = stored_hash()
+    assert upgraded.startswith("$argon2id$")
+    assert security.verify_password(TEST_PASSWORD, upgraded)
+
+    response = client.post("/api/v1/auth/login", json={"phone": CUSTOMER_PHONE, "password": TEST_PASSWORD})
+    assert response.status_code == 200
+    assert stored_hash() == upgraded
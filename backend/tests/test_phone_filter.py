@@ -0,0 +1,78 @@
+"""
+Registered phone filter tests
+"""
+import pytest
+from sqlalchemy import update
+
+from conftest import CUSTOMER_PHONE, TEST_PASSWORD
+from app.core import phone_filter
+from app.core.config import settings
+from app.models import User
+from app.tasks import phone_filter_refresh
+
+
+def test_memory_backend_refused_without_single_worker(db, monkeypatch):
+    monkeypatch.setattr(settings, "PHONE_FILTER_ENABLED", True)
+    monkeypatch.setattr(settings, "PHONE_FILTER_BACKEND", "memory")
+    monkeypatch.setattr(settings, "PHONE_FILTER_SINGLE_WORKER", False)
+    assert phone_filter.get_phone_filter() is None
+
+    monkeypatch.setattr(settings, "PHONE_FILTER_SINGLE_WORKER", True)
+    assert isinstance(phone_filter.get_phone_filter(), phone_filter.MemoryPhoneFilter)
+
+
+def test_refresh_adds_phone_changed_by_another_process(seed):
+    bloom = phone_filter.MemoryPhoneFilter(capacity=1000, error_rate=0.001)
+    assert bloom.rebuild(seed) == 3
+    new_phone = "12125550199"
+    assert not bloom.might_contain(new_phone)
+
+    # An UPDATE that bypasses crud.user (another worker, a script) keeps the
+    # user id, so only updated_at tells the refresh about it
+    seed.execute(update(User).where(User.id == 1).values(phone=new_phone))
+    seed.commit()
+
+    bloom.refresh(seed)
+    assert bloom.might_contain(new_phone)
+
+
+def test_login_with_filter(seed, client, monkeypatch):
+    monkeypatch.setattr(settings, "PHONE_FILTER_ENABLED", True)
+    monkeypatch.setattr(settings, "PHONE_FILTER_SINGLE_WORKER", True)
+    phone_filter.get_phone_filter().rebuild(seed)
+
+    response = client.post("/api/v1/auth/login", json={"phone": CUSTOMER_PHONE, "password": TEST_PASSWORD})
+    assert response.status_code == 200, response.text
+    response = client.post("/api/v1/auth/login", json={"phone": "12125550199", "password": TEST_PASSWORD})
+    assert response.status_code == 401
+
+
+def test_redis_bits_lost_are_rebuilt(seed, monkeypatch):
+    import redis
+    try:
+        redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.5).ping()
+    except redis.RedisError:
+        pytest.skip("Redis is not reachable at REDIS_URL")
+    monkeypatch.setattr(settings, "PHONE_FILTER_ENABLED", True)
+    monkeypatch.setattr(settings, "PHONE_FILTER_BACKEND", "redis")
+    monkeypatch.setattr(settings, "PHONE_FILTER_CAPACITY", 1000)
+    bloom = phone_filter.get_phone_filter()
+    bloom._client.delete(bloom._key)
+    try:
+        phone_filter_refresh.refresh_once()
+        assert bloom.ready and bloom.is_intact()
+        assert bloom.might_contain(CUSTOMER_PHONE)
+        assert not bloom.might_contain("12125550199")
+
+        # Evicted or flushed, then partly recreated by a registration
+        bloom._client.delete(bloom._key)
+        bloom.add("12125550198")
+        assert bloom.might_contain(CUSTOMER_PHONE)
+        assert not bloom.ready
+
+        phone_filter_refresh.refresh_once()
+        assert bloom.ready
+        assert bloom.might_contain(CUSTOMER_PHONE) and bloom.might_contain("12125550198")
+        assert not bloom.might_contain("12125550199")
+    finally:
+        bloom._client.delete(bloom._key)
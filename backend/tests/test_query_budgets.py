@@ -0,0 +1,107 @@
+"""
+Query budget tests
+
+Each test runs under query_budget_guard, so an endpoint issuing more SQL
+statements than its @query_budget fails the request with QueryBudgetExceeded.
+"""
+import re
+from datetime import date, time, timedelta
+
+from conftest import STORE_ADMIN_PHONE
+from app.api.v1.endpoints import appointments
+from app.core.config import Settings
+from app.crud import user as crud_user
+from app.models import Appointment, StoreDailyStats, Technician
+
+
+def statement_count(response) -> int:
+    """SQL statements of a request, as reported in its Server-Timing header"""
+    return int(re.search(r'"(\d+) queries"', response.headers["server-timing"]).group(1))
+
+
+def test_full_batch_on_ten_technicians(seed, client, login, query_budget_guard):
+    for technician_id in range(3, 11):
+        seed.add(Technician(id=technician_id, store_id=1, name=f"Technician {technician_id}"))
+    seed.commit()
+    day = (date.today() + timedelta(days=3)).isoformat()
+
+    # The maximum batch: every item locks its own technician day
+    response = client.post("/api/v1/appointments/batch", headers=login(), json={"appointments": [
+        {
+            "store_id": 1, "service_id": 2, "technician_id": technician_id,
+            "appointment_date": day, "appointment_time": f"{8 + technician_id:02d}:00:00"
+        }
+        for technician_id in range(1, 11)
+    ]})
+
+    assert response.status_code == 200, response.text
+    assert [item["technician_id"] for item in response.json()] == list(range(1, 11))
+    assert {row.price for row in seed.query(Appointment).all()} == {45.0}
+
+
+def test_appointment_endpoints_use_their_whole_budget_and_no_more(seed, client, login, query_budget_guard):
+    customer, admin = login(), login(STORE_ADMIN_PHONE)
+    day = date.today() + timedelta(days=3)
+
+    def request(endpoint, method, url, headers, **kwargs):
+        # Worst case: the current user is not cached yet
+        crud_user.user_cache.clear()
+        response = client.request(method, url, headers=headers, **kwargs)
+        assert response.status_code == 200, response.text
+        assert statement_count(response) == endpoint.query_budget, endpoint.__name__
+        return response.json()
+
+    def book(start):
+        return request(appointments.create_appointment, "POST", "/api/v1/appointments/", customer, json={
+            "store_id": 1, "service_id": 1, "technician_id": 1,
+            "appointment_date": day.isoformat(), "appointment_time": start
+        })["id"]
+
+    first, second = book("09:00:00"), book("12:00:00")
+    request(appointments.update_appointment, "PATCH", f"/api/v1/appointments/{first}", customer, json={
+        "appointment_date": (day + timedelta(days=1)).isoformat()
+    })
+    request(appointments.confirm_appointment, "PATCH", f"/api/v1/appointments/{first}/confirm", admin)
+    request(appointments.complete_appointment, "PATCH", f"/api/v1/appointments/{first}/complete", admin)
+    request(appointments.cancel_appointment, "DELETE", f"/api/v1/appointments/{second}", customer)
+
+    seed.expire_all()
+    assert sorted(
+        (stats.stat_date - day, stats.status, stats.appointment_count) for stats in seed.query(StoreDailyStats).all()
+    ) == [
+        (timedelta(0), "cancelled", 1), (timedelta(0), "pending", 0), (timedelta(1), "completed", 1),
+        (timedelta(1), "confirmed", 0), (timedelta(1), "pending", 0)
+    ]
+
+
+def test_bulk_status_statements_do_not_grow_with_buckets(seed, client, login, query_budget_guard):
+    admin = login(STORE_ADMIN_PHONE)
+    today = date.today()
+
+    def bulk_complete_all(days: int) -> int:
+        # Pending and confirmed rows on every day: two source buckets per day
+        rows = [
+            Appointment(
+                user_id=1, store_id=1, service_id=1, appointment_date=today + timedelta(days=offset),
+                appointment_time=time(9 + slot), status=status, price=30.0
+            )
+            for offset in range(1, days + 1)
+            for slot, status in enumerate(("pending", "confirmed", "pending"))
+        ]
+        seed.add_all(rows)
+        seed.commit()
+        response = client.post("/api/v1/stores/1/appointments/bulk-status", headers=admin, json={
+            "appointment_ids": [row.id for row in rows], "status": "completed"
+        })
+        assert response.status_code == 200, response.text
+        assert response.json()["updated"] == len(rows)
+        return statement_count(response)
+
+    bulk_complete_all(days=1)  # warms the cached user lookup
+    assert bulk_complete_all(days=2) == bulk_complete_all(days=5)
+
+
+def test_budget_mode_defaults_to_warn_in_development():
+    assert Settings(ENVIRONMENT="development", QUERY_BUDGET_MODE="").query_budget_mode == "warn"
+    assert Settings(ENVIRONMENT="production", QUERY_BUDGET_MODE="").query_budget_mode == "off"
+    assert Settings(ENVIRONMENT="production", QUERY_BUDGET_MODE="Raise").query_budget_mode == "raise"
@@ -0,0 +1,106 @@
+"""
+Rate limiter tests
+"""
+import pytest
+
+from conftest import CUSTOMER_PHONE
+from app.api.v1.endpoints import auth
+from app.core import rate_limit
+from app.core.config import settings
+from app.models import VerificationCode
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for the in-process limiter"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def limited(db, monkeypatch):
+    """Rate limiting enabled (conftest disables it for every other test)"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+
+
+def test_sliding_window(clock):
+    limiter = rate_limit.MemoryRateLimiter()
+    rules = [("ip:1", [(2, 10)])]
+
+    assert limiter.hit(rules) == 0
+    clock[0] += 4
+    assert limiter.hit(rules) == 0
+    clock[0] += 1
+    # Full until the first hit leaves the window, 5 seconds from now
+    assert limiter.hit(rules) == 5
+    clock[0] += 5
+    assert limiter.hit(rules) == 0
+    # Other keys have their own window
+    assert limiter.hit([("ip:2", [(2, 10)])]) == 0
+
+
+def test_rejected_request_uses_no_slot_of_other_rules(clock):
+    limiter = rate_limit.MemoryRateLimiter()
+    rules = [("phone:1", [(1, 60), (3, 3600)])]
+
+    assert limiter.hit(rules) == 0
+    for _ in range(5):
+        clock[0] += 1
+        assert limiter.hit(rules) > 0  # 1/60 rejects; 3/3600 must not count these
+    clock[0] += 60
+    assert limiter.hit(rules) == 0
+    clock[0] += 60
+    assert limiter.hit(rules) == 0
+    clock[0] += 60
+    assert limiter.hit(rules) == 3600 - 180 - 5
+
+    # Nor a slot of another key checked with it
+    limiter = rate_limit.MemoryRateLimiter()
+    assert limiter.hit([("phone:2", [(1, 60)])]) == 0
+    assert limiter.hit([("ip:1", [(1, 60)]), ("phone:2", [(1, 60)])]) > 0
+    assert limiter.hit([("ip:1", [(1, 60)])]) == 0
+
+
+def test_login_is_rejected_before_any_lookup_or_hashing(seed, client, limited, monkeypatch):
+    work = []
+
+    def get_by_phone(db, phone):
+        work.append("lookup")
+
+    async def dummy_verify_password_async():
+        work.append("hash")
+
+    monkeypatch.setattr(auth.crud_user, "get_by_phone", get_by_phone)
+    monkeypatch.setattr(auth, "dummy_verify_password_async", dummy_verify_password_async)
+    limit, window = rate_limit.parse_rules(settings.RATE_LIMIT_LOGIN_PER_PHONE)[0]
+
+    for _ in range(limit):
+        response = client.post("/api/v1/auth/login", json={"phone": CUSTOMER_PHONE, "password": "wrong"})
+        assert response.status_code == 401
+    assert work == ["lookup", "hash"] * limit
+
+    response = client.post("/api/v1/auth/login", json={"phone": CUSTOMER_PHONE, "password": "wrong"})
+    assert response.status_code == 429
+    assert 0 < int(response.headers["retry-after"]) <= window
+    assert len(work) == 2 * limit
+
+
+def test_send_code_limit_holds_with_spoofed_forwarded_for(db, client, limited, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_PROXY", True)
+    limit, _ = rate_limit.parse_rules(settings.RATE_LIMIT_SEND_CODE_PER_IP)[0]
+
+    def send_code(index):
+        # The client picks the leftmost entry; the proxy appends the real address
+        return client.post(
+            "/api/v1/auth/send-verification-code",
+            json={"phone": f"1212555{index:04d}", "purpose": "register"},
+            headers={"X-Forwarded-For": f"203.0.113.{index % 250}, 198.51.100.7"}
+        )
+
+    for index in range(limit):
+        assert send_code(index).status_code == 200
+    response = send_code(limit)
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+    assert db.query(VerificationCode).count() == limit
@@ -0,0 +1,72 @@
+"""
+Store availability endpoint tests
+"""
+from datetime import date, time, timedelta
+
+from app.models import Appointment
+
+DAY = date.today() + timedelta(days=2)
+
+
+def add_appointment(db, technician_id, start, duration_minutes, **values):
+    db.add(Appointment(
+        user_id=1, store_id=1, service_id=1, technician_id=technician_id, appointment_date=DAY,
+        appointment_time=start, duration_minutes=duration_minutes, price=30.0, **values
+    ))
+    db.commit()
+
+
+def availability(client, service_id=1, date_from=DAY, date_to=DAY):
+    return client.get("/api/v1/stores/1/availability", params={
+        "from": date_from.isoformat(), "to": date_to.isoformat(), "service_id": service_id
+    })
+
+
+def test_appointment_without_duration_does_not_block(seed, client):
+    # Legacy row whose service was deleted before durations were stored
+    add_appointment(seed, 1, time(10, 0), None)
+    add_appointment(seed, 1, time(14, 0), 60)
+
+    response = availability(client)
+    assert response.status_code == 200, response.text
+    slots = response.json()["technicians"]["1"][DAY.isoformat()]
+    assert "10:00" in slots
+    assert "14:00" not in slots and "13:30" not in slots
+
+    response = client.get("/api/v1/technicians/1/available-slots", params={"date": DAY.isoformat(), "service_id": 1})
+    assert response.status_code == 200, response.text
+    assert [slot["start_time"] for slot in response.json()] == slots
+
+
+def test_matrix_covers_every_technician_and_day(seed, client, query_budget_guard):
+    add_appointment(seed, 1, time(9, 0), 60)
+    add_appointment(seed, 2, time(17, 0), 60)
+    # A cancelled booking frees its slot
+    add_appointment(seed, 2, time(9, 0), 60, status="cancelled")
+
+    response = availability(client, service_id=2, date_to=DAY + timedelta(days=1))
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["duration_minutes"] == 30 and body["slot_interval_minutes"] == 30
+    technicians = body["technicians"]
+    assert set(technicians) == {"1", "2"}
+    assert set(technicians["1"]) == {DAY.isoformat(), (DAY + timedelta(days=1)).isoformat()}
+
+    day = DAY.isoformat()
+    assert technicians["1"][day][:2] == ["10:00", "10:30"]
+    assert technicians["2"][day][0] == "09:00"
+    assert technicians["2"][day][-1] == "16:30"
+    # 30-minute slots every half hour from 9:00 to 17:30 on a free day
+    assert len(technicians["1"][(DAY + timedelta(days=1)).isoformat()]) == 18
+
+
+def test_invalid_requests(seed, client):
+    assert availability(client, date_to=DAY - timedelta(days=1)).status_code == 400
+    assert availability(client, date_to=DAY + timedelta(days=31)).status_code == 400
+    assert client.get("/api/v1/stores/1/availability", params={
+        "from": "2026-13-01", "to": "2026-13-02", "service_id": 1
+    }).status_code == 400
+    assert availability(client, service_id=99).status_code == 404
+    assert client.get("/api/v1/stores/99/availability", params={
+        "from": DAY.isoformat(), "to": DAY.isoformat(), "service_id": 1
+    }).status_code == 404
@@ -0,0 +1,77 @@
+"""
+Store daily stats rollup tests
+"""
+from datetime import date, timedelta
+
+from conftest import STORE_ADMIN_PHONE, SUPER_ADMIN_PHONE
+from app.crud import store_daily_stats as crud_stats
+from app.models import StoreDailyStats
+
+
+def rollup_rows(db):
+    db.expire_all()
+    return sorted(
+        (row.store_id, row.stat_date, row.status, row.appointment_count, round(row.revenue, 2))
+        for row in db.query(StoreDailyStats).all()
+        if row.appointment_count
+    )
+
+
+def test_rollup_matches_rebuild_after_price_change(seed, client, login, query_budget_guard):
+    customer = login()
+    admin = login(STORE_ADMIN_PHONE)
+    day = (date.today() + timedelta(days=3)).isoformat()
+
+    ids = []
+    for service_id, at in ((1, "10:00:00"), (2, "12:00:00"), (1, "14:00:00")):
+        response = client.post("/api/v1/appointments/", headers=customer, json={
+            "store_id": 1, "service_id": service_id, "technician_id": 1,
+            "appointment_date": day, "appointment_time": at
+        })
+        assert response.status_code == 200, response.text
+        ids.append(response.json()["id"])
+
+    # Reprice after booking, then move the appointments through their statuses
+    response = client.patch("/api/v1/services/1", headers=login(SUPER_ADMIN_PHONE), json={"price": 50.0})
+    assert response.status_code == 200, response.text
+    assert client.patch(f"/api/v1/appointments/{ids[0]}/confirm", headers=admin).status_code == 200
+    assert client.patch(f"/api/v1/appointments/{ids[0]}/complete", headers=admin).status_code == 200
+    assert client.delete(f"/api/v1/appointments/{ids[1]}", headers=customer).status_code == 200
+    response = client.post("/api/v1/stores/1/appointments/bulk-status", headers=admin, json={
+        "appointment_ids": [ids[2]], "status": "confirmed"
+    })
+    assert response.status_code == 200, response.text
+
+    incremental = rollup_rows(seed)
+    crud_stats.rebuild(seed)
+    assert rollup_rows(seed) == incremental
+
+    # Revenue uses the price at booking, not the new $50
+    by_status = {status: revenue for _, _, status, _, revenue in incremental}
+    assert by_status == {"completed": 30.0, "cancelled": 45.0, "confirmed": 30.0}
+
+
+def test_rollup_follows_the_appointment_store(seed, client, login):
+    customer = login()
+    day = (date.today() + timedelta(days=3)).isoformat()
+
+    def book(store_id, service_id, at):
+        return client.post("/api/v1/appointments/", headers=customer, json={
+            "store_id": store_id, "service_id": service_id, "technician_id": 1,
+            "appointment_date": day, "appointment_time": at
+        })
+
+    # The service must belong to the booked store
+    response = book(2, 1, "09:00:00")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Service not found"
+
+    appointment_id = book(1, 2, "10:00:00").json()["id"]
+    # The appointment stays in its store's rollup after its service is deleted
+    assert client.delete("/api/v1/services/2", headers=login(SUPER_ADMIN_PHONE)).status_code == 204
+    assert client.delete(f"/api/v1/appointments/{appointment_id}", headers=customer).status_code == 200
+
+    incremental = rollup_rows(seed)
+    assert [status for _, _, status, _, _ in incremental] == ["cancelled"]
+    crud_stats.rebuild(seed)
+    assert rollup_rows(seed) == incremental
@@ -0,0 +1,32 @@
+"""
+Background task tests
+"""
+from datetime import datetime, time, timedelta
+
+from app.models import Appointment, VerificationCode
+from app.tasks import appointment_sweeper, verification_code_purge
+
+
+def test_sweeper_and_purge_share_the_utc_reference_time(seed):
+    now = datetime(2026, 3, 10, 23, 30)
+    for day, status in ((7, "pending"), (8, "confirmed"), (9, "pending"), (8, "completed")):
+        seed.add(Appointment(
+            user_id=1, store_id=1, service_id=1, appointment_date=now.date().replace(day=day),
+            appointment_time=time(10), status=status, price=30.0
+        ))
+    for hours in (30, 25, 2):
+        seed.add(VerificationCode(
+            phone="12125550100", code="123456", purpose="login", expires_at=now - timedelta(hours=hours)
+        ))
+    seed.commit()
+
+    runs = appointment_sweeper.stats["runs"]
+    # Expires appointments dated before the 9th (one day after, by default)
+    assert appointment_sweeper.sweep_once(now=now) == 2
+    assert appointment_sweeper.stats["runs"] == runs + 1
+    assert appointment_sweeper.stats["last_run_expired"] == 2
+
+    # Deletes codes expired more than 24 hours before now
+    assert verification_code_purge.purge_once(now=now) == 2
+    assert verification_code_purge.stats["last_run_deleted"] == 2
+    assert seed.query(VerificationCode).count() == 1
@@ -0,0 +1,67 @@
+"""
+Token cache tests and decode_token microbenchmark
+"""
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import median_seconds
+from app.core import security
+from app.core.security import create_access_token, decode_token, token_cache
+
+
+def test_cached_decode_skips_verification(db, monkeypatch):
+    token = create_access_token({"sub": "1"})
+    verified = []
+    jwt_decode = security.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        verified.append(args[0])
+        return jwt_decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+
+    hits, misses = token_cache.hits, token_cache.misses
+    payloads = [decode_token(token) for _ in range(100)]
+
+    assert len(verified) == 1
+    assert token_cache.misses - misses == 1
+    assert token_cache.hits - hits == 99
+    assert all(payload == payloads[0] and payload["sub"] == "1" for payload in payloads)
+
+
+@pytest.mark.benchmark
+def test_decode_token_benchmark(db):
+    """
+    A cached decode is a dict lookup and copy; an uncached one verifies the
+    HMAC signature and parses the claims
+    """
+    token = create_access_token({"sub": "1"})
+
+    def uncached():
+        token_cache.delete(token)
+        return decode_token(token)
+
+    hits, misses = token_cache.hits, token_cache.misses
+    uncached_seconds = median_seconds(uncached, repeat=2000)
+    cached_seconds = median_seconds(lambda: decode_token(token), repeat=2000)
+    timings = f"uncached {uncached_seconds * 1e6:.1f} us, cached {cached_seconds * 1e6:.1f} us"
+
+    assert decode_token(token) == uncached()
+    assert cached_seconds < uncached_seconds / 3, timings
+    # Every uncached call missed once; every cached call hit
+    assert token_cache.misses - misses >= 2000
+    assert token_cache.hits - hits >= 2000
+
+
+def test_cache_never_accepts_an_invalid_token(db):
+    token = create_access_token({"sub": "1"})
+    decode_token(token)
+    with pytest.raises(HTTPException):
+        decode_token(token[:-2] + ("AA" if not token.endswith("AA") else "BB"))
+
+    expired = create_access_token({"sub": "1"}, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(HTTPException):
+        decode_token(expired)
+    assert token_cache.get(expired) is None
@@ -0,0 +1,33 @@
+"""
+Authenticated-user cache tests
+"""
+from app.crud import user as crud_user
+
+
+def test_deactivate_takes_effect_at_once(seed, client, login):
+    headers = login()
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    assert crud_user.user_cache.get(1) is not None
+
+    crud_user.deactivate(seed, id=1)
+
+    assert crud_user.user_cache.get(1) is None
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 403
+
+
+def test_delete_takes_effect_at_once(seed, client, login):
+    headers = login()
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+    crud_user.delete(seed, id=1)
+
+    assert crud_user.user_cache.get(1) is None
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 404
+
+
+def test_hit_skips_the_database(seed, count_queries):
+    crud_user.get_cached(seed, id=1)
+    with count_queries() as counted:
+        user = crud_user.get_cached(seed, id=1)
+    assert counted.db_statements == 0
+    assert user.phone and user.is_active
@@ -0,0 +1,57 @@
+"""
+Verification code store tests
+"""
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+import pytest
+
+from app.core import verification_store
+from app.core.config import settings
+from app.crud import verification_code as crud_verification_code
+from app.db.session import SessionLocal
+
+PHONE = "12125550150"
+REQUESTS = 8
+
+
+@pytest.fixture(params=["database", "memory", "redis"])
+def backend(request, db, monkeypatch):
+    """Run the test against every code store backend (redis only if reachable)"""
+    if request.param == "redis":
+        import redis
+        try:
+            redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.5).ping()
+        except redis.RedisError:
+            pytest.skip("Redis is not reachable at REDIS_URL")
+    monkeypatch.setattr(settings, "VERIFICATION_CODE_BACKEND", request.param)
+    yield request.param
+    verification_store._store = None
+
+
+def test_concurrent_consumes_use_a_code_once(backend, db):
+    code = crud_verification_code.create(db, phone=PHONE, purpose="register").code
+    barrier = Barrier(REQUESTS)
+
+    def consume(_):
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            return crud_verification_code.consume_code(session, phone=PHONE, code=code, code_type="register")
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=REQUESTS) as pool:
+        results = list(pool.map(consume, range(REQUESTS)))
+
+    assert results.count(True) == 1, results
+    assert not crud_verification_code.verify_code(db, phone=PHONE, code=code, code_type="register")
+
+
+def test_wrong_code_or_purpose_is_not_consumed(backend, db):
+    code = crud_verification_code.create(db, phone=PHONE, purpose="register").code
+    wrong = "000000" if code != "000000" else "111111"
+
+    assert not crud_verification_code.consume_code(db, phone=PHONE, code=wrong, code_type="register")
+    assert not crud_verification_code.consume_code(db, phone=PHONE, code=code, code_type="login")
+    assert crud_verification_code.consume_code(db, phone=PHONE, code=code, code_type="register")